@@ -1,29 +1,111 @@
 from django.contrib import admin
-from .models import AccessibilityAnalysis
-import json
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.functions import Substr
+from django.utils.functional import cached_property
+
+from .models import AccessibilityAnalysis, MonitoredURL, ScanJob, ViolationNode, host_from_url
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the planner's row estimate for unfiltered changelists
+    on PostgreSQL, where an exact COUNT(*) scans the whole table.
+    """
+
+    # Below this many rows an exact count is cheap and preferred
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.estimate_threshold:
+                return row[0]
+        return super().count
+
 
 @admin.register(AccessibilityAnalysis)
 class AccessibilityAnalysisAdmin(admin.ModelAdmin):
-    list_display = ('id', 'input_type', 'input_data_preview', 'total_violations', 'created_at')
+    list_display = ('id', 'input_type', 'input_data_preview', 'total_violations', 'critical', 'score', 'created_at')
     list_filter = ('input_type', 'created_at')
-    search_fields = ('input_data',)
-    readonly_fields = ('created_at',)
-    
+    search_fields = ('host',)
+    search_help_text = 'Search by host name, e.g. example.com'
+    readonly_fields = ('created_at', 'host', 'critical', 'serious', 'moderate', 'minor', 'total', 'score')
+    raw_id_fields = ('user', 'input_blob', 'result_blob')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Results and HTML bodies live in blobs; only URL inputs are previewed inline
+        return super().get_queryset(request).defer('input_text').annotate(
+            input_preview=Substr('input_text', 1, 101),
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        """Prefix-match the indexed host column instead of LIKE over input_text."""
+        term = search_term.strip().lower()
+        if not term:
+            return queryset, False
+        host = host_from_url(term) if '://' in term else term
+        return queryset.filter(host__startswith=host), False
+
+    @admin.display(description='Input Data')
     def input_data_preview(self, obj):
         """Return a preview of the input data"""
-        if obj.input_type == 'url':
-            return obj.input_data
-        else:
-            return obj.input_data[:100] + '...' if len(obj.input_data) > 100 else obj.input_data
-    
-    input_data_preview.short_description = 'Input Data'
-    
+        if obj.input_type == 'html':
+            return 'HTML input'
+        preview = getattr(obj, 'input_preview', None)
+        if preview is None:
+            preview = obj.input_text[:101]
+        return preview[:100] + '...' if len(preview) > 100 else preview
+
+    @admin.display(description='Total Violations', ordering='total')
     def total_violations(self, obj):
-        """Return the total number of violations from the result_json"""
-        try:
-            result_json = json.loads(obj.result_json)  # Assuming result_json is stored as a JSON string
-            return result_json.get('summary', {}).get('total_violations', 0)
-        except (json.JSONDecodeError, TypeError):
-            return 0
-    
-    total_violations.short_description = 'Total Violations'
+        """Return the total number of violations from the denormalized column"""
+        return obj.total
+
+
+@admin.register(ScanJob)
+class ScanJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'input_type', 'status', 'created_at', 'started_at', 'finished_at')
+    list_filter = ('status', 'input_type')
+    raw_id_fields = ('user', 'analysis')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+
+@admin.register(MonitoredURL)
+class MonitoredURLAdmin(admin.ModelAdmin):
+    list_display = ('url', 'user', 'interval', 'is_active', 'next_scan_at', 'last_checked_at', 'last_outcome')
+    list_filter = ('is_active', 'last_outcome')
+    search_fields = ('host',)
+    raw_id_fields = ('user', 'last_analysis')
+    readonly_fields = (
+        'host', 'etag', 'last_modified', 'content_hash', 'last_checked_at', 'last_scanned_at',
+        'last_outcome', 'last_error', 'consecutive_failures', 'last_analysis', 'created_at',
+    )
+
+
+@admin.register(ViolationNode)
+class ViolationNodeAdmin(admin.ModelAdmin):
+    list_display = ('rule_id', 'impact', 'target', 'analysis')
+    list_filter = ('impact',)
+    search_fields = ('rule_id',)
+    search_help_text = 'Search by axe rule ID, e.g. color-contrast'
+    raw_id_fields = ('analysis',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Match the rule ID exactly, so the (rule_id, impact) index is used."""
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        return queryset.filter(rule_id=term), False
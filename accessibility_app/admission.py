@@ -0,0 +1,189 @@
+"""
+Admission control for scans.
+
+Every scan holds a scanner worker (a headless browser) for seconds, and
+large pages take a lot of memory, so submissions are checked before any
+scanning starts:
+
+- each user may submit scans at SCAN_ADMISSION['RATE'] (django-ratelimit);
+- each user may have at most PER_USER scans queued or running;
+- at most MAX_QUEUED jobs may wait in the background queue.
+
+Scans run during a request (the bulk API) also go through a per-process
+ScanGate. It runs at most one scan per scanner pool worker at once, and
+at most PER_USER for any one user. At most MAX_WAITING scans may wait
+for a slot, each for up to WAIT_TIMEOUT seconds.
+
+Anything over these limits gets ScanRejected with an estimated
+Retry-After. It is not left waiting on the pool.
+"""
+import collections
+import math
+import os
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django_ratelimit.core import get_usage
+
+from .metrics import Counter, Gauge
+from .models import ScanJob
+
+
+class ScanRejected(Exception):
+    """Raised when a scan is not admitted; ``retry_after`` is in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def get_admission_settings():
+    config = getattr(settings, 'SCAN_ADMISSION', {})
+    pool_size = getattr(settings, 'SCANNER', {}).get('POOL_SIZE') or os.cpu_count() or 2
+    return {
+        'RATE': config.get('RATE', '30/m'),
+        'PER_USER': config.get('PER_USER', 3),
+        'CAPACITY': config.get('CAPACITY') or pool_size,
+        'MAX_QUEUED': config.get('MAX_QUEUED') or pool_size * 10,
+        'MAX_WAITING': config.get('MAX_WAITING') or pool_size * 2,
+        'WAIT_TIMEOUT': config.get('WAIT_TIMEOUT', 30),
+        'SCAN_SECONDS': config.get('SCAN_SECONDS', 10),
+    }
+
+
+def estimate_wait(scans_ahead, config=None):
+    """Seconds until a scan behind ``scans_ahead`` others is likely to start."""
+    config = config or get_admission_settings()
+    return max(1, math.ceil((scans_ahead + 1) / config['CAPACITY'])) * config['SCAN_SECONDS']
+
+
+class ScanGate:
+    """
+    A per-process limit on scans running at once, overall and per user,
+    with a bounded number of waiters.
+    """
+
+    def __init__(self, capacity, per_user, max_waiting, wait_timeout):
+        self.capacity = capacity
+        self.per_user = per_user
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.running = 0
+        self.waiting = 0
+        self._by_user = collections.Counter()
+        self._cond = threading.Condition()
+
+    def _has_room(self, user_id):
+        return self.running < self.capacity and self._by_user[user_id] < self.per_user
+
+    def saturated(self):
+        with self._cond:
+            return self.waiting >= self.max_waiting
+
+    def retry_after(self):
+        return estimate_wait(self.running + self.waiting - self.capacity)
+
+    @contextmanager
+    def slot(self, user_id):
+        """Hold a scan slot for ``user_id`` for the enclosed block."""
+        with self._cond:
+            if not self._has_room(user_id):
+                if self.waiting >= self.max_waiting:
+                    SCANS_REJECTED.inc(reason='busy')
+                    raise ScanRejected('Too many scans are waiting for a scanner.', self.retry_after())
+                self.waiting += 1
+                try:
+                    admitted = self._cond.wait_for(lambda: self._has_room(user_id), timeout=self.wait_timeout)
+                finally:
+                    self.waiting -= 1
+                if not admitted:
+                    SCANS_REJECTED.inc(reason='timeout')
+                    raise ScanRejected('No scanner became available in time.', self.retry_after())
+            self.running += 1
+            self._by_user[user_id] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.running -= 1
+                self._by_user[user_id] -= 1
+                if not self._by_user[user_id]:
+                    del self._by_user[user_id]
+                self._cond.notify_all()
+
+
+_gate = None
+_gate_lock = threading.Lock()
+
+
+def get_scan_gate():
+    """Return this process' ScanGate, creating it on first use."""
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            config = get_admission_settings()
+            _gate = ScanGate(config['CAPACITY'], config['PER_USER'], config['MAX_WAITING'], config['WAIT_TIMEOUT'])
+        return _gate
+
+
+def _gate_samples():
+    if _gate is None:
+        return []
+    return [({'state': 'running'}, _gate.running), ({'state': 'waiting'}, _gate.waiting)]
+
+
+SCANS_REJECTED = Counter(
+    'accessiscan_scans_rejected', 'Scan submissions turned away by admission control.', ['reason'],
+)
+GATE_SCANS = Gauge(
+    'accessiscan_scan_gate', 'In-request scans in this process, by state.', ['state'],
+    collect=_gate_samples,
+)
+
+
+def check_rate(request, config=None):
+    """Count a scan submission against the user's rate, raising ScanRejected over it."""
+    config = config or get_admission_settings()
+    usage = get_usage(request, group='scan-submissions', key='user_or_ip', rate=config['RATE'], increment=True)
+    if usage is not None and usage['should_limit']:
+        SCANS_REJECTED.inc(reason='rate')
+        raise ScanRejected('You are submitting scans too quickly.', max(1, usage['time_left']))
+
+
+def admit_job(request):
+    """
+    Admit one background scan job for the request's user, or raise
+    ScanRejected when they are over their rate or scan limit, or the
+    queue is full.
+    """
+    config = get_admission_settings()
+    check_rate(request, config)
+
+    counts = ScanJob.objects.filter(status__in=[ScanJob.STATUS_QUEUED, ScanJob.STATUS_RUNNING]).aggregate(
+        queued=Count('id', filter=Q(status=ScanJob.STATUS_QUEUED)),
+        mine=Count('id', filter=Q(user=request.user)),
+    )
+    if counts['mine'] >= config['PER_USER']:
+        SCANS_REJECTED.inc(reason='user')
+        raise ScanRejected(
+            f"You already have {counts['mine']} scans in progress. Wait for one to finish.",
+            config['SCAN_SECONDS'],
+        )
+    if counts['queued'] >= config['MAX_QUEUED']:
+        SCANS_REJECTED.inc(reason='queue')
+        raise ScanRejected('The scan queue is full.', estimate_wait(counts['queued'], config))
+
+
+def admit_request_scans(request):
+    """
+    Admit a request that scans inline through the ScanGate (the bulk API),
+    or raise ScanRejected when the user is over their rate or the gate
+    already has a full wait queue.
+    """
+    check_rate(request)
+    gate = get_scan_gate()
+    if gate.saturated():
+        SCANS_REJECTED.inc(reason='busy')
+        raise ScanRejected('Too many scans are waiting for a scanner.', gate.retry_after())
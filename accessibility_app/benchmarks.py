@@ -0,0 +1,287 @@
+"""
+Microbenchmarks for the scan-to-render pipeline.
+
+Each benchmark prepares one stage (remediation plan, code fixes, scoring,
+dashboard, PDF report) at a given size, using synthetic axe-core results
+and user histories. It then measures the stage's best and median wall
+time, its query count and its peak Python memory. Results are keyed
+"<stage>/<size>" and can be saved as JSON and compared with a stored
+baseline; compare() flags metrics that got worse by more than a threshold.
+
+Benchmarks write to the database, so run them through the run_benchmarks
+command, which sets up a throwaway test database.
+"""
+import gc
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import timedelta
+
+import django
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .blobs import save_blobs
+from .models import AccessibilityAnalysis, store_violation_nodes
+from .rollups import record_analyses
+from .utils import generate_code_fix, generate_remediation_plan, summarize_violations
+
+
+# Violation nodes per synthetic result, and analyses per synthetic user history
+NODE_SIZES = (10, 1000, 50000)
+HISTORY_SIZES = (10, 1000, 10000)
+
+# Differences below these are noise, whatever the relative change
+MIN_WALL_DELTA_MS = 1.0
+MIN_PEAK_DELTA_KIB = 64.0
+
+SAMPLE_VIOLATIONS = [
+    ('image-alt', 'critical', '<img src="/static/img/{n}.png">'),
+    ('color-contrast', 'serious', '<p style="color: #cccccc;">Low contrast {n}</p>'),
+    ('link-name', 'serious', '<a href="/page/{n}"></a>'),
+    ('label', 'critical', '<input type="text" name="field-{n}">'),
+    ('button-name', 'critical', '<button class="icon"></button>'),
+    ('heading-order', 'moderate', '<h4>Section heading</h4>'),
+]
+
+Benchmark = namedtuple('Benchmark', ['name', 'sizes', 'prepare'])
+
+Regression = namedtuple('Regression', ['name', 'metric', 'baseline', 'current'])
+
+BENCHMARKS = {}
+
+
+def register_benchmark(name, sizes):
+    """
+    Register the decorated function as a benchmark. It is called with a size,
+    does its setup and returns the zero-argument callable to measure.
+    """
+    def decorator(prepare):
+        BENCHMARKS[name] = Benchmark(name, sizes, prepare)
+        return prepare
+    return decorator
+
+
+def build_synthetic_result(nodes, distinct_snippets=50):
+    """
+    An axe-core style result with ``nodes`` violation nodes spread over the
+    sample rules, reusing ``distinct_snippets`` snippets per rule.
+    """
+    per_rule = max(1, nodes // len(SAMPLE_VIOLATIONS))
+    violations = []
+    for rule_id, impact, template in SAMPLE_VIOLATIONS:
+        violations.append({
+            'id': rule_id,
+            'impact': impact,
+            'description': f'{rule_id} description',
+            'help': f'{rule_id} help',
+            'helpUrl': f'https://dequeuniversity.com/rules/axe/4.10/{rule_id}',
+            'nodes': [
+                {'html': template.format(n=i % distinct_snippets), 'target': [f'#node-{i}']}
+                for i in range(per_rule)
+            ],
+        })
+    return {'summary': summarize_violations(violations), 'violations': violations}
+
+
+def build_synthetic_analysis(nodes, distinct_snippets=50):
+    """An unsaved AccessibilityAnalysis holding a synthetic result."""
+    return AccessibilityAnalysis(
+        input_type='html',
+        input_data='<html></html>',
+        result_json=build_synthetic_result(nodes, distinct_snippets),
+    )
+
+
+def create_user(name):
+    user, _ = User.objects.get_or_create(username=name)
+    return user
+
+
+def seed_history(user, count, nodes=20):
+    """Give ``user`` ``count`` saved URL analyses, one minute apart, with a few distinct results."""
+    results = [build_synthetic_result(nodes + variant) for variant in range(0, 60, 6)]
+    now = timezone.now()
+    analyses = []
+    pending_blobs = []
+    for i in range(count):
+        analysis = AccessibilityAnalysis(
+            user=user,
+            input_type='url',
+            input_data=f'https://bench{i % 20}.example.com/page/{i}',
+            result_json=results[i % len(results)],
+            created_at=now - timedelta(minutes=i),
+        )
+        analysis.populate_derived_fields()
+        pending_blobs.extend(analysis.staged_blobs())
+        analyses.append(analysis)
+    save_blobs(pending_blobs)
+    AccessibilityAnalysis.objects.bulk_create(analyses, batch_size=500)
+    store_violation_nodes((analysis.pk, analysis.result_json) for analysis in analyses)
+    record_analyses(analyses)
+
+
+def logged_in_client(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+
+@register_benchmark('remediation_plan', NODE_SIZES)
+def bench_remediation_plan(size):
+    analysis = build_synthetic_analysis(size)
+
+    def run():
+        generate_code_fix.cache_clear()
+        generate_remediation_plan(analysis)
+    return run
+
+
+@register_benchmark('code_fix', NODE_SIZES)
+def bench_code_fix(size):
+    nodes = [
+        (node['html'], violation['id'], violation['impact'])
+        for violation in build_synthetic_result(size)['violations']
+        for node in violation['nodes']
+    ]
+
+    def run():
+        generate_code_fix.cache_clear()
+        for html, rule_id, impact in nodes:
+            generate_code_fix(html, rule_id, impact)
+    return run
+
+
+@register_benchmark('calculate_score', NODE_SIZES)
+def bench_calculate_score(size):
+    # The score is derived from the result when an analysis is saved; this is that step
+    analysis = build_synthetic_analysis(size)
+
+    def run():
+        analysis.populate_derived_fields()
+        analysis.calculate_score()
+    return run
+
+
+@register_benchmark('dashboard_view', HISTORY_SIZES)
+def bench_dashboard_view(size):
+    user = create_user(f'bench-history-{size}')
+    if not AccessibilityAnalysis.objects.filter(user=user).exists():
+        seed_history(user, size)
+    client = logged_in_client(user)
+    url = reverse('accessibility_app:dashboard')
+
+    def run():
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+    return run
+
+
+@register_benchmark('generate_pdf', NODE_SIZES)
+def bench_generate_pdf(size):
+    from .reports import report_path
+
+    user = create_user(f'bench-pdf-{size}')
+    analysis = build_synthetic_analysis(size)
+    analysis.user = user
+    analysis.save()
+    client = logged_in_client(user)
+    url = reverse('accessibility_app:generate_pdf', args=[analysis.id])
+
+    def run():
+        # Measure a cold render, not just streaming the stored artifact
+        path = report_path(analysis.id)
+        if os.path.exists(path):
+            os.unlink(path)
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+        b''.join(response.streaming_content)
+        response.close()
+    return run
+
+
+def measure(run, repeat=5):
+    """Best and median wall time over ``repeat`` runs, then queries and peak memory of one more run each."""
+    run()  # warm imports, template loading and connection setup
+    gc.collect()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    with CaptureQueriesContext(connection) as queries:
+        run()
+    # Count now: the next request's request_started signal resets the query log
+    query_count = len(queries)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'wall_ms': round(min(timings), 3),
+        'median_ms': round(statistics.median(timings), 3),
+        'queries': query_count,
+        'peak_kib': round(peak / 1024, 1),
+        'runs': repeat,
+    }
+
+
+def run_suite(names=None, max_size=None, repeat=5, on_result=None):
+    """
+    Run the selected benchmarks (default: all) at each of their sizes up to
+    ``max_size``. Returns {"<name>/<size>": metrics}.
+    """
+    results = {}
+    for name in names or BENCHMARKS:
+        benchmark = BENCHMARKS[name]
+        for size in benchmark.sizes:
+            if max_size is not None and size > max_size:
+                continue
+            key = f'{name}/{size}'
+            results[key] = measure(benchmark.prepare(size), repeat=repeat)
+            if on_result is not None:
+                on_result(key, results[key])
+    return results
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'machine': platform.machine(),
+        'database': connection.vendor,
+        'created_at': timezone.now().isoformat(),
+    }
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Return a Regression for each metric in ``results`` that is worse than in
+    ``baseline`` (both {"<name>/<size>": metrics}): wall time or peak memory
+    more than ``threshold`` (a fraction) higher, or any extra query.
+    """
+    regressions = []
+    for key, current in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if current['queries'] > base['queries']:
+            regressions.append(Regression(key, 'queries', base['queries'], current['queries']))
+        for metric, min_delta in (('wall_ms', MIN_WALL_DELTA_MS), ('peak_kib', MIN_PEAK_DELTA_KIB)):
+            delta = current[metric] - base[metric]
+            if delta > min_delta and current[metric] > base[metric] * (1 + threshold):
+                regressions.append(Regression(key, metric, base[metric], current[metric]))
+    return regressions
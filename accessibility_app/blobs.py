@@ -0,0 +1,88 @@
+"""
+Content-addressed, compressed storage for scan results and HTML inputs.
+
+A blob is keyed by the SHA-256 of its uncompressed bytes, so identical
+results and inputs are stored once however many rows refer to them. The
+codec is recorded per blob, so changing RESULT_BLOB_CODEC only affects
+new blobs.
+"""
+import hashlib
+import json
+import zlib
+
+from django.conf import settings
+
+
+CODEC_ZLIB = 'zlib'
+CODEC_ZSTD = 'zstd'
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def get_codec():
+    return getattr(settings, 'RESULT_BLOB_CODEC', CODEC_ZLIB)
+
+
+def compress(raw, codec):
+    if codec == CODEC_ZSTD:
+        # Optional dependency, only needed when RESULT_BLOB_CODEC = 'zstd'
+        import zstandard
+
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw)
+    return zlib.compress(raw, ZLIB_LEVEL)
+
+
+def decompress(data, codec):
+    data = bytes(data)  # bytea comes back as a memoryview on PostgreSQL
+    if codec == CODEC_ZSTD:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def encode_json(value):
+    """Canonical JSON bytes, so equal results hash to the same blob."""
+    return json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def decode_json(raw):
+    return json.loads(raw)
+
+
+def encode_text(value):
+    return value.encode('utf-8')
+
+
+def decode_text(raw):
+    return raw.decode('utf-8')
+
+
+def build_blob(raw, model=None, codec=None):
+    """
+    Return an unsaved blob instance for ``raw`` bytes.
+
+    ``model`` defaults to ResultBlob; migrations pass their historical model.
+    """
+    if model is None:
+        from .models import ResultBlob as model
+    codec = codec or get_codec()
+    return model(
+        digest=hashlib.sha256(raw).hexdigest(),
+        codec=codec,
+        size=len(raw),
+        data=compress(raw, codec),
+    )
+
+
+def save_blobs(blobs, model=None):
+    """
+    Insert blobs that are not stored yet, in one query. Blobs whose digest
+    already exists are skipped by the database rather than read first.
+    """
+    if model is None:
+        from .models import ResultBlob as model
+    unique = list({blob.digest: blob for blob in blobs}.values())
+    if unique:
+        model.objects.bulk_create(unique, ignore_conflicts=True)
@@ -0,0 +1,160 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.db import transaction
+
+from .admission import ScanRejected, get_admission_settings, get_scan_gate
+from .blobs import save_blobs
+from .models import AccessibilityAnalysis, ScanHistory, store_violation_nodes
+from .rollups import record_analyses
+from .utils import analyze_accessibility
+
+
+class BulkScanError(Exception):
+    """Raised when a bulk scan request is malformed."""
+
+
+def get_bulk_scan_settings():
+    config = getattr(settings, 'BULK_SCAN', {})
+    return {
+        'MAX_ITEMS': config.get('MAX_ITEMS', 100),
+        'CONCURRENCY': config.get('CONCURRENCY', 4),
+    }
+
+
+def parse_bulk_items(payload):
+    """
+    Validate a bulk scan payload and return a list of (index, input_type, input_data, error).
+
+    Each item is an object with either a ``url`` or an ``html`` key. Invalid
+    items are kept (with an error message) so the response stays aligned with
+    the request.
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get('items'), list):
+        raise BulkScanError('Request body must be a JSON object with an "items" list.')
+
+    items = payload['items']
+    max_items = get_bulk_scan_settings()['MAX_ITEMS']
+    if not items:
+        raise BulkScanError('"items" must contain at least one URL or HTML document.')
+    if len(items) > max_items:
+        raise BulkScanError(f'At most {max_items} items can be scanned per request.')
+
+    validate_url = URLValidator()
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            parsed.append((index, None, None, 'Item must be an object with a "url" or "html" key.'))
+        elif item.get('url'):
+            try:
+                validate_url(item['url'])
+                parsed.append((index, 'url', item['url'], None))
+            except ValidationError:
+                parsed.append((index, 'url', item['url'], 'Enter a valid URL.'))
+        elif isinstance(item.get('html'), str) and item['html'].strip():
+            parsed.append((index, 'html', item['html'], None))
+        else:
+            parsed.append((index, None, None, 'Item must have a non-empty "url" or "html" value.'))
+    return parsed
+
+
+def _item_summary(index, input_type, input_data, analysis=None, error=None):
+    summary = {
+        'index': index,
+        'input_type': input_type,
+        'url': input_data if input_type == 'url' else None,
+        'status': 'error' if error else 'ok',
+    }
+    if error:
+        summary['error'] = error
+    else:
+        summary['analysis_id'] = analysis.id
+        summary['summary'] = analysis.summary
+        summary['score'] = analysis.calculate_score()
+    return summary
+
+
+def iter_bulk_scan(items, user, user_ip=None, user_agent=None, concurrency=None):
+    """
+    Scan parsed bulk items concurrently and yield a summary dict per item as it finishes.
+
+    Items that complete together are persisted with a single bulk_create
+    (with their ScanHistory rows, as for queued scans) in one transaction,
+    so streaming callers get results early while a batch that finishes at
+    once still costs one INSERT per table.
+    """
+    if concurrency is None:
+        concurrency = get_bulk_scan_settings()['CONCURRENCY']
+    # More threads than the user's scan slots would only queue at the gate
+    concurrency = min(concurrency, get_admission_settings()['PER_USER'])
+    gate = get_scan_gate()
+
+    def scan(input_data, input_type):
+        with gate.slot(user.pk):
+            return analyze_accessibility(input_data, input_type)
+
+    for index, input_type, input_data, error in items:
+        if error:
+            yield _item_summary(index, input_type, input_data, error=error)
+
+    valid = [(index, input_type, input_data) for index, input_type, input_data, error in items if not error]
+    if not valid:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(valid)))) as executor:
+        pending = {
+            executor.submit(scan, input_data, input_type): (index, input_type, input_data)
+            for index, input_type, input_data in valid
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            finished = []
+            analyses = []
+            pending_blobs = []
+            for future in done:
+                index, input_type, input_data = pending.pop(future)
+                try:
+                    result = future.result()
+                except ScanRejected as e:
+                    finished.append((index, input_type, input_data, None, f"{e} Retry after {e.retry_after} seconds."))
+                    continue
+                except Exception as e:
+                    finished.append((index, input_type, input_data, None, str(e)))
+                    continue
+                analysis = AccessibilityAnalysis(
+                    input_type=input_type,
+                    input_data=input_data,
+                    result_json=result,
+                    user_ip=user_ip,
+                    user_agent=user_agent,
+                    user=user,
+                )
+                # bulk_create() skips save(), so fill the derived columns and stage the blobs here
+                analysis.populate_derived_fields()
+                analysis.diff_against_previous()
+                pending_blobs.extend(analysis.staged_blobs())
+                analyses.append(analysis)
+                finished.append((index, input_type, input_data, analysis, None))
+
+            if analyses:
+                # All or nothing, so an analysis never lacks its history or node rows
+                with transaction.atomic():
+                    save_blobs(pending_blobs)
+                    AccessibilityAnalysis.objects.bulk_create(analyses)
+                    ScanHistory.objects.bulk_create([
+                        ScanHistory(
+                            user=user,
+                            url=analysis.input_text if analysis.input_type == 'url' else None,
+                            input_blob_id=analysis.input_blob_id,
+                            analysis=analysis,
+                        )
+                        for analysis in analyses
+                    ])
+                    store_violation_nodes((analysis.pk, analysis.result_json) for analysis in analyses)
+                    record_analyses(analyses)
+
+            for index, input_type, input_data, analysis, error in sorted(finished, key=lambda f: f[0]):
+                yield _item_summary(index, input_type, input_data, analysis=analysis, error=error)
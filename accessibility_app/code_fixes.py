@@ -0,0 +1,239 @@
+"""
+Suggested code fixes for axe-core violations.
+
+Each fixer is registered for one or more axe rule IDs and receives a
+FixContext for the snippet. Dispatch is a single dictionary lookup, all
+regular expressions are compiled at import time, and fixers that need to
+understand the markup share one lazily parsed lxml tree per snippet.
+Edits are still applied to the original text so the rest of the snippet
+keeps its formatting.
+"""
+import re
+
+
+FIXERS = {}
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+
+ROLE_ATTR_RE = re.compile(r'role=["\'][^"\']*["\']')
+TABLE_OPEN_TAG_RE = re.compile(r'<table\b[^>]*>')
+INPUT_TAG_RE = re.compile(r'<input\b')
+
+CONTRAST_STYLE = 'color: #000000; background-color: #ffffff;'
+
+CONTRAST_RULES = ('color-contrast', 'color-contrast-enhanced')
+
+
+def register_fixer(*rule_ids):
+    """Register the decorated function as the fixer for the given axe rule IDs."""
+    def decorator(func):
+        for rule_id in rule_ids:
+            FIXERS[rule_id] = func
+        return func
+    return decorator
+
+
+class FixContext:
+    """
+    A snippet being fixed, with its lxml tree parsed on first use.
+    """
+
+    __slots__ = ('html', 'rule_id', 'impact', '_tree')
+
+    _UNPARSED = object()
+
+    def __init__(self, html, rule_id, impact):
+        self.html = html
+        self.rule_id = rule_id
+        self.impact = impact
+        self._tree = self._UNPARSED
+
+    @property
+    def tree(self):
+        """The snippet parsed into a <div> wrapper, or None if it cannot be parsed."""
+        if self._tree is self._UNPARSED:
+            # lxml is only loaded once a structural fixer actually needs a tree
+            from lxml import etree
+            from lxml import html as lxml_html
+
+            try:
+                self._tree = lxml_html.fragment_fromstring(self.html, create_parent='div')
+            except (etree.ParserError, ValueError):
+                self._tree = None
+        return self._tree
+
+    def find(self, *tags):
+        """Return the first element with one of the given tags, in document order."""
+        if self.tree is None:
+            return None
+        for element in self.tree.iter(*tags):
+            return element
+        return None
+
+
+@register_fixer('image-alt')
+def fix_image_alt(ctx):
+    html = ctx.html
+    if '<img ' in html and 'alt=' not in html:
+        return html.replace('<img ', '<img alt="Descriptive alt text" ')
+    if '<img ' in html and 'alt=""' in html:
+        return html.replace('alt=""', 'alt="Descriptive alt text"')
+    return html
+
+
+@register_fixer('button-name')
+def fix_button_name(ctx):
+    html = ctx.html
+    if '<button' not in html or 'aria-label' in html:
+        return html
+    if '>' in html and '</button>' in html:
+        button_parts = html.split('>', 1)
+        if not button_parts[1].strip():
+            # Empty button
+            return button_parts[0] + '>Button Label</button>'
+        # Button with potentially inadequate text
+        return html
+    return html.replace('<button', '<button aria-label="Button label"')
+
+
+@register_fixer(*CONTRAST_RULES)
+def fix_color_contrast(ctx):
+    html = ctx.html
+    # NumPy is only loaded once a contrast violation needs fixing
+    from .contrast import RULE_LEVELS, analyze_nodes, restyle
+
+    fix = analyze_nodes([{'html': html}], level=RULE_LEVELS.get(ctx.rule_id))[0]
+    if fix is not None and not fix.passes:
+        return restyle(html, fix)
+    if 'style="' in html:
+        return html.replace('style="', f'style="{CONTRAST_STYLE} ')
+    if '<' in html and '>' in html:
+        tag_end = html.find('>')
+        return html[:tag_end] + f' style="{CONTRAST_STYLE}"' + html[tag_end:]
+    return '<!-- Increase contrast ratio to at least 4.5:1 -->\n' + html
+
+
+@register_fixer('label')
+def fix_label(ctx):
+    html = ctx.html
+    if '<input' not in html or '<label' in html:
+        return html
+    field = ctx.find('input')
+    if field is None:
+        return html
+
+    input_id = field.get('id')
+    if not input_id:
+        input_id = 'input-example'
+        html = INPUT_TAG_RE.sub(f'<input id="{input_id}"', html, count=1)
+
+    # Add label before the input element
+    return f'<label for="{input_id}">Descriptive Label</label>\n{html}'
+
+
+@register_fixer('link-name')
+def fix_link_name(ctx):
+    html = ctx.html
+    if '<a ' not in html:
+        return html
+    if '></a>' in html:
+        # Empty link
+        return html.replace('></a>', '>Descriptive Link Text</a>')
+    if 'aria-label' not in html:
+        # Link with potentially inadequate text
+        link_parts = html.split('>', 1)
+        if len(link_parts) > 1:
+            return link_parts[0] + ' aria-label="Descriptive Link Purpose">' + link_parts[1]
+    return html
+
+
+@register_fixer('list', 'listitem')
+def fix_list(ctx):
+    html = ctx.html
+    if '<li>' in html:
+        return html
+    if '<ul>' in html:
+        return html.replace('<ul>', '<ul>\n  <li>List item</li>\n')
+    if '<ol>' in html:
+        return html.replace('<ol>', '<ol>\n  <li>List item</li>\n')
+    return html
+
+
+@register_fixer('table-fake-caption', 'td-headers-attr', 'th-has-data-cells')
+def fix_table(ctx):
+    html = ctx.html
+    if ctx.find('table') is None:
+        return html
+
+    if ctx.find('caption') is None:
+        html = html.replace('<table', '<table role="table"')
+        open_tag = TABLE_OPEN_TAG_RE.search(html)
+        if open_tag:
+            html = html[:open_tag.end()] + '\n  <caption>Table Caption</caption>' + html[open_tag.end():]
+
+    if ctx.find('th', 'thead') is None:
+        # Promote the first row's cells to headers
+        row_start = html.find('<tr')
+        if row_start != -1:
+            row_end = html.find('</tr>', row_start)
+            if row_end != -1:
+                row = html[row_start:row_end].replace('<td', '<th').replace('</td>', '</th>')
+                html = html[:row_start] + row + html[row_end:]
+    return html
+
+
+@register_fixer('document-title')
+def fix_document_title(ctx):
+    return ctx.html.replace('<head>', '<head>\n  <title>Page Title</title>')
+
+
+@register_fixer('heading-order')
+def fix_heading_order(ctx):
+    html = ctx.html
+    heading = ctx.find(*HEADING_TAGS)
+    if heading is None:
+        return html
+    level = int(heading.tag[1])
+    if level > 1:
+        html = html.replace(f'<h{level}', f'<h{level - 1}')
+        html = html.replace(f'</h{level}>', f'</h{level - 1}>')
+    return html
+
+
+@register_fixer('aria-roles')
+def fix_aria_roles(ctx):
+    html = ctx.html
+    if 'role=' in html:
+        # Replace invalid role with appropriate one
+        return ROLE_ATTR_RE.sub('role="region"', html)
+    # Add appropriate role based on element type
+    if '<div' in html:
+        return html.replace('<div', '<div role="region"')
+    if '<span' in html:
+        return html.replace('<span', '<span role="text"')
+    return html
+
+
+def annotate_fix(html_snippet, violation_id, impact):
+    """Fallback when no fixer changed the snippet: mark it with a comment."""
+    element_parts = html_snippet.split('>', 1)
+    if len(element_parts) > 1:
+        tag_part = element_parts[0] + '>'
+        content_part = '>' + element_parts[1]
+        return f"{tag_part}\n<!-- FIXED: {violation_id} - {impact} impact -->{content_part}"
+    return f"<!-- FIXED: {violation_id} - {impact} impact -->\n{html_snippet}"
+
+
+def apply_code_fix(html_snippet, violation_id, impact):
+    """
+    Run the registered fixer for ``violation_id`` on the snippet, falling back
+    to an annotated copy when there is no fixer or it made no change.
+    """
+    fixer = FIXERS.get(violation_id)
+    fixed_html = html_snippet
+    if fixer is not None:
+        fixed_html = fixer(FixContext(html_snippet, violation_id, impact))
+
+    if fixed_html == html_snippet:
+        return annotate_fix(html_snippet, violation_id, impact)
+    return fixed_html
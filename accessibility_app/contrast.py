@@ -0,0 +1,307 @@
+"""
+Color-contrast analysis for color-contrast violation nodes.
+
+Foreground/background colors come from the data axe-core attaches to each
+node, or failing that from the snippet's inline style. All nodes are
+handled at once with NumPy: relative luminance and contrast ratios are
+computed over arrays, and identical (foreground, background, text size)
+combinations are solved only once. For each pair that fails, the
+replacement foreground is the nearest color (CIELAB distance) that meets
+the required ratio. Colors from CONTRAST['PALETTE'] are preferred. If none
+of them passes, shades of the original foreground toward black or white
+are used.
+"""
+import functools
+import re
+from collections import namedtuple
+
+import numpy as np
+from django.conf import settings
+
+
+LEVEL_AA = 'AA'
+LEVEL_AAA = 'AAA'
+
+# Required ratios per level, for normal and large text (WCAG 1.4.3 / 1.4.6)
+REQUIRED_RATIOS = {
+    LEVEL_AA: (4.5, 3.0),
+    LEVEL_AAA: (7.0, 4.5),
+}
+
+# Rules that always check a fixed level; others use CONTRAST['LEVEL']
+RULE_LEVELS = {
+    'color-contrast-enhanced': LEVEL_AAA,
+}
+
+# Bisection steps when darkening/lightening a foreground; 2 ** -12 is finer than 8-bit channels
+BISECT_STEPS = 12
+
+# Unique pairs solved per NumPy batch, bounding the (pairs x candidates) arrays
+BATCH_SIZE = 4096
+
+NAMED_COLORS = {
+    'black': (0, 0, 0), 'white': (255, 255, 255), 'red': (255, 0, 0), 'green': (0, 128, 0),
+    'blue': (0, 0, 255), 'yellow': (255, 255, 0), 'gray': (128, 128, 128), 'grey': (128, 128, 128),
+    'silver': (192, 192, 192), 'maroon': (128, 0, 0), 'navy': (0, 0, 128), 'orange': (255, 165, 0),
+    'purple': (128, 0, 128), 'teal': (0, 128, 128), 'lightgray': (211, 211, 211),
+    'lightgrey': (211, 211, 211), 'darkgray': (169, 169, 169), 'darkgrey': (169, 169, 169),
+}
+
+HEX_COLOR_RE = re.compile(r'^#([0-9a-f]{3,4}|[0-9a-f]{6}|[0-9a-f]{8})$')
+RGB_COLOR_RE = re.compile(r'^rgba?\(\s*([\d.]+)[\s,]+([\d.]+)[\s,]+([\d.]+)\s*(?:[,/]\s*[\d.]+%?\s*)?\)$')
+STYLE_ATTR_RE = re.compile(r'style\s*=\s*"([^"]*)"', re.IGNORECASE)
+COLOR_DECL_RE = re.compile(r'(?<![-\w])color\s*:\s*([^;]+)', re.IGNORECASE)
+BACKGROUND_DECL_RE = re.compile(r'background(?:-color)?\s*:\s*([^;]+)', re.IGNORECASE)
+COLOR_DECL_SUB_RE = re.compile(r'(?<![-\w])color\s*:\s*[^;"]*;?\s*', re.IGNORECASE)
+RATIO_RE = re.compile(r'([\d.]+)\s*:\s*1')
+
+ContrastFix = namedtuple('ContrastFix', [
+    'foreground', 'background', 'ratio', 'required', 'suggested', 'suggested_ratio', 'passes',
+])
+
+# sRGB (D65) to XYZ, and the D65 white point, for CIELAB distances
+RGB_TO_XYZ = np.array([
+    [0.4124564, 0.3575761, 0.1804375],
+    [0.2126729, 0.7151522, 0.0721750],
+    [0.0193339, 0.1191920, 0.9503041],
+])
+WHITE_POINT = np.array([0.95047, 1.0, 1.08883])
+
+
+def get_contrast_settings():
+    config = getattr(settings, 'CONTRAST', {})
+    return {
+        'LEVEL': config.get('LEVEL', LEVEL_AA),
+        'PALETTE': config.get('PALETTE', []),
+    }
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_color(value):
+    """Parse a CSS color (#rgb, #rrggbb, rgb()/rgba(), a basic name) into an (r, g, b) tuple, or None."""
+    value = (value or '').strip().lower().replace('!important', '').strip()
+    if value in NAMED_COLORS:
+        return NAMED_COLORS[value]
+    match = HEX_COLOR_RE.match(value)
+    if match:
+        digits = match.group(1)
+        if len(digits) in (3, 4):
+            digits = ''.join(c * 2 for c in digits[:3])
+        value = int(digits[:6], 16)
+        return value >> 16, (value >> 8) & 0xff, value & 0xff
+    match = RGB_COLOR_RE.match(value)
+    if match:
+        return tuple(min(255, round(float(part))) for part in match.groups())
+    return None
+
+
+HEX_BYTES = [f'{i:02x}' for i in range(256)]
+
+
+def to_hex(rgb):
+    r, g, b = (int(c) for c in rgb)
+    return f'#{HEX_BYTES[r]}{HEX_BYTES[g]}{HEX_BYTES[b]}'
+
+
+def color_source(node):
+    """
+    The parts of a violation node its colors are read from, as a hashable key:
+    the data of axe-core's color-contrast check, or the snippet's inline style.
+    """
+    for check in node.get('any', []) or []:
+        data = check.get('data') if isinstance(check, dict) else None
+        if isinstance(data, dict) and data.get('fgColor'):
+            return data.get('fgColor'), data.get('bgColor'), str(data.get('expectedContrastRatio', '')), None
+    style = STYLE_ATTR_RE.search(node.get('html', ''))
+    return None, None, '', style.group(1) if style else None
+
+
+@functools.lru_cache(maxsize=4096)
+def source_colors(source):
+    """
+    Return (foreground, background, large_text) for a color_source() key, or
+    None if the foreground is unknown. The background defaults to white.
+    """
+    fg_color, bg_color, expected_ratio, style = source
+    foreground = parse_color(fg_color)
+    background = parse_color(bg_color)
+    if foreground is None and style is not None:
+        color = COLOR_DECL_RE.search(style)
+        foreground = parse_color(color.group(1)) if color else None
+        background_decl = BACKGROUND_DECL_RE.search(style)
+        background = parse_color(background_decl.group(1)) if background_decl else None
+    if foreground is None:
+        return None
+
+    expected = RATIO_RE.match(expected_ratio)
+    large_text = expected is not None and float(expected.group(1)) < REQUIRED_RATIOS[LEVEL_AA][0]
+    return foreground, background or NAMED_COLORS['white'], large_text
+
+
+def node_colors(node):
+    return source_colors(color_source(node))
+
+
+def relative_luminance(rgb):
+    """WCAG relative luminance of an (..., 3) array of 0-255 sRGB values."""
+    channels = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(channels <= 0.04045, channels / 12.92, ((channels + 0.055) / 1.055) ** 2.4)
+    return linear @ np.array([0.2126, 0.7152, 0.0722])
+
+
+def contrast_ratio(foreground, background):
+    """WCAG contrast ratio between broadcastable arrays of sRGB colors."""
+    lum_fg = relative_luminance(foreground)
+    lum_bg = relative_luminance(background)
+    return (np.maximum(lum_fg, lum_bg) + 0.05) / (np.minimum(lum_fg, lum_bg) + 0.05)
+
+
+def to_lab(rgb):
+    """CIELAB coordinates of an (..., 3) array of 0-255 sRGB values."""
+    channels = np.asarray(rgb, dtype=np.float64) / 255.0
+    linear = np.where(channels <= 0.04045, channels / 12.92, ((channels + 0.055) / 1.055) ** 2.4)
+    xyz = (linear @ RGB_TO_XYZ.T) / WHITE_POINT
+    f = np.where(xyz > (6 / 29) ** 3, np.cbrt(xyz), xyz / (3 * (6 / 29) ** 2) + 4 / 29)
+    return np.stack([116 * f[..., 1] - 16, 500 * (f[..., 0] - f[..., 1]), 200 * (f[..., 1] - f[..., 2])], axis=-1)
+
+
+def _shades(foreground, background, required):
+    """
+    For each foreground, the closest mix toward black and the closest mix
+    toward white that meet ``required``: an (n, 2, 3) array. The mix factor
+    is found by bisection, since contrast only grows once a mix passes.
+    A direction that cannot pass ends at black or white.
+    """
+    targets = np.array([0.0, 255.0])[None, :, None]
+    fg = foreground[:, None, :]
+    bg = background[:, None, :]
+    req = required[:, None]
+
+    def mix(amount):
+        return np.rint(fg + (targets - fg) * amount[..., None])
+
+    low = np.zeros(fg.shape[:2])
+    high = np.ones(fg.shape[:2])
+    for _ in range(BISECT_STEPS):
+        middle = (low + high) / 2
+        passes = contrast_ratio(mix(middle), bg) >= req
+        high = np.where(passes, middle, high)
+        low = np.where(passes, low, middle)
+    return mix(high)
+
+
+def _nearest_passing(candidates, foreground, background, required):
+    """
+    For each row, the candidate closest to ``foreground`` that meets ``required``
+    against ``background``. Returns (colors, ratios, found mask).
+    """
+    ratios = contrast_ratio(candidates, background[:, None, :])
+    distance = np.linalg.norm(to_lab(candidates) - to_lab(foreground)[:, None, :], axis=-1)
+    passing = ratios >= required[:, None]
+    distance = np.where(passing, distance, np.inf)
+    best = np.argmin(distance, axis=1)
+    rows = np.arange(len(candidates))
+    return candidates[rows, best], ratios[rows, best], passing[rows, best]
+
+
+def suggest_colors(foreground, background, required, palette=()):
+    """
+    Solve (n, 3) foreground/background arrays against (n,) required ratios.
+
+    Returns (suggested colors, their ratios). Rows that already pass keep
+    their foreground. Rows that no palette color or shade can fix get black
+    or white, whichever contrasts more.
+    """
+    suggested = foreground.astype(np.float64)
+    ratios = contrast_ratio(foreground, background)
+    failing = np.flatnonzero(ratios < required)
+    if not len(failing):
+        return suggested, ratios
+
+    fg, bg, req = foreground[failing].astype(np.float64), background[failing].astype(np.float64), required[failing]
+    colors, new_ratios, found = np.zeros_like(fg), np.zeros(len(fg)), np.zeros(len(fg), dtype=bool)
+
+    palette = np.array([rgb for rgb in map(parse_color, palette) if rgb is not None], dtype=np.float64)
+    if len(palette):
+        candidates = np.broadcast_to(palette, (len(fg),) + palette.shape)
+        colors, new_ratios, found = _nearest_passing(candidates, fg, bg, req)
+
+    rest = np.flatnonzero(~found)
+    if len(rest):
+        shades = _shades(fg[rest], bg[rest], req[rest])
+        shade_colors, shade_ratios, shade_found = _nearest_passing(shades, fg[rest], bg[rest], req[rest])
+        # Neither direction passes (only possible for AAA): use whichever of black and white contrasts more
+        end_ratios = contrast_ratio(shades, bg[rest][:, None, :])
+        best = np.argmax(end_ratios, axis=1)
+        rows = np.arange(len(rest))
+        colors[rest] = np.where(shade_found[:, None], shade_colors, shades[rows, best])
+        new_ratios[rest] = np.where(shade_found, shade_ratios, end_ratios[rows, best])
+
+    suggested[failing] = colors
+    ratios = ratios.copy()
+    ratios[failing] = new_ratios
+    return suggested, ratios
+
+
+def analyze_nodes(nodes, level=None, palette=None):
+    """
+    Compute a ContrastFix for each violation node (None where the colors are
+    unknown). Identical color pairs are solved once.
+    """
+    config = get_contrast_settings()
+    level = level or config['LEVEL']
+    palette = config['PALETTE'] if palette is None else palette
+    normal_ratio, large_ratio = REQUIRED_RATIOS[level]
+
+    # Each distinct (foreground, background, large text) combination is solved once
+    pair_indexes = {}
+    node_pairs = []
+    for node in nodes:
+        colors = node_colors(node)
+        node_pairs.append(None if colors is None else pair_indexes.setdefault(colors, len(pair_indexes)))
+    if not pair_indexes:
+        return [None] * len(nodes)
+
+    pairs = list(pair_indexes)
+    foreground = np.array([pair[0] for pair in pairs], dtype=np.float64)
+    background = np.array([pair[1] for pair in pairs], dtype=np.float64)
+    required = np.array([large_ratio if pair[2] else normal_ratio for pair in pairs])
+    original = contrast_ratio(foreground, background)
+
+    suggested = np.empty_like(foreground)
+    suggested_ratio = np.empty(len(pairs))
+    for start in range(0, len(pairs), BATCH_SIZE):
+        batch = slice(start, start + BATCH_SIZE)
+        suggested[batch], suggested_ratio[batch] = suggest_colors(
+            foreground[batch], background[batch], required[batch], palette,
+        )
+
+    solved = [
+        ContrastFix(
+            foreground=to_hex(pairs[i][0]),
+            background=to_hex(pairs[i][1]),
+            ratio=round(float(original[i]), 2),
+            required=float(required[i]),
+            suggested=to_hex(suggested[i]),
+            suggested_ratio=round(float(suggested_ratio[i]), 2),
+            passes=bool(original[i] >= required[i]),
+        )
+        for i in range(len(pairs))
+    ]
+    return [None if pair is None else solved[pair] for pair in node_pairs]
+
+
+def restyle(html, fix):
+    """Return the snippet with its text color replaced by the fix's suggested color."""
+    declaration = f'color: {fix.suggested};'
+    style = STYLE_ATTR_RE.search(html)
+    if style:
+        rest = COLOR_DECL_SUB_RE.sub('', style.group(1)).strip()
+        value = f'{declaration} {rest}' if rest else declaration
+        return html[:style.start(1)] + value + html[style.end(1):]
+    tag_end = html.find('>')
+    if not html.startswith('<') or tag_end == -1:
+        return html
+    if html[tag_end - 1] == '/':
+        tag_end -= 1
+    return html[:tag_end].rstrip() + f' style="{declaration}"' + html[tag_end:]
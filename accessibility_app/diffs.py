@@ -0,0 +1,127 @@
+"""
+Node-level diffs between scans of the same URL.
+
+Every violation node is fingerprinted by rule ID, target selector and a
+hash of its whitespace-normalized HTML. A rescan is compared with the
+previous scan on those fingerprints, and can be stored as a delta: the
+new result with each node that is identical to the base scan's node
+replaced by its fingerprint. Nodes that are new, or whose body changed
+(colors, failure summary, exact HTML), are kept in full, so apply_delta()
+rebuilds exactly the result that was saved.
+"""
+import hashlib
+import json
+import re
+from collections import namedtuple
+
+
+# Marks a stored result document as a delta; holds added and resolved fingerprints.
+# The base is recorded on the row (delta_base), not here, so equal deltas share one blob.
+DELTA_KEY = '_delta'
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+Delta = namedtuple('Delta', ['doc', 'added', 'resolved'])
+
+ScanDiff = namedtuple('ScanDiff', ['new', 'fixed', 'unchanged'])
+
+
+def snippet_hash(html):
+    """SHA-1 hex digest of an HTML snippet with whitespace normalized."""
+    return hashlib.sha1(WHITESPACE_RE.sub(' ', html or '').strip().encode('utf-8')).hexdigest()
+
+
+def node_fingerprint(rule_id, node):
+    """Stable ID for a violation node: rule + target selector + normalized HTML hash."""
+    target = json.dumps(node.get('target', []), separators=(',', ':'))
+    html_hash = snippet_hash(node.get('html', ''))
+    return hashlib.sha1(f"{rule_id}|{target}|{html_hash}".encode('utf-8')).hexdigest()[:20]
+
+
+def index_nodes(result):
+    """Map each node fingerprint in a result to its (violation, node) pair."""
+    index = {}
+    for violation in (result or {}).get('violations', []):
+        for node in violation.get('nodes', []):
+            index[node_fingerprint(violation.get('id'), node)] = (violation, node)
+    return index
+
+
+def is_delta(doc):
+    return isinstance(doc, dict) and DELTA_KEY in doc
+
+
+def make_delta(base_result, result):
+    """
+    Describe ``result`` relative to ``base_result``.
+
+    Returns a Delta whose ``doc`` can be stored in place of the full result,
+    with the fingerprints of ``added`` and ``resolved`` nodes. Fingerprints
+    only decide what counts as added or resolved; a node is stored by
+    reference only when it equals the base node with its fingerprint.
+    """
+    base_index = index_nodes(base_result)
+    violations = []
+    added = []
+    seen = set()
+    for violation in result.get('violations', []):
+        nodes = []
+        for node in violation.get('nodes', []):
+            fingerprint = node_fingerprint(violation.get('id'), node)
+            seen.add(fingerprint)
+            if fingerprint not in base_index:
+                added.append(fingerprint)
+                nodes.append(node)
+            elif base_index[fingerprint][1] != node:
+                nodes.append(node)
+            else:
+                nodes.append(fingerprint)
+        violations.append({**violation, 'nodes': nodes})
+
+    resolved = [fingerprint for fingerprint in base_index if fingerprint not in seen]
+    doc = {
+        **result,
+        'violations': violations,
+        DELTA_KEY: {'added': added, 'resolved': resolved},
+    }
+    return Delta(doc, added, resolved)
+
+
+def apply_delta(base_result, doc):
+    """Rebuild the full result stored as ``doc`` on top of its base scan's result."""
+    base_index = index_nodes(base_result)
+    result = {key: value for key, value in doc.items() if key != DELTA_KEY}
+    result['violations'] = [
+        {
+            **violation,
+            'nodes': [
+                base_index[node][1] if isinstance(node, str) else node
+                for node in violation['nodes']
+            ],
+        }
+        for violation in doc.get('violations', [])
+    ]
+    return result
+
+
+def _issue(fingerprint, violation, node):
+    return {
+        'fingerprint': fingerprint,
+        'rule': violation.get('id'),
+        'impact': violation.get('impact'),
+        'help': violation.get('help'),
+        'target': node.get('target', []),
+        'html': node.get('html', ''),
+    }
+
+
+def compare(previous_result, result):
+    """
+    Return the ScanDiff between two full results: issues that are new in
+    ``result``, issues fixed since ``previous_result``, and how many are unchanged.
+    """
+    previous_index = index_nodes(previous_result)
+    current_index = index_nodes(result)
+    new = [_issue(fp, *pair) for fp, pair in current_index.items() if fp not in previous_index]
+    fixed = [_issue(fp, *pair) for fp, pair in previous_index.items() if fp not in current_index]
+    return ScanDiff(new, fixed, len(current_index) - len(new))
@@ -0,0 +1,187 @@
+"""
+Streaming exports of analysis history as NDJSON or CSV.
+
+Rows are read with QuerySet.iterator() in chunks of CHUNK_SIZE as plain
+value tuples, and written out one at a time, so memory use does not grow
+with the number of rows exported. With ``nodes`` set, every violation
+node becomes a row. That needs each result decompressed; rescans stored
+as deltas are rebuilt on top of recently exported results, which are
+kept in a small bounded cache.
+"""
+import csv
+import json
+from collections import OrderedDict, namedtuple
+from datetime import datetime, time, timedelta
+
+from django.db.models import Case, TextField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import AccessibilityAnalysis, RecentResults
+
+
+CHUNK_SIZE = 2000
+
+# Decoded results kept for rebuilding the deltas that follow them
+RESULT_CACHE_SIZE = 64
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+# Column name -> field or annotation selected for it
+ANALYSIS_COLUMNS = OrderedDict([
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('user', 'user__username'),
+    ('input_type', 'input_type'),
+    ('url', 'url'),
+    ('host', 'host'),
+    ('score', 'score'),
+    ('total', 'total'),
+    ('critical', 'critical'),
+    ('serious', 'serious'),
+    ('moderate', 'moderate'),
+    ('minor', 'minor'),
+    ('new_issues', 'new_issues'),
+    ('fixed_issues', 'fixed_issues'),
+])
+NODE_COLUMNS = ('rule_id', 'impact', 'target', 'html')
+
+DEFAULT_COLUMNS = ('id', 'created_at', 'input_type', 'url', 'score', 'total', 'critical', 'serious', 'moderate', 'minor')
+
+ExportOptions = namedtuple('ExportOptions', ['format', 'columns', 'since', 'until', 'input_type', 'nodes'])
+
+
+class ExportError(Exception):
+    """Raised when export options are invalid."""
+
+
+def _parse_bound(value, name, end=False):
+    """A datetime from an ISO date or datetime; a date as ``end`` means up to the end of that day."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ExportError(f'"{name}" must be an ISO date or datetime.')
+        parsed = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_export_options(params):
+    """
+    Validate export options from a mapping (query parameters or command
+    options) with optional format, columns, since, until, input_type and
+    nodes keys. Returns ExportOptions.
+    """
+    export_format = params.get('format') or 'ndjson'
+    if export_format not in FORMATS:
+        raise ExportError(f'"format" must be one of {", ".join(FORMATS)}.')
+
+    nodes = str(params.get('nodes') or '').lower() in ('1', 'true', 'yes')
+    available = list(ANALYSIS_COLUMNS) + (list(NODE_COLUMNS) if nodes else [])
+    columns = params.get('columns')
+    if columns:
+        columns = [column.strip() for column in columns.split(',') if column.strip()]
+        unknown = [column for column in columns if column not in available]
+        if unknown:
+            raise ExportError(f'Unknown columns: {", ".join(unknown)}. Available: {", ".join(available)}.')
+    else:
+        columns = list(DEFAULT_COLUMNS) + (list(NODE_COLUMNS) if nodes else [])
+
+    input_type = params.get('input_type') or None
+    if input_type not in (None, 'url', 'html'):
+        raise ExportError('"input_type" must be "url" or "html".')
+
+    since = _parse_bound(params.get('since'), 'since')
+    until = _parse_bound(params.get('until'), 'until', end=True)
+    if since and until and since >= until:
+        raise ExportError('"since" must be before "until".')
+
+    return ExportOptions(export_format, columns, since, until, input_type, nodes)
+
+
+def export_queryset(options, user=None):
+    """Analyses matching ``options``, oldest first; all users' when ``user`` is None."""
+    queryset = AccessibilityAnalysis.objects.all()
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    if options.since:
+        queryset = queryset.filter(created_at__gte=options.since)
+    if options.until:
+        queryset = queryset.filter(created_at__lt=options.until)
+    if options.input_type:
+        queryset = queryset.filter(input_type=options.input_type)
+    return (
+        queryset
+        .annotate(url=Case(When(input_type='url', then='input_text'), default=Value(''), output_field=TextField()))
+        .order_by('created_at', 'id')
+    )
+
+
+def iter_rows(queryset, options, chunk_size=CHUNK_SIZE):
+    """Yield one dict of the selected columns per analysis, or per violation node with ``options.nodes``."""
+    analysis_columns = [column for column in options.columns if column in ANALYSIS_COLUMNS]
+    fields = [ANALYSIS_COLUMNS[column] for column in analysis_columns]
+
+    if not options.nodes:
+        for values in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+            yield dict(zip(analysis_columns, values))
+        return
+
+    node_columns = [column for column in options.columns if column in NODE_COLUMNS]
+    recent = RecentResults(RESULT_CACHE_SIZE)
+    rows = queryset.values_list('id', 'delta_base_id', 'result_blob__data', 'result_blob__codec', *fields)
+    for pk, base_id, data, codec, *values in rows.iterator(chunk_size=chunk_size):
+        analysis = dict(zip(analysis_columns, values))
+        result = recent.decode(pk, data, codec, base_id)
+        for violation in result.get('violations', []):
+            for node in violation.get('nodes', []):
+                row = dict(analysis)
+                node_values = {
+                    'rule_id': violation.get('id'),
+                    'impact': violation.get('impact'),
+                    'target': node.get('target', []),
+                    'html': node.get('html', ''),
+                }
+                row.update((column, node_values[column]) for column in node_columns)
+                yield row
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} is not JSON serializable')
+
+
+class _Echo:
+    """A file-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+# CSV cells for the columns that aren't plain strings or numbers
+CSV_FORMATTERS = {
+    'created_at': datetime.isoformat,
+    'target': lambda target: json.dumps(target, separators=(',', ':')),
+}
+
+
+def render_rows(rows, options):
+    """Yield the rows as NDJSON or CSV lines (CSV starts with a header line)."""
+    if options.format == 'ndjson':
+        for row in rows:
+            yield json.dumps(row, default=_json_default) + '\n'
+        return
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(options.columns)
+    formatters = [(column, CSV_FORMATTERS.get(column)) for column in options.columns]
+    for row in rows:
+        yield writer.writerow([row[column] if format is None else format(row[column]) for column, format in formatters])
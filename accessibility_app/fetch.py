@@ -0,0 +1,211 @@
+"""
+Shared outbound HTTP layer for URL validation and scanning.
+
+Sessions are pooled per thread with keep-alive connections. Validation
+uses HEAD (or a streamed GET that is closed before the body is read), and
+full page fetches are remembered briefly (FRESH_FOR) in the Django cache
+together with their ETag/Last-Modified validators. Later fetches of the
+same URL within that window are served from there, or revalidated with a
+conditional GET when the caller asks for a younger copy.
+
+A page fetched while validating a queued scan travels to the worker on
+the ScanJob itself (see jobs.enqueue_scan), not through this cache, which
+is per process unless Redis is configured.
+"""
+import hashlib
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.html import escape
+
+
+class FetchError(Exception):
+    """Raised when a URL cannot be fetched."""
+
+
+@dataclass
+class FetchedPage:
+    url: str
+    status_code: int
+    text: str = ''
+    etag: str = ''
+    last_modified: str = ''
+    fetched_at: float = 0.0
+    # True when the body was served from the fetch cache without a network round trip
+    from_cache: bool = False
+    # True when the origin answered 304 Not Modified to a conditional request
+    not_modified: bool = False
+    # True when the body exceeded MAX_BODY_BYTES and was cut off
+    truncated: bool = False
+
+
+def get_fetch_settings():
+    config = getattr(settings, 'HTTP_FETCH', {})
+    return {
+        'TIMEOUT': config.get('TIMEOUT', 5),
+        'POOL_MAXSIZE': config.get('POOL_MAXSIZE', 10),
+        'USER_AGENT': config.get('USER_AGENT', 'AccessiScan/1.0'),
+        'MAX_BODY_BYTES': config.get('MAX_BODY_BYTES', 5 * 1024 * 1024),
+        'FRESH_FOR': config.get('FRESH_FOR', 300),
+    }
+
+
+_local = threading.local()
+
+
+def get_session():
+    """Return this thread's pooled keep-alive session."""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        config = get_fetch_settings()
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=config['POOL_MAXSIZE'], pool_maxsize=config['POOL_MAXSIZE'])
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = config['USER_AGENT']
+        _local.session = session
+    return session
+
+
+def _cache_key(url):
+    return 'fetch:page:' + hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+def check_url(url):
+    """
+    Return the final status code for ``url`` without downloading its body.
+
+    Uses HEAD, falling back to a streamed GET (closed before the body is
+    read) for servers that reject HEAD.
+    """
+    import requests
+
+    config = get_fetch_settings()
+    session = get_session()
+    try:
+        response = session.head(url, timeout=config['TIMEOUT'], allow_redirects=True)
+        if response.status_code in (405, 501):
+            with session.get(url, timeout=config['TIMEOUT'], allow_redirects=True, stream=True) as response:
+                pass
+    except requests.exceptions.RequestException as e:
+        raise FetchError(str(e))
+    return response.status_code
+
+
+def conditional_get(url, etag='', last_modified=''):
+    """
+    GET ``url``, sending If-None-Match / If-Modified-Since for the given
+    validators. On 304 the returned page has ``not_modified`` set and no body.
+    """
+    import requests
+
+    config = get_fetch_settings()
+    headers = {}
+    if etag:
+        headers['If-None-Match'] = etag
+    if last_modified:
+        headers['If-Modified-Since'] = last_modified
+
+    try:
+        with get_session().get(url, headers=headers, timeout=config['TIMEOUT'],
+                               allow_redirects=True, stream=True) as response:
+            if response.status_code == 304:
+                return FetchedPage(
+                    url=response.url,
+                    status_code=304,
+                    etag=response.headers.get('ETag', etag),
+                    last_modified=response.headers.get('Last-Modified', last_modified),
+                    fetched_at=time.time(),
+                    not_modified=True,
+                )
+
+            body = bytearray()
+            truncated = False
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                body.extend(chunk)
+                if len(body) > config['MAX_BODY_BYTES']:
+                    truncated = True
+                    break
+
+            return FetchedPage(
+                url=response.url,
+                status_code=response.status_code,
+                text=bytes(body).decode(response.encoding or 'utf-8', errors='replace'),
+                etag=response.headers.get('ETag', ''),
+                last_modified=response.headers.get('Last-Modified', ''),
+                fetched_at=time.time(),
+                truncated=truncated,
+            )
+    except requests.exceptions.RequestException as e:
+        raise FetchError(str(e))
+
+
+def remember_page(url, page):
+    """Cache a fetched page for fetch_page() for FRESH_FOR seconds, if it is a complete 200 response."""
+    if is_complete(page):
+        cache.set(_cache_key(url), page, get_fetch_settings()['FRESH_FOR'])
+
+
+def is_complete(page):
+    """True for a full 200 response, which can be scanned as HTML instead of fetching the URL again."""
+    return page.status_code == 200 and not page.truncated
+
+
+def fetch_page(url, max_age=None):
+    """
+    Fetch ``url`` and return a FetchedPage, reusing a cached copy when possible.
+
+    A cached body younger than ``max_age`` seconds (default FRESH_FOR) is
+    returned without any request. Older copies are revalidated with
+    If-None-Match / If-Modified-Since, and a 304 reuses the cached body.
+    """
+    config = get_fetch_settings()
+    max_age = config['FRESH_FOR'] if max_age is None else max_age
+    cached = cache.get(_cache_key(url))
+
+    if cached is not None and time.time() - cached.fetched_at < max_age:
+        cached.from_cache = True
+        return cached
+
+    if cached is None:
+        page = conditional_get(url)
+    else:
+        page = conditional_get(url, cached.etag, cached.last_modified)
+        if page.not_modified:
+            cached.fetched_at = page.fetched_at
+            cached.not_modified = True
+            cached.from_cache = False
+            page = cached
+
+    remember_page(url, page)
+    return page
+
+
+HEAD_TAG_RE = re.compile(r'<head\b[^>]*>', re.IGNORECASE)
+BASE_TAG_RE = re.compile(r'<base\b', re.IGNORECASE)
+
+
+def with_base_href(html, url):
+    """
+    Add a <base href> so a fetched page scanned as HTML still resolves its
+    relative stylesheets, scripts and images against the original URL.
+    """
+    if BASE_TAG_RE.search(html):
+        return html
+    base = f'<base href="{escape(url)}">'
+    head = HEAD_TAG_RE.search(html)
+    if head:
+        return html[:head.end()] + base + html[head.end():]
+    return base + html
+
+
+def url_scan_mode():
+    """How URL scans get their markup: 'navigate' (browser loads the URL) or 'prefetched'."""
+    return getattr(settings, 'SCANNER', {}).get('URL_MODE', 'navigate')
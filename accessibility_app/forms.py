@@ -1,10 +1,10 @@
-from django import forms
-import requests
-
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 
+from .metrics import stage_timer
+from .models import ScanJob
+
 class SignupForm(UserCreationForm):
     email = forms.EmailField(required=True)
 
@@ -53,6 +53,16 @@ class AccessibilityAnalyzerForm(forms.Form):
         }),
         label='HTML Content'
     )
+
+    engine = forms.ChoiceField(
+        choices=[('', 'Default')] + ScanJob.ENGINE_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='HTML Scan Engine'
+    )
+
+    # The page fetched while validating in 'prefetched' URL mode, handed to enqueue_scan()
+    prefetched_page = None
     
     def clean(self):
         """
@@ -70,12 +80,20 @@ class AccessibilityAnalyzerForm(forms.Form):
             self.add_error('html', 'Please enter HTML content when HTML input type is selected.')
         
         if input_type == 'url' and url:
-            # Optionally, validate that the URL is reachable or properly formatted
+            from .fetch import FetchError, check_url, fetch_page, url_scan_mode
+
+            # Validate that the URL is reachable. In 'prefetched' scan mode the
+            # page fetched here is reused by the scanner instead of fetched again.
             try:
-                response = requests.get(url, timeout=5)  # Add timeout to avoid hanging requests
-                if response.status_code != 200:
+                with stage_timer('url_validation'):
+                    if url_scan_mode() == 'prefetched':
+                        self.prefetched_page = fetch_page(url)
+                        status_code = self.prefetched_page.status_code
+                    else:
+                        status_code = check_url(url)
+                if status_code != 200:
                     self.add_error('url', 'The URL seems to be unavailable or invalid.')
-            except requests.exceptions.RequestException:
+            except FetchError:
                 self.add_error('url', 'There was an issue connecting to the URL.')
 
         return cleaned_data
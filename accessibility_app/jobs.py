@@ -0,0 +1,244 @@
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .metrics import stage_timer
+from .models import AccessibilityAnalysis, ScanHistory, ScanJob
+from .progress import JobProgress
+from .reports import render_pdf_report
+from .fetch import is_complete, with_base_href
+from .utils import analyze_accessibility
+
+
+logger = logging.getLogger(__name__)
+
+STALE_JOB_ERROR = 'The scan worker stopped before this scan finished.'
+
+
+class LeaseExpired(Exception):
+    """Raised when a job was reclaimed by another worker while this one ran it."""
+
+
+def get_job_settings():
+    config = getattr(settings, 'SCAN_JOBS', {})
+    job_timeout = getattr(settings, 'SCANNER', {}).get('JOB_TIMEOUT', 60)
+    lease = config.get('LEASE', job_timeout * 5)
+    return {
+        'LEASE': lease,
+        'HEARTBEAT': config.get('HEARTBEAT') or lease / 3,
+        'MAX_ATTEMPTS': config.get('MAX_ATTEMPTS', 2),
+    }
+
+
+def enqueue_scan(user, input_type, input_data, user_ip=None, user_agent=None, engine='', page=None):
+    """
+    Queue a scan for background processing and return the ScanJob.
+    ``page`` is the URL's FetchedPage when it was already fetched; a
+    complete one is stored on the job and scanned as is.
+    """
+    prefetched = page is not None and is_complete(page)
+    return ScanJob.objects.create(
+        user=user,
+        input_type=input_type,
+        input_data=input_data,
+        engine=engine,
+        page_url=page.url if prefetched else '',
+        page_html=page.text if prefetched else '',
+        user_ip=user_ip,
+        user_agent=user_agent,
+    )
+
+
+def scan_job_input(job):
+    """The (input, input_type, engine) to scan for a job: its prefetched page as HTML, if it has one."""
+    if job.page_html:
+        return with_base_href(job.page_html, job.page_url or job.input_data), 'html', ScanJob.ENGINE_AXE
+    return job.input_data, job.input_type, job.engine or None
+
+
+def fail_stale_jobs(now=None, config=None):
+    """
+    Fail running jobs whose lease has expired on their last allowed
+    attempt: their worker died, and they won't be retried. Returns the
+    number of jobs failed.
+    """
+    config = config or get_job_settings()
+    now = now or timezone.now()
+    return ScanJob.objects.filter(
+        status=ScanJob.STATUS_RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=config['LEASE']),
+        attempts__gte=config['MAX_ATTEMPTS'],
+    ).update(status=ScanJob.STATUS_FAILED, error=STALE_JOB_ERROR, finished_at=now)
+
+
+def claim_next_job():
+    """
+    Atomically claim the oldest queued job, or return None if there is none.
+
+    A claim is a lease of SCAN_JOBS['LEASE'] seconds from heartbeat_at,
+    which the worker renews while the job runs (see LeaseHeartbeat). A
+    running job whose lease has expired was left by a worker that crashed
+    or was killed; it is claimed again like a queued job, up to
+    MAX_ATTEMPTS attempts, and then failed.
+
+    On databases that support it, SELECT ... FOR UPDATE SKIP LOCKED lets
+    concurrent workers pass over rows another worker is claiming. The
+    conditional UPDATE on status and started_at guards against
+    double-processing on backends (like SQLite) that ignore row locks.
+    """
+    config = get_job_settings()
+    now = timezone.now()
+    fail_stale_jobs(now, config)
+    stale = Q(
+        status=ScanJob.STATUS_RUNNING,
+        heartbeat_at__lt=now - timedelta(seconds=config['LEASE']),
+        attempts__lt=config['MAX_ATTEMPTS'],
+    )
+    with transaction.atomic():
+        job = (
+            ScanJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=ScanJob.STATUS_QUEUED) | stale)
+            .order_by('created_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+
+        claimed = ScanJob.objects.filter(pk=job.pk, status=job.status, started_at=job.started_at).update(
+            status=ScanJob.STATUS_RUNNING,
+            started_at=now,
+            heartbeat_at=now,
+            attempts=F('attempts') + 1,
+        )
+        if not claimed:
+            return None
+
+    job.status = ScanJob.STATUS_RUNNING
+    job.started_at = job.heartbeat_at = now
+    job.attempts += 1
+    return job
+
+
+def renew_lease(job):
+    """Extend the lease on a job this worker still holds; False if it was reclaimed."""
+    now = timezone.now()
+    renewed = ScanJob.objects.filter(pk=job.pk, status=ScanJob.STATUS_RUNNING, started_at=job.started_at).update(
+        heartbeat_at=now,
+    )
+    if renewed:
+        job.heartbeat_at = now
+    return bool(renewed)
+
+
+class LeaseHeartbeat:
+    """
+    Context manager that renews a job's lease every ``interval`` seconds
+    from a background thread, so a scan that outlasts SCAN_JOBS['LEASE']
+    is not claimed and run a second time by another worker.
+    """
+
+    def __init__(self, job, interval):
+        self.job = job
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'lease-{job.pk}', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    if not renew_lease(self.job):
+                        logger.warning("Lost the lease on scan job %s while it ran", self.job.pk)
+                        return
+                except Exception:
+                    # Try again on the next beat; the lease outlasts a few missed renewals
+                    logger.exception("Could not renew the lease on scan job %s", self.job.pk)
+        finally:
+            connection.close()
+
+
+def _finish(job, **fields):
+    """Update a job this worker still holds the lease on; False if it was reclaimed."""
+    finished = ScanJob.objects.filter(pk=job.pk, status=ScanJob.STATUS_RUNNING, started_at=job.started_at).update(**fields)
+    for field, value in fields.items():
+        setattr(job, field, value)
+    return bool(finished)
+
+
+def run_job(job):
+    """
+    Run a claimed job's scan and persist the analysis, marking the job done or failed.
+    Progress is recorded on the job as the scan runs, for the event stream.
+    """
+    progress = JobProgress(job)
+    try:
+        progress.save('fetching' if job.input_type == 'url' else 'loading')
+        scan_input, scan_type, engine = scan_job_input(job)
+        with stage_timer('scan'), LeaseHeartbeat(job, get_job_settings()['HEARTBEAT']):
+            analysis_result = analyze_accessibility(
+                scan_input, scan_type, on_progress=progress, engine=engine, refresh_cache=job.refresh_cache,
+            )
+        progress.set_summary(analysis_result.get('summary', {}))
+        progress.save('persisting')
+        with stage_timer('persist'), transaction.atomic():
+            analysis = AccessibilityAnalysis.objects.create(
+                input_type=job.input_type,
+                input_data=job.input_data,
+                result_json=analysis_result,
+                user_ip=job.user_ip,
+                user_agent=job.user_agent,
+                user=job.user,
+            )
+            ScanHistory.objects.create(
+                user=job.user,
+                url=job.input_data if job.input_type == "url" else None,
+                input_blob_id=analysis.input_blob_id,
+                analysis=analysis,
+            )
+            finished = _finish(
+                job, analysis=analysis, status=ScanJob.STATUS_DONE, page_url='', page_html='',
+                finished_at=timezone.now(), progress=progress.snapshot('persisted'),
+            )
+            if not finished:
+                raise LeaseExpired()
+    except LeaseExpired:
+        # Another worker reclaimed the job; its run records the result
+        logger.warning("Lease on scan job %s expired before it finished", job.pk)
+        return job
+    except Exception as e:
+        if not _finish(
+            job, status=ScanJob.STATUS_FAILED, error=str(e), page_url='', page_html='',
+            finished_at=timezone.now(), progress=progress.snapshot('failed'),
+        ):
+            logger.warning("Lease on scan job %s expired before it failed", job.pk)
+        return job
+
+    # Pre-render the PDF report off the request path; downloads then just read the file
+    try:
+        render_pdf_report(job.analysis)
+    except Exception:
+        logger.exception("Could not pre-render PDF report for analysis %s", job.analysis_id)
+    return job
+
+
+def process_next_job():
+    """
+    Claim and run one queued job. Returns the job, or None if the queue was empty.
+    """
+    job = claim_next_job()
+    if job is not None:
+        run_job(job)
+    return job
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from accessibility_app.models import AccessibilityAnalysis, RecentResults, ViolationNode, store_violation_nodes
+
+
+class Command(BaseCommand):
+    help = 'Fills the ViolationNode table for analyses saved before it existed, in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Analyses per transaction')
+        parser.add_argument('--rebuild', action='store_true', help='Delete and rewrite every analysis\' nodes')
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            deleted, _ = ViolationNode.objects.all().delete()
+            self.stdout.write(f'Deleted {deleted} violation nodes')
+
+        # Analyses with violations but no nodes yet; pk order keeps delta bases ahead of their rescans
+        pending = (
+            AccessibilityAnalysis.objects.filter(total__gt=0)
+            .exclude(Exists(ViolationNode.objects.filter(analysis=OuterRef('pk'))))
+            .order_by('pk')
+        )
+        recent = RecentResults()
+        last_pk = 0
+        analyses = nodes = 0
+        while True:
+            chunk = list(
+                pending.filter(pk__gt=last_pk)
+                .values_list('pk', 'delta_base_id', 'result_blob__data', 'result_blob__codec')[:options['chunk_size']]
+            )
+            if not chunk:
+                break
+            results = [(pk, recent.decode(pk, data, codec, base_id)) for pk, base_id, data, codec in chunk]
+            with transaction.atomic():
+                nodes += store_violation_nodes(results)
+            analyses += len(chunk)
+            last_pk = chunk[-1][0]
+            self.stdout.write(f'{analyses} analyses, {nodes} nodes (up to #{last_pk})')
+
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {nodes} violation nodes for {analyses} analyses'))
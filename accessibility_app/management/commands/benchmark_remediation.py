@@ -0,0 +1,55 @@
+import gc
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from accessibility_app.benchmarks import build_synthetic_analysis
+from accessibility_app.utils import generate_code_fix, generate_remediation_plan
+
+
+class Command(BaseCommand):
+    help = 'Measures wall time and allocations of generate_remediation_plan on a synthetic result'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--nodes', type=int, default=10000, help='Number of violation nodes')
+        parser.add_argument('--distinct', type=int, default=50,
+                            help='Distinct HTML snippets per rule')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs (best is reported)')
+
+    def handle(self, *args, **options):
+        analysis = build_synthetic_analysis(options['nodes'], options['distinct'])
+        cache_clear = getattr(generate_code_fix, 'cache_clear', None)
+
+        # Warm the tip index and imports so only plan building is measured
+        generate_remediation_plan(build_synthetic_analysis(6, 1))
+
+        timings = []
+        for _ in range(options['repeat']):
+            if cache_clear:
+                cache_clear()
+            gc.collect()
+            start = time.perf_counter()
+            plan = generate_remediation_plan(analysis)
+            timings.append(time.perf_counter() - start)
+            del plan
+
+        if cache_clear:
+            cache_clear()
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        plan = generate_remediation_plan(analysis)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        diff = after.compare_to(before, 'filename')
+        blocks = sum(stat.count_diff for stat in diff)
+        size = sum(stat.size_diff for stat in diff)
+
+        self.stdout.write(f"nodes:            {len(plan)}")
+        self.stdout.write(f"best wall time:   {min(timings) * 1000:.1f} ms (of {len(timings)} runs)")
+        self.stdout.write(f"retained blocks:  {blocks}")
+        self.stdout.write(f"retained memory:  {size / 1024:.1f} KiB")
+        self.stdout.write(f"peak memory:      {peak / 1024:.1f} KiB")
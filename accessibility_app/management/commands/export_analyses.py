@@ -0,0 +1,50 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from accessibility_app.exports import (
+    ANALYSIS_COLUMNS,
+    CHUNK_SIZE,
+    FORMATS,
+    ExportError,
+    export_queryset,
+    iter_rows,
+    parse_export_options,
+    render_rows,
+)
+
+
+class Command(BaseCommand):
+    help = "Streams analyses (one user's, or everyone's) as NDJSON or CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username to export (default: all users)')
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+        parser.add_argument('--columns', help=f"Comma-separated columns (from {', '.join(ANALYSIS_COLUMNS)}; "
+                                              "with --nodes also rule_id, impact, target, html)")
+        parser.add_argument('--since', help='Only analyses created on or after this ISO date or datetime')
+        parser.add_argument('--until', help='Only analyses created before this datetime, or on or before this date')
+        parser.add_argument('--input-type', choices=['url', 'html'])
+        parser.add_argument('--nodes', action='store_true', help='One row per violation node')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+        parser.add_argument('--output', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            export_options = parse_export_options(options)
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user {options['user']!r}")
+
+        rows = iter_rows(export_queryset(export_options, user=user), export_options, chunk_size=options['chunk_size'])
+        if not options['output']:
+            for line in render_rows(rows, export_options):
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+            output.writelines(render_rows(rows, export_options))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from accessibility_app.startup import measure_cold_import
+
+
+class Command(BaseCommand):
+    help = 'Reports per-module cold import time of the URLconf (or another module)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('module', nargs='?', help='Module to import (default: ROOT_URLCONF)')
+        parser.add_argument('--limit', type=int, default=25, help='Number of modules to list')
+        parser.add_argument('--app-only', action='store_true',
+                            help='Only list accessibility_app / project modules')
+
+    def handle(self, *args, **options):
+        report = measure_cold_import(options['module'], importtime=True)
+
+        rows = report['modules']
+        if options['app_only']:
+            rows = [row for row in rows if row[0].startswith(('accessibility_app', 'accessibility_project'))]
+        rows.sort(key=lambda row: row[2], reverse=True)
+
+        self.stdout.write(f"{'cumulative ms':>14} {'self ms':>9}  module")
+        for name, self_us, cumulative_us in rows[:options['limit']]:
+            self.stdout.write(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+        budget = getattr(settings, 'STARTUP_IMPORT_BUDGET_MS', None)
+        self.stdout.write('')
+        self.stdout.write(f"Import of {report['module']} after django.setup(): {report['elapsed_ms']:.1f} ms"
+                          + (f" (budget {budget} ms)" if budget else ''))
+        if report['heavy_modules']:
+            self.stdout.write(self.style.WARNING(
+                f"Heavy modules loaded at import: {', '.join(report['heavy_modules'])}"
+            ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from accessibility_app.rollups import REBUILD_CHUNK_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = ('Recomputes the daily and weekly rule rollups from the ViolationNode table with pandas '
+            '(run backfill_violation_nodes first; pause scan workers while it runs)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=REBUILD_CHUNK_SIZE, help='Analyses read per query')
+
+    def handle(self, *args, **options):
+        scans, rules = rebuild(
+            chunk_size=options['chunk_size'],
+            on_chunk=lambda last_pk: self.stdout.write(f'Read analyses up to #{last_pk}'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Wrote {scans} scan rollups and {rules} rule rollups'))
@@ -0,0 +1,43 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from accessibility_app.rule_engine import CONFORMANCE_DIR, RULES, violation_nodes
+
+
+class Command(BaseCommand):
+    help = 'Records axe-core results for the rule engine conformance fixtures, using the scanner pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Fixture names (default: every .html page)')
+
+    def handle(self, *args, **options):
+        if getattr(settings, 'SCANNER', {}).get('BACKEND') == 'mock':
+            raise CommandError('Conformance results must come from axe-core; unset SCANNER_BACKEND=mock.')
+
+        from accessibility_app.scanner_pool import get_pool
+
+        names = options['names'] or sorted(
+            os.path.splitext(filename)[0] for filename in os.listdir(CONFORMANCE_DIR) if filename.endswith('.html')
+        )
+        run_options = {'runOnly': {'type': 'rule', 'values': sorted(RULES)}}
+        for name in names:
+            path = os.path.join(CONFORMANCE_DIR, f'{name}.html')
+            if not os.path.exists(path):
+                raise CommandError(f'No fixture page {path}')
+            with open(path, encoding='utf-8') as page:
+                result = get_pool().scan(page.read(), 'html', options=run_options)
+
+            engine = result.get('testEngine') or {}
+            doc = {
+                'recorded_with': f"{engine.get('name', 'axe-core')} {engine.get('version', '')}".strip(),
+                'rules': violation_nodes(result),
+            }
+            with open(os.path.join(CONFORMANCE_DIR, f'{name}.axe.json'), 'w', encoding='utf-8') as out:
+                json.dump(doc, out, indent=2)
+                out.write('\n')
+            self.stdout.write(f"{name}: {sum(len(nodes) for nodes in doc['rules'].values())} violation nodes")
+
+        self.stdout.write(self.style.SUCCESS(f'Recorded {len(names)} fixtures'))
@@ -0,0 +1,28 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from accessibility_app.models import AccessibilityAnalysis
+from accessibility_app.reports import render_pdf_report, report_path
+
+
+class Command(BaseCommand):
+    help = 'Pre-renders PDF reports for analyses that do not have one for the current template version'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-render reports that already exist')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        rendered = failed = 0
+        for analysis in AccessibilityAnalysis.objects.order_by('pk').iterator(chunk_size=options['batch_size']):
+            if not options['force'] and os.path.exists(report_path(analysis.id)):
+                continue
+            try:
+                render_pdf_report(analysis)
+                rendered += 1
+            except Exception as e:
+                failed += 1
+                self.stderr.write(f'Analysis {analysis.id}: {e}')
+
+        self.stdout.write(self.style.SUCCESS(f'Rendered {rendered} reports ({failed} failed)'))
@@ -0,0 +1,78 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from accessibility_app.benchmarks import BENCHMARKS, compare, environment, run_suite
+
+
+class Command(BaseCommand):
+    help = ('Runs the scan-to-render microbenchmarks on a throwaway test database, '
+            'optionally comparing them with a stored baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per benchmark (best and median are kept)')
+        parser.add_argument('--max-size', type=int, help='Skip sizes above this')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Compare with results stored by an earlier --output')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Relative slowdown or memory growth that counts as a regression (default 0.2)')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as baseline_file:
+                    baseline = json.load(baseline_file)['results']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f"Cannot read baseline {options['baseline']}: {e}")
+
+        def report(key, metrics):
+            self.stdout.write(
+                f"{key:<28} {metrics['wall_ms']:>10.2f} ms  (median {metrics['median_ms']:.2f})"
+                f"  {metrics['queries']:>4} queries  {metrics['peak_kib']:>10.1f} KiB peak"
+            )
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with tempfile.TemporaryDirectory() as reports_root, override_settings(PDF_REPORTS_ROOT=reports_root):
+                results = run_suite(
+                    names=options['names'] or None,
+                    max_size=options['max_size'],
+                    repeat=options['repeat'],
+                    on_result=report,
+                )
+                meta = environment()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump({'meta': meta, 'results': results}, output, indent=2, sort_keys=True)
+                output.write('\n')
+            self.stdout.write(f"Wrote {len(results)} results to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options['threshold'])
+            for regression in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f"REGRESSION {regression.name} {regression.metric}: "
+                    f"{regression.baseline} -> {regression.current}"
+                ))
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions beyond {options['threshold']:.0%}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions beyond {options['threshold']:.0%}"))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accessibility_app.monitoring import get_monitor_settings, run_monitor
+
+
+class Command(BaseCommand):
+    help = 'Rescans monitored URLs that are due, skipping pages that have not changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Number of URLs to visit in parallel (default: MONITOR["WORKERS"])')
+        parser.add_argument('--max-runtime', type=float, default=None,
+                            help='Stop starting new visits after this many seconds (default: MONITOR["MAX_RUNTIME"])')
+        parser.add_argument('--poll-interval', type=float, default=60.0,
+                            help='Seconds to wait before looking for due URLs again')
+        parser.add_argument('--once', action='store_true',
+                            help='Visit the URLs that are due now and exit (e.g. from cron)')
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or get_monitor_settings()['WORKERS']
+        self.stdout.write(f'Starting URL monitor with {workers} worker(s)')
+        try:
+            while True:
+                started = time.monotonic()
+                outcomes = run_monitor(workers=workers, max_runtime=options['max_runtime'])
+                if outcomes:
+                    summary = ', '.join(f'{count} {outcome}' for outcome, count in sorted(outcomes.items()))
+                    self.stdout.write(f'Visited {sum(outcomes.values())} URL(s) in {time.monotonic() - started:.1f}s: {summary}')
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping URL monitor')
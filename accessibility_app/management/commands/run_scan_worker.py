@@ -0,0 +1,62 @@
+import logging
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accessibility_app.jobs import process_next_job
+from accessibility_app.metrics import serve_metrics
+
+
+logger = logging.getLogger('accessibility_app.jobs')
+
+
+class Command(BaseCommand):
+    help = 'Processes queued accessibility scan jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Number of jobs to process in parallel')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait before polling an empty queue again')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the queue and exit instead of polling forever')
+        parser.add_argument('--metrics-port', type=int,
+                            help="Serve this worker's Prometheus metrics on this port")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options['concurrency'])
+        self.stdout.write(f'Starting scan worker with {concurrency} thread(s)')
+        if options['metrics_port']:
+            serve_metrics(options['metrics_port'])
+            self.stdout.write(f"Serving metrics on port {options['metrics_port']}")
+
+        threads = [
+            threading.Thread(target=self.work, args=(options['poll_interval'], options['once']), daemon=True)
+            for _ in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                thread.join()
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping scan worker')
+
+    def work(self, poll_interval, once):
+        while True:
+            close_old_connections()
+            try:
+                job = process_next_job()
+            except Exception:
+                # e.g. the database went away; keep this thread alive and try again
+                logger.exception('Scan worker thread failed to process a job')
+                job = None
+            if job is not None:
+                self.stdout.write(f'Processed {job}')
+                continue
+            if once:
+                break
+            time.sleep(poll_interval)
+        close_old_connections()
@@ -0,0 +1,361 @@
+"""
+Pipeline instrumentation in the Prometheus text exposition format.
+
+stage_timer() records how long each named stage of the scan and report
+pipeline takes (URL validation, scanner checkout and run, result decoding,
+model writes, remediation plan, template and PDF rendering) in one
+histogram, labelled by stage. MetricsMiddleware records request durations
+and per-request query counts. It also sends the stages timed during a
+request back in a Server-Timing header. Scanner concurrency and queue
+depth are gauges read when the metrics are scraped.
+
+Metrics are kept in process memory: each web or worker process reports
+its own values, and Prometheus aggregates across scrape targets.
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+
+# Seconds; spans a cached HTML scan up to a slow page load
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Stages timed while handling the current request, for the Server-Timing header
+_request_stages = ContextVar('request_stages', default=None)
+# QueryCounter for the current request. A ContextVar, so queries an async
+# view runs through sync_to_async() on another thread are counted too.
+_request_queries = ContextVar('request_queries', default=None)
+
+
+def get_metrics_settings():
+    config = getattr(settings, 'METRICS', {})
+    return {
+        'ENABLED': config.get('ENABLED', True),
+        'TOKEN': config.get('TOKEN', ''),
+    }
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{_escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in values]
+
+
+class Gauge(Metric):
+    """
+    A gauge set directly, or computed at scrape time by ``collect``, a
+    callable returning (labels dict, value) pairs.
+    """
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY, collect=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.collect = collect
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        if self.collect is not None:
+            values = sorted((self._key(labels), value) for labels, value in self.collect())
+        else:
+            with self._lock:
+                values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}'
+                for key, value in values]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY, buckets=DURATION_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = []
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            lines.append(f'{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{_format_labels(self.labelnames, key)} {count}')
+        return lines
+
+
+def _scanner_pool_samples():
+    # Only report a pool this process has started; scraping must not spawn browsers
+    from . import scanner_pool
+
+    pool = scanner_pool._pool
+    if pool is None:
+        return []
+    status = pool.status()
+    return [({'state': 'busy'}, status['busy']), ({'state': 'idle'}, status['idle']), ({'state': 'size'}, status['size'])]
+
+
+def _scan_queue_samples():
+    from django.db.models import Count
+
+    from .models import ScanJob
+
+    counts = dict(
+        ScanJob.objects.filter(status__in=[ScanJob.STATUS_QUEUED, ScanJob.STATUS_RUNNING])
+        .values_list('status').annotate(count=Count('id')).order_by()
+    )
+    return [({'status': status}, counts.get(status, 0)) for status in (ScanJob.STATUS_QUEUED, ScanJob.STATUS_RUNNING)]
+
+
+STAGE_SECONDS = Histogram(
+    'accessiscan_stage_duration_seconds', 'Time spent in each scan and report pipeline stage.', ['stage'],
+)
+STAGE_ERRORS = Counter(
+    'accessiscan_stage_errors', 'Pipeline stages that raised an exception.', ['stage'],
+)
+REQUEST_SECONDS = Histogram(
+    'accessiscan_request_duration_seconds', 'Time to produce a response, by view.', ['view', 'method'],
+)
+REQUEST_QUERIES = Histogram(
+    'accessiscan_request_queries', 'Database queries per request, by view.', ['view'], buckets=QUERY_BUCKETS,
+)
+SCANNER_WORKERS = Gauge(
+    'accessiscan_scanner_workers', 'Scanner pool workers in this process, by state.', ['state'],
+    collect=_scanner_pool_samples,
+)
+SCAN_QUEUE_DEPTH = Gauge(
+    'accessiscan_scan_jobs', 'Background scan jobs waiting or running.', ['status'],
+    collect=_scan_queue_samples,
+)
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    stages = _request_stages.get()
+    if stages is not None:
+        stages.append((stage, seconds))
+
+
+@contextmanager
+def stage_timer(stage):
+    """Time the enclosed block as pipeline stage ``stage``."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+class QueryCounter:
+    """Counts the queries run while it is the current request's counter."""
+
+    def __init__(self):
+        self.count = 0
+
+
+def _count_query(execute, sql, params, many, context):
+    queries = _request_queries.get()
+    if queries is not None:
+        queries.count += 1
+    return execute(sql, params, many, context)
+
+
+def install_query_counter(conn):
+    """
+    Add the request query counter to a database connection's execute
+    wrappers. Connections are per thread; signals.py installs it on each
+    one as it is opened.
+    """
+    if _count_query not in conn.execute_wrappers:
+        conn.execute_wrappers.insert(0, _count_query)
+
+
+class MetricsMiddleware:
+    """
+    Record each request's duration and query count by view, and list the
+    pipeline stages it ran in a Server-Timing header.
+
+    Works as sync or async middleware, so under ASGI requests to async
+    views (the scan event stream) are not handed to a worker thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not get_metrics_settings()['ENABLED']:
+            return self.get_response(request)
+
+        install_query_counter(connection)
+        queries, stages = QueryCounter(), []
+        tokens = _request_queries.set(queries), _request_stages.set(stages)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            self._reset(tokens)
+        return self._record(request, response, queries, stages, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        if not get_metrics_settings()['ENABLED']:
+            return await self.get_response(request)
+
+        queries, stages = QueryCounter(), []
+        tokens = _request_queries.set(queries), _request_stages.set(stages)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._reset(tokens)
+        return self._record(request, response, queries, stages, time.perf_counter() - start)
+
+    @staticmethod
+    def _reset(tokens):
+        queries_token, stages_token = tokens
+        _request_queries.reset(queries_token)
+        _request_stages.reset(stages_token)
+
+    def _record(self, request, response, queries, stages, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else 'unmatched'
+        REQUEST_SECONDS.observe(elapsed, view=view, method=request.method)
+        REQUEST_QUERIES.observe(queries.count, view=view)
+
+        timings = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in stages]
+        timings.append(f'db;desc="{queries.count} queries"')
+        timings.append(f'total;dur={elapsed * 1000:.1f}')
+        response['Server-Timing'] = ', '.join(timings)
+        return response
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        try:
+            body = REGISTRY.render().encode('utf-8')
+        finally:
+            # The queue gauge queried the database from this server thread
+            connection.close()
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(port, addr=''):
+    """
+    Serve the metrics over HTTP from a daemon thread, for processes without
+    a web server of their own (the scan worker). Returns the server.
+    """
+    server = ThreadingHTTPServer((addr, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessibilityRemediationTip',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('issue_type', models.CharField(choices=[('img_alt', 'Missing Alt Text'), ('heading_structure', 'Improper Heading Structure'), ('color_contrast', 'Insufficient Color Contrast'), ('form_labels', 'Missing Form Labels'), ('keyboard_nav', 'Keyboard Navigation Issues'), ('aria_misuse', 'ARIA Misuse'), ('semantic_markup', 'Improper Semantic Markup'), ('focus_indicator', 'Missing Focus Indicator'), ('link_purpose', 'Unclear Link Purpose'), ('other', 'Other')], max_length=50)),
+                ('severity', models.CharField(choices=[('critical', 'Critical'), ('serious', 'Serious'), ('moderate', 'Moderate'), ('minor', 'Minor')], max_length=20)),
+                ('description', models.TextField(help_text='Description of the issue')),
+                ('solution', models.TextField(help_text='How to fix the issue')),
+                ('code_example_before', models.TextField(blank=True, help_text='Example of problematic code')),
+                ('code_example_after', models.TextField(blank=True, help_text='Example of fixed code')),
+                ('wcag_reference', models.CharField(blank=True, help_text='WCAG guideline reference', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AccessibilityAnalysis',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('input_type', models.CharField(choices=[('url', 'URL'), ('html', 'HTML')], max_length=10)),
+                ('input_data', models.TextField()),
+                ('result_json', models.JSONField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user_ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('user_agent', models.TextField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Accessibility Analysis',
+                'verbose_name_plural': 'Accessibility Analyses',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(blank=True, null=True)),
+                ('html_input', models.TextField(blank=True, null=True)),
+                ('scan_result', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
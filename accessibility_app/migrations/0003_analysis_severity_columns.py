@@ -0,0 +1,57 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0002_scanjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='critical',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='minor',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='moderate',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='score',
+            field=models.PositiveSmallIntegerField(default=100),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='serious',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='accessibilityanalysis',
+            index=models.Index(fields=['user', 'created_at'], name='analysis_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accessibilityanalysis',
+            index=models.Index(fields=['user', 'score', 'created_at'], name='analysis_user_score_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='accessibilityanalysis',
+            index=models.Index(fields=['user', 'total'], name='analysis_user_total_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+BATCH_SIZE = 500
+SEVERITY_LEVELS = ('critical', 'serious', 'moderate', 'minor')
+
+
+def backfill_severity_columns(apps, schema_editor):
+    """Fill the denormalized severity columns from result_json in primary-key batches."""
+    AccessibilityAnalysis = apps.get_model('accessibility_app', 'AccessibilityAnalysis')
+    fields = [*SEVERITY_LEVELS, 'total', 'score']
+
+    last_pk = 0
+    while True:
+        batch = list(
+            AccessibilityAnalysis.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'result_json')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for analysis in batch:
+            summary = (analysis.result_json or {}).get('summary', {})
+            for severity in SEVERITY_LEVELS:
+                setattr(analysis, severity, summary.get(severity, 0))
+            analysis.total = summary.get('total_violations', 0)
+            score = 100 - (analysis.critical * 10 + analysis.serious * 5 + analysis.moderate * 3 + analysis.minor)
+            analysis.score = max(0, min(score, 100))
+
+        AccessibilityAnalysis.objects.bulk_update(batch, fields)
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0003_analysis_severity_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_severity_columns, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0004_backfill_severity_columns'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='accessibilityanalysis',
+            name='analysis_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='accessibilityanalysis',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='analysis_user_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:41
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0005_analysis_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='host',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='accessibilityanalysis',
+            index=models.Index(fields=['host'], name='analysis_host_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,41 @@
+from urllib.parse import urlsplit
+
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_host(apps, schema_editor):
+    """Fill the host column for existing URL analyses in primary-key batches."""
+    AccessibilityAnalysis = apps.get_model('accessibility_app', 'AccessibilityAnalysis')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            AccessibilityAnalysis.objects.filter(pk__gt=last_pk, input_type='url')
+            .order_by('pk')
+            .only('pk', 'input_data')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        for analysis in batch:
+            try:
+                analysis.host = (urlsplit(analysis.input_data.strip()).hostname or '')[:255]
+            except ValueError:
+                analysis.host = ''
+
+        AccessibilityAnalysis.objects.bulk_update(batch, ['host'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0006_analysis_host'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_host, migrations.RunPython.noop),
+    ]
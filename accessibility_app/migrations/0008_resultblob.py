@@ -0,0 +1,60 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0007_backfill_analysis_host'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResultBlob',
+            fields=[
+                ('digest', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('codec', models.CharField(choices=[('zlib', 'zlib'), ('zstd', 'zstd')], default='zlib', max_length=8)),
+                ('size', models.PositiveIntegerField(help_text='Uncompressed size in bytes')),
+                ('data', models.BinaryField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        # input_data becomes input_text on the same column; HTML bodies move to input_blob
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name='accessibilityanalysis',
+                    old_name='input_data',
+                    new_name='input_text',
+                ),
+                migrations.AlterField(
+                    model_name='accessibilityanalysis',
+                    name='input_text',
+                    field=models.TextField(blank=True, db_column='input_data', default=''),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='input_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accessibility_app.resultblob'),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='result_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accessibility_app.resultblob'),
+        ),
+        migrations.AddField(
+            model_name='scanhistory',
+            name='input_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accessibility_app.resultblob'),
+        ),
+        migrations.AddField(
+            model_name='scanhistory',
+            name='result_blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accessibility_app.resultblob'),
+        ),
+    ]
@@ -0,0 +1,74 @@
+from django.db import migrations
+
+from accessibility_app import blobs
+
+
+BATCH_SIZE = 500
+
+
+def _blob(ResultBlob, pending, raw):
+    blob = blobs.build_blob(raw, model=ResultBlob)
+    pending.append(blob)
+    return blob.digest
+
+
+def move_to_blobs(apps, schema_editor):
+    """
+    Compress results and HTML inputs into ResultBlob rows in primary-key
+    batches. Identical content across rows and tables shares one blob.
+    """
+    ResultBlob = apps.get_model('accessibility_app', 'ResultBlob')
+    AccessibilityAnalysis = apps.get_model('accessibility_app', 'AccessibilityAnalysis')
+    ScanHistory = apps.get_model('accessibility_app', 'ScanHistory')
+
+    last_pk = 0
+    while True:
+        batch = list(
+            AccessibilityAnalysis.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'input_type', 'input_text', 'result_json')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        pending = []
+        for analysis in batch:
+            analysis.result_blob_id = _blob(ResultBlob, pending, blobs.encode_json(analysis.result_json))
+            if analysis.input_type == 'html':
+                analysis.input_blob_id = _blob(ResultBlob, pending, blobs.encode_text(analysis.input_text))
+                analysis.input_text = ''
+
+        blobs.save_blobs(pending, model=ResultBlob)
+        AccessibilityAnalysis.objects.bulk_update(batch, ['result_blob', 'input_blob', 'input_text'])
+        last_pk = batch[-1].pk
+
+    last_pk = 0
+    while True:
+        batch = list(
+            ScanHistory.objects.filter(pk__gt=last_pk)
+            .order_by('pk')
+            .only('pk', 'html_input', 'scan_result')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+
+        pending = []
+        for history in batch:
+            history.result_blob_id = _blob(ResultBlob, pending, blobs.encode_json(history.scan_result))
+            if history.html_input:
+                history.input_blob_id = _blob(ResultBlob, pending, blobs.encode_text(history.html_input))
+
+        blobs.save_blobs(pending, model=ResultBlob)
+        ScanHistory.objects.bulk_update(batch, ['result_blob', 'input_blob'])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0008_resultblob'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_to_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0009_backfill_result_blobs'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='accessibilityanalysis',
+            name='result_json',
+        ),
+        migrations.RemoveField(
+            model_name='scanhistory',
+            name='html_input',
+        ),
+        migrations.RemoveField(
+            model_name='scanhistory',
+            name='scan_result',
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0010_remove_inline_results'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='progress',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
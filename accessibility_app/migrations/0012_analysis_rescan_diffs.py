@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0011_scanjob_progress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='delta_base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accessibility_app.accessibilityanalysis'),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='delta_depth',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='fixed_issues',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='new_issues',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='accessibilityanalysis',
+            name='previous',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accessibility_app.accessibilityanalysis'),
+        ),
+        migrations.AddIndex(
+            model_name='accessibilityanalysis',
+            index=models.Index(fields=['user', 'host', '-created_at'], name='analysis_user_host_idx'),
+        ),
+    ]
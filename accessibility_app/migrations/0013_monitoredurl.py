@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:54
+
+import datetime
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0012_analysis_rescan_diffs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonitoredURL',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=2000)),
+                ('host', models.CharField(blank=True, default='', max_length=255)),
+                ('interval', models.DurationField(default=datetime.timedelta(days=1), help_text='Time between scans')),
+                ('is_active', models.BooleanField(default=True)),
+                ('next_scan_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('etag', models.CharField(blank=True, max_length=255)),
+                ('last_modified', models.CharField(blank=True, max_length=64)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('last_checked_at', models.DateTimeField(blank=True, null=True)),
+                ('last_scanned_at', models.DateTimeField(blank=True, null=True)),
+                ('last_outcome', models.CharField(blank=True, choices=[('scanned', 'Scanned'), ('unchanged', 'Unchanged'), ('failed', 'Failed')], max_length=10)),
+                ('last_error', models.TextField(blank=True)),
+                ('consecutive_failures', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_analysis', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accessibility_app.accessibilityanalysis')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Monitored URL',
+                'indexes': [models.Index(fields=['is_active', 'next_scan_at'], name='monitored_url_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'url'), name='monitored_url_unique_per_user')],
+            },
+        ),
+    ]
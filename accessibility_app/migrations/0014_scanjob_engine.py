@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0013_monitoredurl'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='engine',
+            field=models.CharField(blank=True, choices=[('axe', 'axe-core'), ('lxml', 'Structural rules only (in-process)'), ('prefilter', 'Structural rules in-process, axe-core for the rest')], max_length=10),
+        ),
+    ]
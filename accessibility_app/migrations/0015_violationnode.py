@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0014_scanjob_engine'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViolationNode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rule_id', models.CharField(max_length=100)),
+                ('impact', models.CharField(blank=True, default='', max_length=10)),
+                ('target', models.TextField()),
+                ('snippet_hash', models.CharField(max_length=40)),
+                ('analysis', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='violation_nodes', to='accessibility_app.accessibilityanalysis')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rule_id', 'impact'], name='violation_rule_impact_idx'), models.Index(fields=['analysis', 'rule_id'], name='violation_analysis_rule_idx')],
+            },
+        ),
+    ]
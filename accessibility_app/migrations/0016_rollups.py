@@ -0,0 +1,43 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0015_violationnode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RuleRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('rule_id', models.CharField(max_length=100)),
+                ('impact', models.CharField(blank=True, default='', max_length=10)),
+                ('analyses', models.PositiveIntegerField(default=0)),
+                ('nodes', models.PositiveIntegerField(default=0)),
+                ('fixed', models.PositiveIntegerField(default=0)),
+                ('fix_seconds', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('period', 'period_start', 'rule_id', 'impact'), name='rule_rollup_key')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScanRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('period_start', models.DateField()),
+                ('analyses', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('period', 'period_start'), name='scan_rollup_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0016_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanhistory',
+            name='analysis',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accessibility_app.accessibilityanalysis'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0017_scanhistory_analysis'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
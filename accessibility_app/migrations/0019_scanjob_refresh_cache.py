@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0018_scanjob_attempts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='refresh_cache',
+            field=models.BooleanField(default=False),
+        ),
+    ]
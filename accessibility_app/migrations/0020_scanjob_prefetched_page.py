@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0019_scanjob_refresh_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='page_html',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='scanjob',
+            name='page_url',
+            field=models.URLField(blank=True, max_length=2048),
+        ),
+    ]
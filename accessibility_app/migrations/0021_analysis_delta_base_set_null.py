@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0020_scanjob_prefetched_page'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='accessibilityanalysis',
+            name='delta_base',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accessibility_app.accessibilityanalysis'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 12:07
+
+from django.db import migrations, models
+
+
+def start_leases_at_claim(apps, schema_editor):
+    """Jobs running during the upgrade keep the lease they were claimed with."""
+    ScanJob = apps.get_model('accessibility_app', 'ScanJob')
+    ScanJob.objects.filter(status='running').update(heartbeat_at=models.F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accessibility_app', '0021_analysis_delta_base_set_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scanjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_leases_at_claim, migrations.RunPython.noop),
+    ]
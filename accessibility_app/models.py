@@ -1,9 +1,101 @@
+from collections import OrderedDict
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.conf import settings
 from django.db import models
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+from . import blobs, diffs
+
+
+SEVERITY_LEVELS = ('critical', 'serious', 'moderate', 'minor')
+
+
+def compute_score(critical=0, serious=0, moderate=0, minor=0):
+    """Accessibility score (0-100) from violation severity counts."""
+    score = 100 - (critical * 10 + serious * 5 + moderate * 3 + minor * 1)
+    return max(0, min(score, 100))  # Ensure the score is between 0 and 100
 
-class AccessibilityAnalysis(models.Model):
+
+def host_from_url(url):
+    """Return the lower-cased host name of a URL, or '' if it has none."""
+    try:
+        return (urlsplit(url.strip()).hostname or '')[:255]
+    except ValueError:
+        return ''
+
+
+class ResultBlob(models.Model):
+    """
+    A compressed scan result or HTML input, stored once per distinct content.
+    """
+
+    CODEC_CHOICES = [(blobs.CODEC_ZLIB, 'zlib'), (blobs.CODEC_ZSTD, 'zstd')]
+
+    # SHA-256 of the uncompressed content
+    digest = models.CharField(max_length=64, primary_key=True)
+    codec = models.CharField(max_length=8, choices=CODEC_CHOICES, default=blobs.CODEC_ZLIB)
+    size = models.PositiveIntegerField(help_text="Uncompressed size in bytes")
+    data = models.BinaryField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.digest[:12]} ({self.size} bytes, {self.codec})"
+
+    def read(self):
+        """Return the uncompressed content."""
+        return blobs.decompress(self.data, self.codec)
+
+
+class BlobBackedMixin:
+    """
+    Properties backed by a ResultBlob foreign key.
+
+    Values are decompressed on first access and kept on the instance.
+    Assigned values are staged until store_blobs() (called from save())
+    writes them.
+    """
+
+    def _read_blob(self, field, decode):
+        values = self.__dict__.setdefault('_blob_values', {})
+        if field not in values:
+            blob_id = getattr(self, f'{field}_id')
+            values[field] = None if blob_id is None else decode(getattr(self, field).read())
+        return values[field]
+
+    def _write_blob(self, field, value, encode):
+        self.__dict__.setdefault('_blob_values', {})[field] = value
+        staged = self.__dict__.setdefault('_staged_blobs', {})
+        if value is None:
+            staged.pop(field, None)
+            setattr(self, field, None)
+        else:
+            staged[field] = encode(value)
+
+    def staged_blobs(self):
+        """
+        Build ResultBlob instances for assigned values and point the foreign
+        keys at them. The blobs still have to be saved with blobs.save_blobs().
+        """
+        built = []
+        for field, raw in self.__dict__.pop('_staged_blobs', {}).items():
+            blob = blobs.build_blob(raw)
+            setattr(self, field, blob)
+            built.append(blob)
+        return built
+
+    def store_blobs(self):
+        blobs.save_blobs(self.staged_blobs())
+
+    def refresh_from_db(self, *args, **kwargs):
+        self.__dict__.pop('_blob_values', None)
+        self.__dict__.pop('_staged_blobs', None)
+        super().refresh_from_db(*args, **kwargs)
+
+
+class AccessibilityAnalysis(BlobBackedMixin, models.Model):
     """
     Model to store accessibility analysis results along with user history.
     """
@@ -12,10 +104,33 @@ class AccessibilityAnalysis(models.Model):
 
     # Input data
     input_type = models.CharField(max_length=10, choices=[('url', 'URL'), ('html', 'HTML')])
-    input_data = models.TextField()
+    # URL inputs are kept inline; HTML inputs go to input_blob. Use input_data.
+    input_text = models.TextField(blank=True, default='', db_column='input_data')
+    input_blob = models.ForeignKey(ResultBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+
+    # Analysis results (compressed JSON). Use result_json.
+    result_blob = models.ForeignKey(ResultBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
 
-    # Analysis results (full JSON data)
-    result_json = models.JSONField()
+    # Denormalized from result_json['summary'] on save, for SQL sorting and filtering
+    critical = models.PositiveIntegerField(default=0)
+    serious = models.PositiveIntegerField(default=0)
+    moderate = models.PositiveIntegerField(default=0)
+    minor = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    score = models.PositiveSmallIntegerField(default=100)
+
+    # Lower-cased host of URL inputs; indexed for admin search
+    host = models.CharField(max_length=255, blank=True, default='')
+
+    # Rescans of a URL are compared with the user's previous scan of it
+    previous = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    new_issues = models.PositiveIntegerField(null=True, blank=True)
+    fixed_issues = models.PositiveIntegerField(null=True, blank=True)
+    # When set, result_blob holds a delta against this analysis' result.
+    # Deleting a base first re-snapshots its dependents (see snapshot_dependents()).
+    delta_base = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Number of deltas back to the last full snapshot (0 = full result stored)
+    delta_depth = models.PositiveSmallIntegerField(default=0)
 
     # Metadata
     created_at = models.DateTimeField(default=timezone.now)
@@ -26,6 +141,13 @@ class AccessibilityAnalysis(models.Model):
         verbose_name = "Accessibility Analysis"
         verbose_name_plural = "Accessibility Analyses"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='analysis_user_recent_idx'),
+            models.Index(fields=['user', 'score', 'created_at'], name='analysis_user_score_idx'),
+            models.Index(fields=['user', 'total'], name='analysis_user_total_idx'),
+            models.Index(fields=['host'], name='analysis_host_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['user', 'host', '-created_at'], name='analysis_user_host_idx'),
+        ]
 
     def __str__(self):
         if self.input_type == 'url':
@@ -33,19 +155,158 @@ class AccessibilityAnalysis(models.Model):
         else:
             return f"HTML Analysis ({self.created_at.strftime('%Y-%m-%d %H:%M')})"
 
+    @property
+    def input_data(self):
+        """The analyzed URL, or the HTML input (decompressed on first access)."""
+        if self.input_blob_id is not None or 'input_blob' in self.__dict__.get('_staged_blobs', {}):
+            return self._read_blob('input_blob', blobs.decode_text)
+        return self.input_text
+
+    @input_data.setter
+    def input_data(self, value):
+        self.__dict__.setdefault('_changed', set()).add('input_data')
+        if self.input_type == 'html':
+            self.input_text = ''
+            self._write_blob('input_blob', value, blobs.encode_text)
+        else:
+            self.input_text = value
+            self._write_blob('input_blob', None, blobs.encode_text)
+
+    @property
+    def result_json(self):
+        """The full axe result, decompressed (and rebuilt from its delta) on first access."""
+        result = self._read_blob('result_blob', blobs.decode_json)
+        if diffs.is_delta(result):
+            result = diffs.apply_delta(self.delta_base.result_json, result)
+            self._blob_values['result_blob'] = result
+        return result
+
+    @result_json.setter
+    def result_json(self, value):
+        # Later scans may be stored as deltas against this result, so it is written once, on creation
+        self.__dict__.setdefault('_changed', set()).add('result_json')
+        self._write_blob('result_blob', value, blobs.encode_json)
+
     @property
     def summary(self):
         """Return the summary portion of the analysis result."""
-        return self.result_json.get('summary', {})
+        return (self.result_json or {}).get('summary', {})
 
     @property
     def violations(self):
         """Return the list of violations from the result."""
-        return self.result_json.get('violations', [])
+        return (self.result_json or {}).get('violations', [])
+
+    def update_severity_counts(self):
+        """
+        Copy the severity counts and score from result_json into their columns.
+        """
+        summary = (self.result_json or {}).get('summary', {})
+        for severity in SEVERITY_LEVELS:
+            setattr(self, severity, summary.get(severity, 0))
+        self.total = summary.get('total_violations', 0)
+        self.score = compute_score(self.critical, self.serious, self.moderate, self.minor)
+
+    def populate_derived_fields(self):
+        """
+        Fill every column derived from result_json and input_data.
+        Called from save(); call it directly before bulk_create(), after
+        saving the blobs from staged_blobs().
+        """
+        self.update_severity_counts()
+        self.host = host_from_url(self.input_text) if self.input_type == 'url' else ''
+
+    def diff_against_previous(self):
+        """
+        Compare a new URL scan with the same user's latest scan of that URL,
+        recording new/fixed issue counts. An unchanged result shares that
+        scan's stored blob. Otherwise it is stored as a delta against that
+        scan, except every RESCAN_SNAPSHOT_EVERY scans, when a full snapshot
+        is kept so rebuilding never walks a long chain.
+
+        Called from save() for new rows; call it before staged_blobs() when
+        using bulk_create(). Requires populate_derived_fields() first.
+        """
+        if self.input_type != 'url' or self.user_id is None or 'result_blob' not in self.__dict__.get('_staged_blobs', {}):
+            return
+        previous = (
+            AccessibilityAnalysis.objects.filter(user_id=self.user_id, host=self.host, input_type='url')
+            .filter(input_text=self.input_text)
+            .exclude(pk=self.pk)
+            .only('id', 'result_blob', 'delta_base', 'delta_depth')
+            .order_by('-created_at', '-id')
+            .first()
+        )
+        if previous is None:
+            return
+
+        delta = diffs.make_delta(previous.result_json, self.result_json)
+        self.previous = previous
+        self.new_issues = len(delta.added)
+        self.fixed_issues = len(delta.resolved)
+        if not delta.added and not delta.resolved and self.result_json == previous.result_json:
+            # Unchanged: share the previous scan's stored result (and its base) instead of writing a delta
+            del self._staged_blobs['result_blob']
+            self.result_blob_id = previous.result_blob_id
+            self.delta_base_id = previous.delta_base_id
+            self.delta_depth = previous.delta_depth
+        elif previous.delta_depth + 1 < getattr(settings, 'RESCAN_SNAPSHOT_EVERY', 10):
+            self.delta_base = previous
+            self.delta_depth = previous.delta_depth + 1
+            self._staged_blobs['result_blob'] = blobs.encode_json(delta.doc)
+
+    def compare_with_previous(self):
+        """Return the diffs.ScanDiff against the previous scan, or None if there is none."""
+        if self.previous_id is None:
+            return None
+        return diffs.compare(self.previous.result_json, self.result_json)
+
+    def snapshot_dependents(self):
+        """
+        Store the full result of every scan kept as a delta against this one,
+        so this analysis can be deleted without breaking them. Called from a
+        pre_delete handler.
+        """
+        dependents = list(
+            AccessibilityAnalysis.objects.filter(delta_base=self).only('id', 'result_blob', 'delta_base', 'delta_depth')
+        )
+        for dependent in dependents:
+            dependent.delta_base = self
+            dependent._write_blob('result_blob', dependent.result_json, blobs.encode_json)
+            dependent.delta_base = None
+            dependent.delta_depth = 0
+        blobs.save_blobs([blob for dependent in dependents for blob in dependent.staged_blobs()])
+        AccessibilityAnalysis.objects.bulk_update(dependents, ['result_blob', 'delta_base', 'delta_depth'])
+
+    def save(self, *args, **kwargs):
+        changed = self.__dict__.pop('_changed', set())
+        # Only re-derive when the inputs changed, so saving other fields never decompresses the result
+        if self._state.adding or changed:
+            self.populate_derived_fields()
+        if self._state.adding:
+            self.diff_against_previous()
+        self.store_blobs()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if update_fields & {'result_json', 'result_blob'}:
+                update_fields.discard('result_json')
+                update_fields |= {'result_blob', *SEVERITY_LEVELS, 'total', 'score'}
+            if update_fields & {'input_data', 'input_type', 'input_text', 'input_blob'}:
+                update_fields.discard('input_data')
+                update_fields |= {'input_text', 'input_blob', 'host'}
+            kwargs['update_fields'] = update_fields
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        if adding:
+            from .rollups import record_analyses
+
+            store_violation_nodes([(self.pk, self.result_json)])
+            record_analyses([self])
 
     def total_violations(self):
         """Return the total number of violations."""
-        return self.summary.get('total_violations', 0)
+        return self.total
     
 
     def get_severity_count(self, severity):
@@ -53,28 +314,178 @@ class AccessibilityAnalysis(models.Model):
         Get the number of violations of a specific severity.
         Valid severities: critical, serious, moderate, minor.
         """
-        return self.summary.get(severity, 0)
+        if severity in SEVERITY_LEVELS:
+            return getattr(self, severity)
+        return 0
     
     def calculate_score(self):
-        """Calculate the accessibility score based on violation severity counts."""
-        critical = self.get_severity_count("critical")
-        serious = self.get_severity_count("serious")
-        moderate = self.get_severity_count("moderate")
-        minor = self.get_severity_count("minor")
-
-        score = 100 - (critical * 10 + serious * 5 + moderate * 3 + minor * 1)
-        return max(0, min(score, 100))  # Ensure the score is between 0 and 100
+        """Return the accessibility score based on violation severity counts."""
+        return self.score
     
 
-class ScanHistory(models.Model):
+class ViolationNode(models.Model):
+    """
+    One violation node of an analysis, copied out of result_json when the
+    analysis is saved so questions across scans (which analyses fail a
+    rule, which selectors fail most often) run as indexed SQL.
+    """
+
+    # Indexed through (analysis, rule_id) below
+    analysis = models.ForeignKey(AccessibilityAnalysis, on_delete=models.CASCADE, related_name='violation_nodes', db_index=False)
+    rule_id = models.CharField(max_length=100)
+    impact = models.CharField(max_length=10, blank=True, default='')
+    # axe target selector; selectors through iframes or shadow roots are joined with ' >>> '
+    target = models.TextField()
+    # diffs.snippet_hash() of the node's HTML
+    snippet_hash = models.CharField(max_length=40)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['rule_id', 'impact'], name='violation_rule_impact_idx'),
+            models.Index(fields=['analysis', 'rule_id'], name='violation_analysis_rule_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rule_id} at {self.target[:50]} (analysis #{self.analysis_id})"
+
+    @classmethod
+    def from_result(cls, analysis_id, result):
+        """Unsaved ViolationNode rows for every node of an axe result."""
+        return [
+            cls(
+                analysis_id=analysis_id,
+                rule_id=(violation.get('id') or '')[:100],
+                impact=violation.get('impact') or '',
+                target=' >>> '.join(str(selector) for selector in node.get('target', [])),
+                snippet_hash=diffs.snippet_hash(node.get('html', '')),
+            )
+            for violation in (result or {}).get('violations', [])
+            for node in violation.get('nodes', [])
+        ]
+
+
+# Rows per INSERT when writing violation nodes
+VIOLATION_NODE_BATCH_SIZE = 1000
+
+
+def store_violation_nodes(results, batch_size=VIOLATION_NODE_BATCH_SIZE):
+    """
+    Write the ViolationNode rows for (analysis ID, axe result) pairs. Saving
+    an analysis does this; call it after bulk_create(), which skips save().
+    Returns the number of rows written.
+    """
+    nodes = [node for analysis_id, result in results for node in ViolationNode.from_result(analysis_id, result)]
+    ViolationNode.objects.bulk_create(nodes, batch_size=batch_size)
+    return len(nodes)
+
+
+class RuleRollup(models.Model):
+    """
+    Per day or ISO week: analyses and violation nodes with each rule and
+    impact, and nodes that rescans fixed, with the time they took. Kept up
+    to date by rollups.record_analyses(); rebuilt by rollups.rebuild().
+    """
+
+    PERIOD_DAY = 'day'
+    PERIOD_WEEK = 'week'
+    PERIOD_CHOICES = [(PERIOD_DAY, 'Day'), (PERIOD_WEEK, 'Week')]
+
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    period_start = models.DateField()
+    rule_id = models.CharField(max_length=100)
+    impact = models.CharField(max_length=10, blank=True, default='')
+    analyses = models.PositiveIntegerField(default=0)
+    nodes = models.PositiveIntegerField(default=0)
+    # Nodes fixed by a rescan in this period, and the seconds from first seen to fixed, summed
+    fixed = models.PositiveIntegerField(default=0)
+    fix_seconds = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'period_start', 'rule_id', 'impact'], name='rule_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.rule_id} ({self.impact}), {self.period} of {self.period_start}"
+
+
+class ScanRollup(models.Model):
+    """Per day or ISO week: analyses and their summed scores."""
+
+    period = models.CharField(max_length=4, choices=RuleRollup.PERIOD_CHOICES)
+    period_start = models.DateField()
+    analyses = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'period_start'], name='scan_rollup_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.analyses} analyses, {self.period} of {self.period_start}"
+
+
+class RecentResults:
+    """
+    Decodes stored results read in bulk (blob data, codec and delta base
+    ID) in creation order. Recently decoded results are kept, up to
+    ``size``, so a rescan stored as a delta is usually rebuilt without a
+    query for its base.
+    """
+
+    def __init__(self, size=64):
+        self.size = size
+        self._results = OrderedDict()
+
+    def decode(self, pk, data, codec, base_id):
+        result = blobs.decode_json(blobs.decompress(data, codec)) if data is not None else {}
+        if diffs.is_delta(result):
+            base = self._results.get(base_id)
+            if base is None:
+                # The base was read long ago, or not at all
+                base = AccessibilityAnalysis.objects.only('result_blob', 'delta_base').get(pk=base_id).result_json
+            result = diffs.apply_delta(base, result)
+        self._results[pk] = result
+        if len(self._results) > self.size:
+            self._results.popitem(last=False)
+        return result
+
+
+class ScanHistory(BlobBackedMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     url = models.URLField(blank=True, null=True)
-    html_input = models.TextField(blank=True, null=True)
-    scan_result = models.JSONField()
+    # The scan's result is read from its analysis rather than stored again
+    analysis = models.ForeignKey(AccessibilityAnalysis, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Shared with the matching AccessibilityAnalysis blobs. Use html_input and scan_result.
+    input_blob = models.ForeignKey(ResultBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    result_blob = models.ForeignKey(ResultBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.user.username} - {self.url or 'HTML Input'}"
+
+    @property
+    def html_input(self):
+        return self._read_blob('input_blob', blobs.decode_text)
+
+    @html_input.setter
+    def html_input(self, value):
+        self._write_blob('input_blob', value, blobs.encode_text)
+
+    @property
+    def scan_result(self):
+        if self.result_blob_id is None and self.analysis_id is not None:
+            return self.analysis.result_json
+        return self._read_blob('result_blob', blobs.decode_json)
+
+    @scan_result.setter
+    def scan_result(self, value):
+        self._write_blob('result_blob', value, blobs.encode_json)
+
+    def save(self, *args, **kwargs):
+        self.store_blobs()
+        super().save(*args, **kwargs)
     
 
 # Add to models.py
@@ -111,4 +522,130 @@ class AccessibilityRemediationTip(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"{self.get_issue_type_display()} - {self.get_severity_display()}"
\ No newline at end of file
+        return f"{self.get_issue_type_display()} - {self.get_severity_display()}"
+
+class ScanJob(models.Model):
+    """
+    A queued accessibility scan, processed outside the request/response cycle.
+    """
+
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    # Engines for HTML input; URLs are always scanned with axe-core
+    ENGINE_AXE = 'axe'
+    ENGINE_LXML = 'lxml'
+    ENGINE_PREFILTER = 'prefilter'
+
+    ENGINE_CHOICES = [
+        (ENGINE_AXE, 'axe-core'),
+        (ENGINE_LXML, 'Structural rules only (in-process)'),
+        (ENGINE_PREFILTER, 'Structural rules in-process, axe-core for the rest'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    input_type = models.CharField(max_length=10, choices=[('url', 'URL'), ('html', 'HTML')])
+    input_data = models.TextField()
+    # Blank uses SCANNER['HTML_ENGINE']
+    engine = models.CharField(max_length=10, choices=ENGINE_CHOICES, blank=True)
+    # Scan afresh and replace any cached result; set for monitor rescans of changed pages
+    refresh_cache = models.BooleanField(default=False)
+    # Page fetched before queueing in SCANNER['URL_MODE'] = 'prefetched' (final URL and body).
+    # The worker scans it instead of fetching the URL again; cleared when the job finishes.
+    page_url = models.URLField(max_length=2048, blank=True)
+    page_html = models.TextField(blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    analysis = models.ForeignKey(AccessibilityAnalysis, on_delete=models.SET_NULL, null=True, blank=True)
+    error = models.TextField(blank=True)
+    # Latest scan phase and partial violation counts, see progress.JobProgress
+    progress = models.JSONField(default=dict, blank=True)
+
+    # Request metadata copied onto the analysis once the scan completes
+    user_ip = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.TextField(null=True, blank=True)
+
+    created_at = models.DateTimeField(default=timezone.now)
+    # Start of the current claim; identifies the worker holding it
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Last lease renewal; a running job is reclaimed once SCAN_JOBS['LEASE'] has passed since
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Scan job #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class MonitoredURL(models.Model):
+    """
+    A URL rescanned on a schedule by the monitor (see monitoring.py).
+    """
+
+    OUTCOME_SCANNED = 'scanned'
+    OUTCOME_UNCHANGED = 'unchanged'
+    OUTCOME_FAILED = 'failed'
+
+    OUTCOME_CHOICES = [
+        (OUTCOME_SCANNED, 'Scanned'),
+        (OUTCOME_UNCHANGED, 'Unchanged'),
+        (OUTCOME_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    url = models.URLField(max_length=2000)
+    host = models.CharField(max_length=255, blank=True, default='')
+    interval = models.DurationField(default=timedelta(days=1), help_text="Time between scans")
+    is_active = models.BooleanField(default=True)
+    next_scan_at = models.DateTimeField(default=timezone.now)
+
+    # Validators and content hash from the last visit, used to skip unchanged pages
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=64, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    last_scanned_at = models.DateTimeField(null=True, blank=True)
+    last_outcome = models.CharField(max_length=10, choices=OUTCOME_CHOICES, blank=True)
+    last_error = models.TextField(blank=True)
+    consecutive_failures = models.PositiveSmallIntegerField(default=0)
+    last_analysis = models.ForeignKey(AccessibilityAnalysis, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Monitored URL"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'url'], name='monitored_url_unique_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['is_active', 'next_scan_at'], name='monitored_url_due_idx'),
+        ]
+
+    def __str__(self):
+        return self.url
+
+    def save(self, *args, **kwargs):
+        self.host = host_from_url(self.url)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'url' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'host'}
+        super().save(*args, **kwargs)
@@ -0,0 +1,210 @@
+"""
+Scheduled rescans of MonitoredURL rows.
+
+A monitor run takes the URLs that are due, interleaves them by host and
+visits them on a fixed pool of threads. Visits to one host are spaced at
+least HOST_MIN_INTERVAL seconds apart. Each visit first sends a conditional
+GET with the stored ETag/Last-Modified. A page that answers 304, or whose
+normalized body hashes to the last scanned content, is not rescanned. The
+next visit is scheduled with random jitter, so URLs added together drift
+apart instead of coming due at the same moment. Nothing new is started
+after MAX_RUNTIME; URLs left over stay due for the next run.
+"""
+import collections
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .fetch import FetchError, conditional_get, is_complete, url_scan_mode
+from .jobs import run_job
+from .models import MonitoredURL, ScanJob
+
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+OUTCOME_DEFERRED = 'deferred'
+
+
+def get_monitor_settings():
+    config = getattr(settings, 'MONITOR', {})
+    return {
+        'WORKERS': config.get('WORKERS', 4),
+        'HOST_MIN_INTERVAL': config.get('HOST_MIN_INTERVAL', 10),
+        'JITTER': config.get('JITTER', 0.1),
+        'MAX_RUNTIME': config.get('MAX_RUNTIME', 4 * 60 * 60),
+        'BATCH_SIZE': config.get('BATCH_SIZE', 1000),
+        'RETRY_AFTER': config.get('RETRY_AFTER', 15 * 60),
+    }
+
+
+class HostThrottle:
+    """
+    Hands out visit slots per host, at least ``min_interval`` seconds apart.
+    """
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, host):
+        """Reserve the host's next slot and return how many seconds away it is."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+            return slot - now
+
+    def wait(self, host):
+        delay = self.reserve(host)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def interleave_by_host(monitored_urls):
+    """
+    Order URLs round-robin across hosts, so the pool works on many origins at
+    once instead of queueing behind one host's throttle.
+    """
+    by_host = collections.OrderedDict()
+    for monitored in monitored_urls:
+        by_host.setdefault(monitored.host, collections.deque()).append(monitored)
+
+    ordered = []
+    while by_host:
+        for host in list(by_host):
+            ordered.append(by_host[host].popleft())
+            if not by_host[host]:
+                del by_host[host]
+    return ordered
+
+
+def jittered(interval, jitter):
+    """``interval`` (a timedelta) scaled by a random factor in [1 - jitter, 1 + jitter]."""
+    return interval * (1 + random.uniform(-jitter, jitter))
+
+
+def content_hash(text):
+    return hashlib.sha256(WHITESPACE_RE.sub(' ', text).strip().encode('utf-8')).hexdigest()
+
+
+def scan_monitored_url(monitored, page=None):
+    """
+    Scan the URL through the regular job pipeline and return the finished
+    ScanJob. In SCANNER['URL_MODE'] = 'prefetched', ``page`` (the body the
+    monitor just fetched) is scanned instead of fetching the URL again.
+    """
+    prefetched = page is not None and url_scan_mode() == 'prefetched' and is_complete(page)
+    job = ScanJob.objects.create(
+        user_id=monitored.user_id,
+        input_type='url',
+        input_data=monitored.url,
+        status=ScanJob.STATUS_RUNNING,
+        started_at=timezone.now(),
+        attempts=1,
+        # The page just changed, so a cached result of it is out of date
+        refresh_cache=True,
+        page_url=page.url if prefetched else '',
+        page_html=page.text if prefetched else '',
+        user_agent='AccessiScan monitor',
+    )
+    return run_job(job)
+
+
+def visit(monitored, throttle, config):
+    """
+    Check one monitored URL for changes, rescan it if it changed, and
+    schedule its next visit. Returns the outcome.
+    """
+    throttle.wait(monitored.host)
+    now = timezone.now()
+    monitored.last_checked_at = now
+    try:
+        page = conditional_get(monitored.url, monitored.etag, monitored.last_modified)
+        if not page.not_modified and page.status_code != 200:
+            raise FetchError(f"HTTP {page.status_code}")
+
+        digest = monitored.content_hash if page.not_modified else content_hash(page.text)
+        if page.not_modified or digest == monitored.content_hash:
+            outcome = MonitoredURL.OUTCOME_UNCHANGED
+        else:
+            job = scan_monitored_url(monitored, page)
+            if job.status != ScanJob.STATUS_DONE:
+                raise FetchError(job.error or 'Scan failed')
+            monitored.last_analysis_id = job.analysis_id
+            monitored.last_scanned_at = now
+            outcome = MonitoredURL.OUTCOME_SCANNED
+
+        monitored.etag = page.etag[:255]
+        monitored.last_modified = page.last_modified[:64]
+        monitored.content_hash = digest
+        monitored.last_error = ''
+        monitored.consecutive_failures = 0
+        monitored.next_scan_at = now + jittered(monitored.interval, config['JITTER'])
+    except Exception as e:
+        outcome = MonitoredURL.OUTCOME_FAILED
+        monitored.last_error = str(e)
+        monitored.consecutive_failures += 1
+        retry = timedelta(seconds=config['RETRY_AFTER'] * 2 ** (monitored.consecutive_failures - 1))
+        monitored.next_scan_at = now + min(monitored.interval, jittered(retry, config['JITTER']))
+
+    monitored.last_outcome = outcome
+    monitored.save(update_fields=[
+        'last_checked_at', 'last_scanned_at', 'last_outcome', 'last_error', 'consecutive_failures',
+        'last_analysis', 'etag', 'last_modified', 'content_hash', 'next_scan_at',
+    ])
+    return outcome
+
+
+def run_monitor(workers=None, max_runtime=None):
+    """
+    Visit every due monitored URL on ``workers`` threads, stopping dispatch
+    after ``max_runtime`` seconds. Returns a Counter of visit outcomes.
+    """
+    config = get_monitor_settings()
+    workers = workers or config['WORKERS']
+    max_runtime = config['MAX_RUNTIME'] if max_runtime is None else max_runtime
+    deadline = time.monotonic() + max_runtime
+    throttle = HostThrottle(config['HOST_MIN_INTERVAL'])
+    outcomes = collections.Counter()
+    started_at = timezone.now()
+
+    def task(monitored):
+        if time.monotonic() >= deadline:
+            return OUTCOME_DEFERRED
+        try:
+            return visit(monitored, throttle, config)
+        except Exception:
+            logger.exception("Monitor visit to %s failed", monitored.url)
+            return MonitoredURL.OUTCOME_FAILED
+        finally:
+            # Pool threads end with the run, so don't leave their connections behind
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while time.monotonic() < deadline:
+            due = list(
+                MonitoredURL.objects.filter(is_active=True, next_scan_at__lte=timezone.now())
+                # Each URL is visited at most once per run, even if it is due again already
+                .filter(Q(last_checked_at__isnull=True) | Q(last_checked_at__lt=started_at))
+                .order_by('next_scan_at')[:config['BATCH_SIZE']]
+            )
+            if not due:
+                break
+            batch = collections.Counter(executor.map(task, interleave_by_host(due)))
+            outcomes.update(batch)
+            if batch[OUTCOME_DEFERRED]:
+                break
+    return outcomes
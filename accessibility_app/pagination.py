@@ -0,0 +1,52 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+def encode_cursor(created_at, pk):
+    """Encode a (created_at, id) position as an opaque URL-safe cursor."""
+    raw = f"{created_at.isoformat()}|{pk}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor(), returning (created_at, id) or None."""
+    if not cursor:
+        return None
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').rsplit('|', 1)
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, pk
+
+
+def keyset_page(queryset, cursor=None, page_size=25):
+    """
+    Return one page of ``queryset`` ordered newest first, plus the cursor for the next page.
+
+    Pages are selected with WHERE (created_at, id) < (cursor) instead of
+    OFFSET, so every page costs the same index range scan no matter how far
+    back the user pages.
+
+    Returns:
+        tuple: (list of objects, next cursor or None)
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    position = decode_cursor(cursor)
+    if position is not None:
+        created_at, pk = position
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor(last.created_at, last.pk)
+    return items, next_cursor
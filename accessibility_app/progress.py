@@ -0,0 +1,126 @@
+"""
+Scan progress: recorded on ScanJob.progress by the worker, streamed to
+browsers as server-sent events.
+
+The worker writes a small JSON snapshot per phase (fetching, loaded, each
+rule group, persisting). The event stream is an async generator that polls
+that row with the async ORM and sleeps in between, so an open connection
+holds no thread while it waits.
+"""
+import asyncio
+import json
+import time
+
+from django.conf import settings
+from django.urls import reverse
+
+from .models import SEVERITY_LEVELS, ScanJob
+
+
+def get_event_settings():
+    config = getattr(settings, 'SCAN_EVENTS', {})
+    return {
+        'POLL_INTERVAL': config.get('POLL_INTERVAL', 0.5),
+        'HEARTBEAT': config.get('HEARTBEAT', 15),
+        'MAX_DURATION': config.get('MAX_DURATION', 600),
+    }
+
+
+class JobProgress:
+    """
+    Callable passed to the scanner as ``on_progress``. Accumulates partial
+    violation counts across rule groups and saves a snapshot for each event.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.counts = dict.fromkeys(SEVERITY_LEVELS, 0)
+        self.groups_done = 0
+        self.groups_total = 0
+        self.group = None
+        self.seq = 0
+
+    def __call__(self, event):
+        if event.get('phase') == 'rules':
+            for level in SEVERITY_LEVELS:
+                self.counts[level] += event.get('counts', {}).get(level, 0)
+            self.group = event.get('group')
+            self.groups_done = event.get('done', 0)
+            self.groups_total = event.get('total', 0)
+        self.save(event.get('phase'))
+
+    def set_summary(self, summary):
+        """Replace partial counts with the final result summary (e.g. after a cache hit)."""
+        for level in SEVERITY_LEVELS:
+            self.counts[level] = summary.get(level, 0)
+
+    def snapshot(self, phase):
+        self.seq += 1
+        return {
+            'seq': self.seq,
+            'phase': phase,
+            'group': self.group,
+            'groups_done': self.groups_done,
+            'groups_total': self.groups_total,
+            'counts': {**self.counts, 'total': sum(self.counts.values())},
+        }
+
+    def save(self, phase, **fields):
+        """Store a snapshot, optionally together with other job fields (e.g. status)."""
+        self.job.progress = self.snapshot(phase)
+        ScanJob.objects.filter(pk=self.job.pk).update(progress=self.job.progress, **fields)
+
+
+def job_event(job):
+    """The event payload for a job row (a dict from .values())."""
+    data = {
+        'id': job['id'],
+        'status': job['status'],
+        'error': job['error'] or None,
+        'result_url': None,
+        **(job['progress'] or {}),
+    }
+    if job['status'] == ScanJob.STATUS_DONE and job['analysis_id']:
+        data['result_url'] = reverse('accessibility_app:result', args=[job['analysis_id']])
+    return data
+
+
+def format_event(event, data):
+    return f"event: {event}\nid: {data.get('seq', 0)}\ndata: {json.dumps(data)}\n\n"
+
+
+async def job_event_stream(job_id):
+    """
+    Yield server-sent events for a job until it finishes. A 'progress' event
+    is sent whenever the snapshot changes, then a final 'done' or 'failed'.
+    Comment lines keep idle connections open through proxies; after
+    MAX_DURATION the stream ends and EventSource reconnects.
+    """
+    config = get_event_settings()
+    started = last_sent = time.monotonic()
+    last_state = None
+
+    while time.monotonic() - started < config['MAX_DURATION']:
+        job = await (
+            ScanJob.objects.filter(pk=job_id)
+            .values('id', 'status', 'error', 'progress', 'analysis_id')
+            .afirst()
+        )
+        if job is None:
+            return
+
+        data = job_event(job)
+        if job['status'] in (ScanJob.STATUS_DONE, ScanJob.STATUS_FAILED):
+            yield format_event(job['status'], data)
+            return
+
+        state = (job['status'], data.get('seq'))
+        if state != last_state:
+            last_state = state
+            last_sent = time.monotonic()
+            yield format_event('progress', data)
+        elif time.monotonic() - last_sent >= config['HEARTBEAT']:
+            last_sent = time.monotonic()
+            yield ': keepalive\n\n'
+
+        await asyncio.sleep(config['POLL_INTERVAL'])
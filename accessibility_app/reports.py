@@ -0,0 +1,148 @@
+import base64
+import functools
+import hashlib
+import math
+import os
+import tempfile
+
+from django.conf import settings
+from django.template.loader import get_template, render_to_string
+
+from .metrics import stage_timer
+
+
+PDF_TEMPLATE_NAME = 'pdf_template.html'
+
+# Bump when the chart or context below change in a way the template hash can't see
+REPORT_RENDERER_VERSION = 1
+
+CHART_SLICES = (
+    ('Critical', '#f44336'),
+    ('Serious', '#ff9800'),
+    ('Moderate', '#ffeb3b'),
+    ('Minor', '#4caf50'),
+)
+
+
+def get_reports_root():
+    return getattr(settings, 'PDF_REPORTS_ROOT', os.path.join(settings.BASE_DIR, 'media', 'reports'))
+
+
+@functools.lru_cache(maxsize=1)
+def template_version():
+    """
+    Short hash of the PDF template source and renderer version, so edited
+    templates produce new artifacts instead of serving stale ones.
+    """
+    source = get_template(PDF_TEMPLATE_NAME).template.source
+    digest = hashlib.sha256(f"{REPORT_RENDERER_VERSION}:{source}".encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def report_path(analysis_id):
+    """Path of the PDF artifact for an analysis and the current template version."""
+    return os.path.join(get_reports_root(), f"analysis-{analysis_id}-{template_version()}.pdf")
+
+
+def _arc_point(cx, cy, radius, fraction):
+    angle = 2 * math.pi * fraction - math.pi / 2  # start at 12 o'clock
+    return cx + radius * math.cos(angle), cy + radius * math.sin(angle)
+
+
+@functools.lru_cache(maxsize=1024)
+def severity_chart_svg(critical, serious, moderate, minor):
+    """
+    Render the severity breakdown as a small SVG pie chart with a legend.
+    Cached by the four counts, since many reports share them.
+    """
+    counts = (critical, serious, moderate, minor)
+    total = sum(counts)
+    cx, cy, radius = 110, 110, 100
+
+    shapes = []
+    if total:
+        start = 0.0
+        for (label, color), count in zip(CHART_SLICES, counts):
+            if not count:
+                continue
+            fraction = count / total
+            if fraction == 1:
+                shapes.append(f'<circle cx="{cx}" cy="{cy}" r="{radius}" fill="{color}"/>')
+                break
+            x1, y1 = _arc_point(cx, cy, radius, start)
+            x2, y2 = _arc_point(cx, cy, radius, start + fraction)
+            large_arc = 1 if fraction > 0.5 else 0
+            shapes.append(
+                f'<path d="M{cx},{cy} L{x1:.2f},{y1:.2f} '
+                f'A{radius},{radius} 0 {large_arc},1 {x2:.2f},{y2:.2f} Z" fill="{color}"/>'
+            )
+            start += fraction
+    else:
+        shapes.append(f'<circle cx="{cx}" cy="{cy}" r="{radius}" fill="#e0e0e0"/>')
+
+    for row, ((label, color), count) in enumerate(zip(CHART_SLICES, counts)):
+        y = 40 + row * 30
+        percent = f"{count / total * 100:.1f}%" if total else "0%"
+        shapes.append(f'<rect x="240" y="{y}" width="16" height="16" fill="{color}"/>')
+        shapes.append(
+            f'<text x="264" y="{y + 13}" font-family="Helvetica" font-size="13">'
+            f'{label}: {count} ({percent})</text>'
+        )
+
+    return (
+        '<svg xmlns="http://www.w3.org/2000/svg" width="420" height="220" viewBox="0 0 420 220">'
+        + ''.join(shapes)
+        + '</svg>'
+    )
+
+
+def severity_chart_data_uri(critical, serious, moderate, minor):
+    svg = severity_chart_svg(critical, serious, moderate, minor)
+    return 'data:image/svg+xml;base64,' + base64.b64encode(svg.encode('utf-8')).decode('ascii')
+
+
+@stage_timer('pdf_render')
+def render_pdf_report(analysis):
+    """
+    Render the analysis report to its artifact path and return the path.
+    The file is written to a temporary name first and moved into place, so
+    concurrent readers never see a partial PDF.
+    """
+    from xhtml2pdf import pisa
+
+    counts = [analysis.get_severity_count(level) for level in ('critical', 'serious', 'moderate', 'minor')]
+    context = {
+        'analysis': analysis,
+        'input_data': analysis.input_data,
+        'input_type': analysis.input_type,
+        'total_violations': analysis.total_violations(),
+        'critical': counts[0],
+        'serious': counts[1],
+        'moderate': counts[2],
+        'minor': counts[3],
+        'chart_src': severity_chart_data_uri(*counts),
+        'score': analysis.calculate_score(),
+    }
+    html_string = render_to_string(PDF_TEMPLATE_NAME, context)
+
+    path = report_path(analysis.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.pdf.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            if pisa.CreatePDF(html_string, dest=tmp_file).err:
+                raise Exception("Error generating PDF")
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return path
+
+
+def get_pdf_report(analysis):
+    """Return the path of the analysis' PDF, rendering it only if it doesn't exist yet."""
+    path = report_path(analysis.id)
+    if not os.path.exists(path):
+        path = render_pdf_report(analysis)
+    return path
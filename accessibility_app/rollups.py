@@ -0,0 +1,364 @@
+"""
+Rule-frequency rollups for org-wide analytics.
+
+RuleRollup counts, per day and per ISO week, the analyses and violation
+nodes with each axe rule and impact. It also counts the nodes that URL
+rescans fixed and the time from first seen to fixed. ScanRollup counts
+analyses and sums their scores. Reports read these few rows instead of
+every stored result.
+
+record_analyses() adds new analyses to the rollups as they are saved.
+It uses an INSERT ... ON CONFLICT DO UPDATE that adds to the stored
+counters (SQLite and PostgreSQL). rebuild() recomputes everything from
+the analysis columns and ViolationNode rows with pandas, reading them in
+analysis-ID chunks.
+
+A node is fixed when the previous scan of the same URL (same user) had
+it and the new scan does not. Its time to fix counts from the first of
+the consecutive scans that had it. Nodes match on rule ID, impact,
+target and snippet hash.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from itertools import groupby
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import AccessibilityAnalysis, RuleRollup, ScanRollup, ViolationNode
+
+
+PERIODS = (RuleRollup.PERIOD_DAY, RuleRollup.PERIOD_WEEK)
+
+# Earlier scans of a URL searched for when a fixed node first appeared
+FIX_LOOKBACK = 500
+
+REBUILD_CHUNK_SIZE = 2000
+
+IMPACTS = ('critical', 'serious', 'moderate', 'minor')
+
+
+def period_start(moment, period):
+    """The first day of the day or ISO week (Monday) containing ``moment``, in local time."""
+    day = timezone.localdate(moment)
+    if period == RuleRollup.PERIOD_WEEK:
+        day -= timedelta(days=day.weekday())
+    return day
+
+
+def node_key(node):
+    return (node.rule_id, node.impact, node.target, node.snippet_hash)
+
+
+def find_fixes(analysis, current_keys, lookback=FIX_LOOKBACK):
+    """
+    (rule_id, impact, seconds) for each node of the previous scan of the
+    analysis' URL that is not among ``current_keys``, timed from the first
+    of the consecutive earlier scans that had it.
+    """
+    chain = list(
+        AccessibilityAnalysis.objects.filter(
+            user_id=analysis.user_id, host=analysis.host, input_type='url', input_text=analysis.input_text,
+            created_at__lte=analysis.created_at,
+        )
+        .exclude(pk=analysis.pk)
+        .order_by('-created_at', '-id')
+        .values_list('id', 'created_at')[:lookback]
+    )
+    if not chain:
+        return []
+
+    node_fields = ('rule_id', 'impact', 'target', 'snippet_hash')
+    previous_keys = set(ViolationNode.objects.filter(analysis_id=chain[0][0]).values_list(*node_fields))
+    resolved = previous_keys - current_keys
+    if not resolved:
+        return []
+
+    earlier = defaultdict(set)
+    rows = ViolationNode.objects.filter(
+        analysis_id__in=[pk for pk, _ in chain[1:]], rule_id__in={key[0] for key in resolved},
+    ).values_list('analysis_id', *node_fields)
+    for analysis_id, *key in rows:
+        earlier[analysis_id].add(tuple(key))
+
+    fixes = []
+    for key in resolved:
+        first_seen = chain[0][1]
+        for pk, created_at in chain[1:]:
+            if key not in earlier[pk]:
+                break
+            first_seen = created_at
+        fixes.append((key[0], key[1], (analysis.created_at - first_seen).total_seconds()))
+    return fixes
+
+
+def _add_to_rollups(model, keys, counters, rows):
+    """
+    Add each row's counters to the rollup row matching its key columns,
+    creating rows that don't exist yet, in one statement.
+    """
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    key_columns = [quote(model._meta.get_field(name).column) for name in keys]
+    counter_columns = [quote(model._meta.get_field(name).column) for name in counters]
+    sql = (
+        f"INSERT INTO {table} ({', '.join(key_columns + counter_columns)}) "
+        f"VALUES ({', '.join(['%s'] * (len(key_columns) + len(counter_columns)))}) "
+        f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+        + ', '.join(f"{column} = {table}.{column} + EXCLUDED.{column}" for column in counter_columns)
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def record_analyses(analyses):
+    """
+    Add saved analyses, with their results in memory, to the rollups.
+    Their ViolationNode rows must already be stored.
+    """
+    scans = defaultdict(lambda: [0, 0])
+    rules = defaultdict(lambda: [0, 0, 0, 0.0])
+    for analysis in analyses:
+        nodes = ViolationNode.from_result(analysis.pk, analysis.result_json)
+        counts = defaultdict(int)
+        for node in nodes:
+            counts[(node.rule_id, node.impact)] += 1
+        fixes = []
+        if analysis.previous_id is not None:
+            fixes = find_fixes(analysis, {node_key(node) for node in nodes})
+
+        for period in PERIODS:
+            start = period_start(analysis.created_at, period)
+            scan = scans[(period, start)]
+            scan[0] += 1
+            scan[1] += analysis.score
+            for (rule_id, impact), count in counts.items():
+                rule = rules[(period, start, rule_id, impact)]
+                rule[0] += 1
+                rule[1] += count
+            for rule_id, impact, seconds in fixes:
+                rule = rules[(period, start, rule_id, impact)]
+                rule[2] += 1
+                rule[3] += seconds
+
+    adapt = connection.ops.adapt_datefield_value
+    _add_to_rollups(
+        ScanRollup, ['period', 'period_start'], ['analyses', 'score_total'],
+        [(period, adapt(start), *counters) for (period, start), counters in scans.items()],
+    )
+    _add_to_rollups(
+        RuleRollup, ['period', 'period_start', 'rule_id', 'impact'], ['analyses', 'nodes', 'fixed', 'fix_seconds'],
+        [(period, adapt(start), rule_id, impact, *counters) for (period, start, rule_id, impact), counters in rules.items()],
+    )
+
+
+# ======================== Rebuild ========================
+
+def _with_periods(frame):
+    """``frame`` once per rollup period, with period and period_start columns from created_at."""
+    import pandas as pd
+
+    days = (
+        pd.to_datetime(frame['created_at'], utc=True)
+        .dt.tz_convert(timezone.get_current_timezone_name())
+        .dt.tz_localize(None)
+        .dt.normalize()
+    )
+    weeks = days - pd.to_timedelta(days.dt.weekday, unit='D')
+    return pd.concat([
+        frame.assign(period=RuleRollup.PERIOD_DAY, period_start=days.dt.date),
+        frame.assign(period=RuleRollup.PERIOD_WEEK, period_start=weeks.dt.date),
+    ], ignore_index=True)
+
+
+def _accumulate(total, part):
+    return part if total is None else total.add(part, fill_value=0)
+
+
+def _chain_fixes(chains):
+    """Fixed-node counts and seconds by period and rule for a batch of URL scan chains."""
+    import pandas as pd
+
+    scans = pd.DataFrame(
+        [(number, seq, pk, created_at) for number, chain in enumerate(chains) for seq, (pk, created_at) in enumerate(chain)],
+        columns=['chain', 'seq', 'analysis_id', 'created_at'],
+    )
+    scans['created_at'] = pd.to_datetime(scans['created_at'], utc=True)
+    nodes = pd.DataFrame(
+        list(ViolationNode.objects.filter(analysis_id__in=scans['analysis_id'].tolist())
+             .values_list('analysis_id', 'rule_id', 'impact', 'target', 'snippet_hash')),
+        columns=['analysis_id', 'rule_id', 'impact', 'target', 'snippet_hash'],
+    )
+    if nodes.empty:
+        return None
+    nodes = nodes.merge(scans[['analysis_id', 'chain', 'seq']], on='analysis_id')
+    nodes['node'] = nodes.groupby(['rule_id', 'impact', 'target', 'snippet_hash']).ngroup()
+    nodes = nodes.drop_duplicates(['chain', 'node', 'seq']).sort_values(['chain', 'node', 'seq'])
+
+    # A run is a node present in consecutive scans of one chain; it is fixed if a later scan exists
+    new_run = (nodes['chain'].diff() != 0) | (nodes['node'].diff() != 0) | (nodes['seq'].diff() != 1)
+    runs = nodes.groupby(new_run.cumsum()).agg(
+        chain=('chain', 'first'), first_seq=('seq', 'first'), last_seq=('seq', 'last'),
+        rule_id=('rule_id', 'first'), impact=('impact', 'first'),
+    )
+    lengths = scans.groupby('chain')['seq'].size()
+    runs = runs[runs['last_seq'] + 1 < runs['chain'].map(lengths)]
+    if runs.empty:
+        return None
+
+    times = scans.set_index(['chain', 'seq'])['created_at']
+    fixed_at = times.reindex(pd.MultiIndex.from_arrays([runs['chain'], runs['last_seq'] + 1])).reset_index(drop=True)
+    first_seen = times.reindex(pd.MultiIndex.from_arrays([runs['chain'], runs['first_seq']])).reset_index(drop=True)
+    fixes = pd.DataFrame({
+        'rule_id': runs['rule_id'].to_numpy(),
+        'impact': runs['impact'].to_numpy(),
+        'created_at': fixed_at,
+        'seconds': (fixed_at - first_seen).dt.total_seconds(),
+    })
+    return _with_periods(fixes).groupby(['period', 'period_start', 'rule_id', 'impact']).agg(
+        fixed=('seconds', 'size'), fix_seconds=('seconds', 'sum'),
+    )
+
+
+def _iter_chains(chunk_size):
+    """Yield batches of URL scan chains (lists of (id, created_at), oldest first) of about ``chunk_size`` scans."""
+    rows = (
+        AccessibilityAnalysis.objects.filter(input_type='url', user__isnull=False)
+        .order_by('user_id', 'host', 'input_text', 'created_at', 'id')
+        .values_list('user_id', 'host', 'input_text', 'id', 'created_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    batch, size = [], 0
+    for _, chain in groupby(rows, key=lambda row: row[:3]):
+        chain = [(pk, created_at) for *_, pk, created_at in chain]
+        if len(chain) < 2:
+            continue
+        batch.append(chain)
+        size += len(chain)
+        if size >= chunk_size:
+            yield batch
+            batch, size = [], 0
+    if batch:
+        yield batch
+
+
+def rebuild(chunk_size=REBUILD_CHUNK_SIZE, on_chunk=None):
+    """
+    Recompute all rollups with pandas from the analysis columns and the
+    ViolationNode table (run backfill_violation_nodes first), reading
+    ``chunk_size`` analyses at a time. Rollups are replaced in one
+    transaction. Returns (scan rollup rows, rule rollup rows).
+    """
+    import pandas as pd
+
+    scan_totals = rule_totals = fix_totals = None
+    last_pk = 0
+    while True:
+        chunk = list(
+            AccessibilityAnalysis.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('id', 'created_at', 'score')[:chunk_size]
+        )
+        if not chunk:
+            break
+        analyses = pd.DataFrame(chunk, columns=['analysis_id', 'created_at', 'score'])
+        nodes = pd.DataFrame(
+            list(ViolationNode.objects.filter(analysis_id__gt=last_pk, analysis_id__lte=chunk[-1][0])
+                 .values_list('analysis_id', 'rule_id', 'impact')),
+            columns=['analysis_id', 'rule_id', 'impact'],
+        )
+        last_pk = chunk[-1][0]
+
+        analyses = _with_periods(analyses)
+        scan_totals = _accumulate(scan_totals, analyses.groupby(['period', 'period_start']).agg(
+            analyses=('analysis_id', 'size'), score_total=('score', 'sum'),
+        ))
+        if not nodes.empty:
+            # Analyses never span chunks, so per-chunk distinct counts add up
+            nodes = nodes.merge(analyses[['analysis_id', 'period', 'period_start']], on='analysis_id')
+            rule_totals = _accumulate(rule_totals, nodes.groupby(['period', 'period_start', 'rule_id', 'impact']).agg(
+                analyses=('analysis_id', 'nunique'), nodes=('analysis_id', 'size'),
+            ))
+        if on_chunk is not None:
+            on_chunk(last_pk)
+
+    for chains in _iter_chains(chunk_size):
+        fixes = _chain_fixes(chains)
+        if fixes is not None:
+            fix_totals = _accumulate(fix_totals, fixes)
+
+    if rule_totals is not None and fix_totals is not None:
+        rule_totals = rule_totals.join(fix_totals, how='outer')
+    elif fix_totals is not None:
+        rule_totals = fix_totals
+    scan_rows = [] if scan_totals is None else [
+        ScanRollup(period=period, period_start=start, analyses=int(row.analyses), score_total=int(row.score_total))
+        for (period, start), row in zip(scan_totals.index, scan_totals.itertuples())
+    ]
+    rule_rows = []
+    if rule_totals is not None:
+        rule_totals = rule_totals.reindex(columns=['analyses', 'nodes', 'fixed', 'fix_seconds']).fillna(0)
+        rule_rows = [
+            RuleRollup(
+                period=period, period_start=start, rule_id=rule_id, impact=impact,
+                analyses=int(row.analyses), nodes=int(row.nodes), fixed=int(row.fixed), fix_seconds=float(row.fix_seconds),
+            )
+            for (period, start, rule_id, impact), row in zip(rule_totals.index, rule_totals.itertuples())
+        ]
+
+    with transaction.atomic():
+        ScanRollup.objects.all().delete()
+        RuleRollup.objects.all().delete()
+        ScanRollup.objects.bulk_create(scan_rows, batch_size=1000)
+        RuleRollup.objects.bulk_create(rule_rows, batch_size=1000)
+    return len(scan_rows), len(rule_rows)
+
+
+# ======================== Reports ========================
+
+def _mean_days(fixed, fix_seconds):
+    return round(fix_seconds / fixed / 86400, 2) if fixed else None
+
+
+def analytics_report(period=RuleRollup.PERIOD_WEEK, periods=12, top=20):
+    """
+    Org-wide figures for the last ``periods`` days or weeks, read only from
+    the rollups: the most frequent rules, nodes per impact and mean score
+    per period, and mean time to fix.
+    """
+    step = timedelta(weeks=1) if period == RuleRollup.PERIOD_WEEK else timedelta(days=1)
+    since = period_start(timezone.now(), period) - step * (periods - 1)
+    rollups = RuleRollup.objects.filter(period=period, period_start__gte=since)
+
+    top_rules = list(
+        rollups.values('rule_id')
+        .annotate(nodes=Sum('nodes'), analyses=Sum('analyses'), fixed=Sum('fixed'), fix_seconds=Sum('fix_seconds'))
+        .order_by('-nodes', 'rule_id')[:top]
+    )
+    for rule in top_rules:
+        rule['mean_days_to_fix'] = _mean_days(rule['fixed'], rule['fix_seconds'])
+
+    impacts = defaultdict(dict)
+    for row in rollups.values('period_start', 'impact').annotate(nodes=Sum('nodes')):
+        impacts[row['period_start']][row['impact']] = row['nodes']
+    trend = [
+        {
+            'period_start': scan.period_start,
+            'analyses': scan.analyses,
+            'mean_score': round(scan.score_total / scan.analyses, 1) if scan.analyses else None,
+            **{impact: impacts[scan.period_start].get(impact, 0) for impact in IMPACTS},
+        }
+        for scan in ScanRollup.objects.filter(period=period, period_start__gte=since).order_by('period_start')
+    ]
+
+    fixes = rollups.aggregate(fixed=Sum('fixed'), fix_seconds=Sum('fix_seconds'))
+    return {
+        'period': period,
+        'since': since,
+        'top_rules': top_rules,
+        'trend': trend,
+        'fixed': fixes['fixed'] or 0,
+        'mean_days_to_fix': _mean_days(fixes['fixed'] or 0, fixes['fix_seconds'] or 0),
+    }
@@ -0,0 +1,346 @@
+"""
+In-process structural accessibility rules for HTML input.
+
+A subset of axe-core's rules that can be decided from the markup alone,
+checked against an lxml tree. The output has the same violation/node shape
+as axe-core results, so the rest of the app handles both engines alike.
+Rules that need layout, computed styles or script (color-contrast, focus
+order, ...) still need the browser scanner.
+"""
+import copy
+import json
+import os
+import re
+from collections import Counter, namedtuple
+
+from django.utils.html import escape
+from lxml import etree
+
+
+ENGINE_NAME = 'accessiscan-lxml'
+ENGINE_VERSION = '1.0.0'
+
+HELP_URL = 'https://dequeuniversity.com/rules/axe/4.10/{}'
+
+# Longer elements are reported by their start tag only, as axe-core does
+HTML_SNIPPET_LIMIT = 300
+
+# Fixture pages with the violations axe-core reports for them, see record_conformance
+CONFORMANCE_DIR = os.path.join(os.path.dirname(__file__), 'conformance')
+
+WHITESPACE_RE = re.compile(r'\s+')
+SIMPLE_ID_RE = re.compile(r'^[A-Za-z][\w-]*$')
+HIDDEN_STYLE_RE = re.compile(r'(display\s*:\s*none|visibility\s*:\s*hidden)', re.IGNORECASE)
+
+UNLABELLED_INPUT_TYPES = ('hidden', 'button', 'submit', 'reset', 'image')
+
+Rule = namedtuple('Rule', ['id', 'impact', 'tags', 'description', 'help', 'check'])
+
+RULES = {}
+
+
+def register_rule(rule_id, impact, tags, description, help):
+    """Register the decorated generator, yielding (element, message) pairs, as a rule check."""
+    def decorator(check):
+        RULES[rule_id] = Rule(rule_id, impact, tags, description, help, check)
+        return check
+    return decorator
+
+
+def _clean(text):
+    return WHITESPACE_RE.sub(' ', text or '').strip()
+
+
+def _is_element(node):
+    return isinstance(node.tag, str)
+
+
+def _self_hidden(element):
+    return (
+        element.get('hidden') is not None
+        or element.get('aria-hidden', '').strip().lower() == 'true'
+        or bool(HIDDEN_STYLE_RE.search(element.get('style', '')))
+    )
+
+
+def visible_text(element):
+    """Text content as a screen reader would get it: hidden subtrees skipped, image alt included."""
+    parts = [element.text or '']
+    for child in element:
+        if _is_element(child) and not _self_hidden(child):
+            parts.append(child.get('alt', '') if child.tag == 'img' else visible_text(child))
+        parts.append(child.tail or '')
+    return ' '.join(parts)
+
+
+class Page:
+    """A parsed document plus the lookups the rules share."""
+
+    def __init__(self, markup):
+        # A plain etree parser: lxml.html's element class lookup runs Python code per element
+        parser = etree.HTMLParser()
+        root = etree.fromstring(markup, parser) if markup.strip() else None
+        self.root = root if root is not None else etree.fromstring('<html></html>', parser)
+
+        self.by_id = {}
+        self.labels_for = {}
+        for element in self.root.iter(etree.Element):
+            element_id = element.get('id')
+            if element_id:
+                self.by_id.setdefault(element_id, element)
+            if element.tag == 'label' and element.get('for'):
+                self.labels_for.setdefault(element.get('for'), []).append(element)
+        self.id_counts = Counter(element.get('id') for element in self.root.iter(etree.Element) if element.get('id'))
+        self._steps = {}
+        self._hidden = {}
+
+    def is_hidden(self, element):
+        """True if the element or an ancestor is hidden from assistive technology."""
+        if element not in self._hidden:
+            parent = element.getparent()
+            self._hidden[element] = _self_hidden(element) or (parent is not None and self.is_hidden(parent))
+        return self._hidden[element]
+
+    def aria_name(self, element):
+        """Name from aria-labelledby, falling back to aria-label."""
+        ids = element.get('aria-labelledby', '').split()
+        labelled = _clean(' '.join(visible_text(self.by_id[i]) for i in ids if i in self.by_id))
+        return labelled or _clean(element.get('aria-label'))
+
+    def selector(self, element):
+        """A CSS selector unique to the element: its ID where possible, else a child path."""
+        parts = []
+        node = element
+        while node is not None and node.tag != 'html':
+            element_id = node.get('id')
+            if element_id and self.id_counts[element_id] == 1 and SIMPLE_ID_RE.match(element_id):
+                parts.append(f'#{element_id}')
+                break
+            parts.append(self._step(node))
+            node = node.getparent()
+        return ' > '.join(reversed(parts)) or 'html'
+
+    def _step(self, element):
+        # Steps are worked out for all siblings at once; keeping the elements
+        # referenced in the dict keeps their lxml proxies (and hashes) stable
+        if element not in self._steps:
+            parent = element.getparent()
+            siblings = [child for child in parent if _is_element(child)] if parent is not None else [element]
+            tag_counts = Counter(sibling.tag for sibling in siblings)
+            for position, sibling in enumerate(siblings, 1):
+                self._steps[sibling] = (
+                    f'{sibling.tag}:nth-child({position})' if tag_counts[sibling.tag] > 1 else sibling.tag
+                )
+        return self._steps[element]
+
+
+def start_tag(element):
+    attributes = ''.join(f' {name}="{escape(value)}"' for name, value in element.attrib.items())
+    return f'<{element.tag}{attributes}>'
+
+
+def _browser_document(html):
+    """
+    A copy of the <html> element shaped like the browser's DOM for it: an
+    empty <head> when the page has none, no whitespace before the head, and
+    whitespace after </body> moved inside the body.
+    """
+    html = copy.deepcopy(html)
+    html.text = None
+    children = [child for child in html if _is_element(child)]
+    if not children or children[0].tag != 'head':
+        html.insert(0, etree.Element('head'))
+    for body in html.iter('body'):
+        if body.tail and not body.tail.strip():
+            last = body[-1] if len(body) else None
+            if last is not None:
+                last.tail = (last.tail or '') + body.tail
+            else:
+                body.text = (body.text or '') + body.tail
+            body.tail = None
+    return html
+
+
+def outer_html(element):
+    if element.tag == 'html':
+        element = _browser_document(element)
+    markup = etree.tostring(element, encoding='unicode', method='html', with_tail=False)
+    return markup if len(markup) <= HTML_SNIPPET_LIMIT else start_tag(element)
+
+
+@register_rule('image-alt', 'critical', ['cat.text-alternatives', 'wcag2a', 'wcag111'],
+               'Ensures <img> elements have alternate text or a role of none or presentation',
+               'Images must have alternate text')
+def check_image_alt(page):
+    for img in page.root.iter('img'):
+        if page.is_hidden(img) or img.get('alt') is not None:
+            continue
+        if img.get('role', '').strip().lower() in ('none', 'presentation'):
+            continue
+        if page.aria_name(img) or _clean(img.get('title')):
+            continue
+        yield img, 'Element does not have an alt attribute'
+
+
+@register_rule('link-name', 'serious', ['cat.name-role-value', 'wcag2a', 'wcag244', 'wcag412'],
+               'Ensures links have discernible text',
+               'Links must have discernible text')
+def check_link_name(page):
+    for link in page.root.iter('a'):
+        if link.get('href') is None or page.is_hidden(link):
+            continue
+        if page.aria_name(link) or _clean(visible_text(link)) or _clean(link.get('title')):
+            continue
+        yield link, 'Element does not have text that is visible to screen readers'
+
+
+@register_rule('button-name', 'critical', ['cat.name-role-value', 'wcag2a', 'wcag412'],
+               'Ensures buttons have discernible text',
+               'Buttons must have discernible text')
+def check_button_name(page):
+    for button in page.root.iter('button'):
+        if page.is_hidden(button):
+            continue
+        if page.aria_name(button) or _clean(visible_text(button)) or _clean(button.get('title')):
+            continue
+        yield button, 'Element does not have inner text that is visible to screen readers'
+
+
+@register_rule('label', 'critical', ['cat.forms', 'wcag2a', 'wcag412'],
+               'Ensures every form element has a label',
+               'Form elements must have labels')
+def check_label(page):
+    # <select> has its own rule (select-name) in axe-core
+    for field in page.root.iter('input', 'textarea'):
+        if field.tag == 'input' and field.get('type', 'text').strip().lower() in UNLABELLED_INPUT_TYPES:
+            continue
+        if page.is_hidden(field):
+            continue
+        if page.aria_name(field) or _clean(field.get('title')) or _clean(field.get('placeholder')):
+            continue
+        explicit = page.labels_for.get(field.get('id'), []) if field.get('id') else []
+        if any(_clean(visible_text(label)) for label in explicit if not page.is_hidden(label)):
+            continue
+        implicit = next((a for a in field.iterancestors('label')), None)
+        if implicit is not None and _clean(visible_text(implicit)):
+            continue
+        yield field, 'Form element does not have an implicit (wrapped) <label> or an explicit <label>'
+
+
+@register_rule('document-title', 'serious', ['cat.text-alternatives', 'wcag2a', 'wcag242'],
+               'Ensures each HTML document contains a non-empty <title> element',
+               'Documents must have <title> element to aid in navigation')
+def check_document_title(page):
+    title = page.root.find('.//title')
+    if title is None or not _clean(''.join(title.itertext())):
+        yield page.root, 'Document does not have a non-empty <title> element'
+
+
+def _heading_level(element):
+    if element.tag in ('h1', 'h2', 'h3', 'h4', 'h5', 'h6'):
+        return int(element.tag[1])
+    if element.get('role', '').strip().lower() == 'heading':
+        try:
+            return int(element.get('aria-level', '2'))
+        except ValueError:
+            return 2
+    return None
+
+
+@register_rule('heading-order', 'moderate', ['cat.semantics', 'best-practice'],
+               'Ensures the order of headings is semantically correct',
+               'Heading levels should only increase by one')
+def check_heading_order(page):
+    previous = None
+    for element in page.root.iter(etree.Element):
+        level = _heading_level(element)
+        if level is None or page.is_hidden(element):
+            continue
+        if previous is not None and level > previous + 1:
+            yield element, 'Heading order invalid'
+        previous = level
+
+
+@register_rule('list', 'serious', ['cat.structure', 'wcag2a', 'wcag131'],
+               'Ensures that lists are structured correctly',
+               '<ul> and <ol> must only directly contain <li>, <script> or <template> elements')
+def check_list(page):
+    for element in page.root.iter('ul', 'ol'):
+        if element.get('role') or page.is_hidden(element):
+            continue
+        if any(_is_element(child) and child.tag not in ('li', 'script', 'template') for child in element):
+            yield element, 'List element has direct children that are not allowed: ' + ', '.join(sorted({
+                child.tag for child in element if _is_element(child) and child.tag not in ('li', 'script', 'template')
+            }))
+
+
+@register_rule('listitem', 'serious', ['cat.structure', 'wcag2a', 'wcag131'],
+               'Ensures <li> elements are used semantically',
+               '<li> elements must be contained in a <ul> or <ol>')
+def check_listitem(page):
+    for item in page.root.iter('li'):
+        if item.get('role') or page.is_hidden(item):
+            continue
+        parent = item.getparent()
+        if parent is not None and parent.tag in ('ul', 'ol', 'menu') and parent.get('role') in (None, 'list'):
+            continue
+        yield item, 'List item does not have a <ul>, <ol> parent element'
+
+
+def check_html(markup, rules=None):
+    """
+    Run the in-process rules (all, or the given rule IDs) on an HTML string
+    and return an axe-core style result: {'violations': [...], 'testEngine': {...}}.
+    """
+    page = Page(markup)
+    selected = sorted(RULES) if rules is None else sorted(rule_id for rule_id in rules if rule_id in RULES)
+
+    violations = []
+    for rule_id in selected:
+        rule = RULES[rule_id]
+        nodes = [
+            {
+                'html': outer_html(element),
+                'target': [page.selector(element)],
+                'impact': rule.impact,
+                'failureSummary': f'Fix any of the following:\n  {message}',
+                'any': [],
+                'all': [],
+                'none': [],
+            }
+            for element, message in rule.check(page)
+        ]
+        if nodes:
+            violations.append({
+                'id': rule.id,
+                'impact': rule.impact,
+                'tags': rule.tags,
+                'description': rule.description,
+                'help': rule.help,
+                'helpUrl': HELP_URL.format(rule.id),
+                'nodes': nodes,
+            })
+
+    return {'violations': violations, 'testEngine': {'name': ENGINE_NAME, 'version': ENGINE_VERSION}}
+
+
+def violation_nodes(result):
+    """Map rule ID -> sorted, whitespace-normalized node HTML, for comparing engines."""
+    return {
+        violation['id']: sorted(_clean(node.get('html', '')) for node in violation.get('nodes', []))
+        for violation in result.get('violations', [])
+        if violation['id'] in RULES
+    }
+
+
+def conformance_fixtures():
+    """Yield (name, html, expected) for each fixture page that has recorded axe-core results."""
+    for filename in sorted(os.listdir(CONFORMANCE_DIR)):
+        name, ext = os.path.splitext(filename)
+        expected_path = os.path.join(CONFORMANCE_DIR, f'{name}.axe.json')
+        if ext != '.html' or not os.path.exists(expected_path):
+            continue
+        with open(os.path.join(CONFORMANCE_DIR, filename), encoding='utf-8') as page:
+            markup = page.read()
+        with open(expected_path, encoding='utf-8') as expected:
+            yield name, markup, json.load(expected)
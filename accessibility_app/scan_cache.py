@@ -0,0 +1,240 @@
+import collections
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit
+
+from django.conf import settings
+
+
+def get_cache_settings():
+    config = getattr(settings, 'SCAN_CACHE', {})
+    return {
+        'BACKEND': config.get('BACKEND', 'local'),
+        'TTL': config.get('TTL', 6 * 60 * 60),
+        'URL_TTL': config.get('URL_TTL', config.get('TTL', 60 * 60)),
+        'MAX_ENTRIES': config.get('MAX_ENTRIES', 1000),
+        'REDIS_ALIAS': config.get('REDIS_ALIAS', 'default'),
+        'KEY_PREFIX': config.get('KEY_PREFIX', 'scan-cache'),
+    }
+
+
+def normalize_input(input_data, input_type):
+    """
+    Normalize scan input so trivially different spellings share a cache entry.
+
+    URLs get a lower-cased scheme and host and lose their fragment. HTML only
+    has line endings and surrounding whitespace normalized, since whitespace
+    inside the document can change what axe reports.
+    """
+    if input_type == 'url':
+        parts = urlsplit(input_data.strip())
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', parts.query, ''))
+    return input_data.replace('\r\n', '\n').strip()
+
+
+@functools.lru_cache(maxsize=1)
+def scanner_fingerprint():
+    """
+    Identify the scanner build: backend, worker script contents, installed
+    axe-core version and rule options. Any change produces new cache keys.
+    """
+    scanner = getattr(settings, 'SCANNER', {})
+    digest = hashlib.sha256()
+    digest.update(scanner.get('BACKEND', 'pool').encode('utf-8'))
+    digest.update(json.dumps(scanner.get('AXE_OPTIONS', {}), sort_keys=True).encode('utf-8'))
+
+    for part in scanner.get('COMMAND', []):
+        if str(part).endswith('.js') and os.path.exists(part):
+            with open(part, 'rb') as script:
+                digest.update(script.read())
+
+    axe_package = os.path.join(settings.BASE_DIR, 'node_modules', 'axe-core', 'package.json')
+    try:
+        with open(axe_package) as package:
+            digest.update(json.load(package).get('version', '').encode('utf-8'))
+    except (OSError, ValueError):
+        pass
+
+    return digest.hexdigest()[:16]
+
+
+def make_cache_key(input_data, input_type, variant=''):
+    """
+    Return the content-addressed key for a scan input. ``variant`` separates
+    results of the same input produced differently (e.g. the HTML engine).
+    """
+    digest = hashlib.sha256()
+    digest.update(input_type.encode('utf-8'))
+    digest.update(b'\0')
+    if variant:
+        digest.update(variant.encode('utf-8'))
+        digest.update(b'\0')
+    digest.update(normalize_input(input_data, input_type).encode('utf-8'))
+    return f"{scanner_fingerprint()}:{digest.hexdigest()}"
+
+
+class LocalScanCache:
+    """
+    In-process LRU cache with per-entry expiry, bounded to ``max_entries``.
+    """
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = collections.Counter()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                self.stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+        return json.loads(entry[1])
+
+    def set(self, key, value, ttl):
+        encoded = json.dumps(value)
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, encoded)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self):
+        with self._lock:
+            return {
+                'backend': 'local',
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.stats['hits'],
+                'misses': self.stats['misses'],
+                'evictions': self.stats['evictions'],
+                'expired': self.stats['expired'],
+            }
+
+
+class RedisScanCache:
+    """
+    Redis-backed cache shared by all web and worker processes.
+
+    Entries expire through Redis TTLs. A sorted set of last-access times is
+    kept alongside them so the least recently used entries can be trimmed
+    once ``max_entries`` is exceeded. Hit/miss counters live in Redis too.
+    """
+
+    def __init__(self, alias='default', max_entries=1000, prefix='scan-cache'):
+        from django_redis import get_redis_connection
+
+        self.client = get_redis_connection(alias)
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self.index_key = f"{prefix}:lru"
+        self.stats_key = f"{prefix}:stats"
+
+    def _key(self, key):
+        return f"{self.prefix}:entry:{key}"
+
+    def get(self, key):
+        value = self.client.get(self._key(key))
+        pipe = self.client.pipeline()
+        if value is None:
+            pipe.zrem(self.index_key, key)
+            pipe.hincrby(self.stats_key, 'misses', 1)
+        else:
+            pipe.zadd(self.index_key, {key: time.time()})
+            pipe.hincrby(self.stats_key, 'hits', 1)
+        pipe.execute()
+        return None if value is None else json.loads(value)
+
+    def set(self, key, value, ttl):
+        pipe = self.client.pipeline()
+        pipe.set(self._key(key), json.dumps(value), ex=int(ttl))
+        pipe.zadd(self.index_key, {key: time.time()})
+        pipe.zcard(self.index_key)
+        size = pipe.execute()[-1]
+
+        overflow = size - self.max_entries
+        if overflow > 0:
+            evicted = [member for member, _ in self.client.zpopmin(self.index_key, overflow)]
+            if evicted:
+                keys = [self._key(k.decode('utf-8') if isinstance(k, bytes) else k) for k in evicted]
+                pipe = self.client.pipeline()
+                pipe.delete(*keys)
+                pipe.hincrby(self.stats_key, 'evictions', len(evicted))
+                pipe.execute()
+
+    def clear(self):
+        keys = [self._key(k.decode('utf-8') if isinstance(k, bytes) else k)
+                for k in self.client.zrange(self.index_key, 0, -1)]
+        if keys:
+            self.client.delete(*keys)
+        self.client.delete(self.index_key, self.stats_key)
+
+    def status(self):
+        stats = {k.decode('utf-8') if isinstance(k, bytes) else k: int(v)
+                 for k, v in self.client.hgetall(self.stats_key).items()}
+        return {
+            'backend': 'redis',
+            'entries': self.client.zcard(self.index_key),
+            'max_entries': self.max_entries,
+            'hits': stats.get('hits', 0),
+            'misses': stats.get('misses', 0),
+            'evictions': stats.get('evictions', 0),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_scan_cache():
+    """Return the configured scan cache, or None when caching is disabled."""
+    global _cache
+    config = get_cache_settings()
+    if config['BACKEND'] in (None, 'none'):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                if config['BACKEND'] == 'redis':
+                    _cache = RedisScanCache(
+                        alias=config['REDIS_ALIAS'],
+                        max_entries=config['MAX_ENTRIES'],
+                        prefix=config['KEY_PREFIX'],
+                    )
+                else:
+                    _cache = LocalScanCache(max_entries=config['MAX_ENTRIES'])
+    return _cache
+
+
+def cached_scan(input_data, input_type, scan, variant='', refresh=False):
+    """
+    Return the cached result for this input, or call ``scan`` and cache its
+    result. With ``refresh``, always scan and replace the cached result.
+    """
+    cache = get_scan_cache()
+    if cache is None:
+        return scan(input_data, input_type)
+
+    key = make_cache_key(input_data, input_type, variant)
+    result = None if refresh else cache.get(key)
+    if result is None:
+        result = scan(input_data, input_type)
+        config = get_cache_settings()
+        cache.set(key, result, config['URL_TTL'] if input_type == 'url' else config['TTL'])
+    return result
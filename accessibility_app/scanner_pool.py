@@ -0,0 +1,316 @@
+import atexit
+import collections
+import itertools
+import json
+import os
+import queue
+import struct
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+
+from .metrics import observe_stage, stage_timer
+
+
+FRAME_HEADER = struct.Struct('>I')
+
+
+class ScannerError(Exception):
+    """Raised when a scanner worker fails to produce a result."""
+
+
+class ScannerTimeout(ScannerError):
+    """Raised when a scanner worker does not answer within the job timeout."""
+
+
+class ScannerWorker:
+    """
+    A single long-lived Node.js scanner process.
+
+    Jobs and results are exchanged as length-prefixed JSON frames over the
+    process' stdin/stdout, so HTML bodies travel through the pipe instead of
+    temporary files.
+    """
+
+    def __init__(self, command, startup_timeout=30):
+        self.process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self.jobs_completed = 0
+        self.closed_stdout = False
+        self.started_at = time.monotonic()
+        self._responses = queue.Queue()
+        self._stderr_tail = collections.deque(maxlen=20)
+
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+        threading.Thread(target=self._read_stderr, daemon=True).start()
+
+        try:
+            ready = self._next_response(startup_timeout)
+        except ScannerError:
+            self.kill()
+            raise
+        if not ready.get('ready'):
+            self.kill()
+            raise ScannerError(f"Scanner worker failed to start: {ready.get('error')}")
+
+    @property
+    def pid(self):
+        return self.process.pid
+
+    def is_alive(self):
+        return not self.closed_stdout and self.process.poll() is None
+
+    def _read_stdout(self):
+        stream = self.process.stdout
+        while True:
+            header = stream.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                break
+            (length,) = FRAME_HEADER.unpack(header)
+            body = stream.read(length)
+            if len(body) < length:
+                break
+            start = time.perf_counter()
+            try:
+                self._responses.put(json.loads(body.decode('utf-8')))
+                observe_stage('scanner_decode', time.perf_counter() - start)
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                self._responses.put({'id': None, 'ok': False, 'error': f"Malformed frame: {e}"})
+        # Signal EOF to whoever is waiting on a response
+        self.closed_stdout = True
+        self._responses.put(None)
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            self._stderr_tail.append(line.decode('utf-8', 'replace').rstrip())
+
+    def _next_response(self, timeout):
+        try:
+            response = self._responses.get(timeout=timeout)
+        except queue.Empty:
+            raise ScannerTimeout(f"Scanner worker {self.pid} did not respond within {timeout:.1f}s")
+        if response is None:
+            stderr = '\n'.join(self._stderr_tail)
+            raise ScannerError(f"Scanner worker {self.pid} exited unexpectedly: {stderr}")
+        return response
+
+    def run(self, job_id, input_type, payload, timeout, options=None, on_progress=None):
+        """
+        Send one job to the worker and wait for its result. If ``on_progress``
+        is given, the worker reports scan phases and it is called with each one.
+        """
+        job = {
+            'id': job_id,
+            'type': input_type,
+            'payload': payload,
+            'options': options or {},
+            'progress': on_progress is not None,
+        }
+        body = json.dumps(job).encode('utf-8')
+        try:
+            self.process.stdin.write(FRAME_HEADER.pack(len(body)) + body)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ScannerError(f"Could not send job to scanner worker {self.pid}: {e}")
+
+        deadline = time.monotonic() + timeout
+        while True:
+            response = self._next_response(max(0, deadline - time.monotonic()))
+            # Skip stray answers to jobs that already timed out
+            if response.get('id') != job_id:
+                continue
+            if 'progress' in response:
+                if on_progress is not None:
+                    on_progress(response['progress'])
+                continue
+            break
+
+        if not response.get('ok'):
+            raise ScannerError(response.get('error') or 'Unknown scanner error')
+
+        self.jobs_completed += 1
+        return response['result']
+
+    def stop(self, timeout=5):
+        """Ask the worker to exit by closing stdin, killing it if it does not."""
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.kill()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+
+class ScannerPool:
+    """
+    A bounded pool of scanner workers.
+
+    Workers are started lazily up to ``size``. A worker that crashes or hangs
+    is killed and replaced on the next checkout, and every worker is recycled
+    after ``max_jobs_per_worker`` jobs to keep browser memory in check.
+    """
+
+    def __init__(self, command, size=2, max_jobs_per_worker=200, job_timeout=60,
+                 startup_timeout=30, acquire_timeout=None, axe_options=None):
+        self.command = command
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.job_timeout = job_timeout
+        self.startup_timeout = startup_timeout
+        self.acquire_timeout = acquire_timeout
+        self.axe_options = axe_options or {}
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._closed = False
+        self._stats = collections.Counter()
+
+    def _checkout(self):
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            raise ScannerTimeout("No scanner worker became available in time")
+        dead = []
+        try:
+            with self._lock:
+                self._stats['busy'] += 1
+                while self._idle:
+                    worker = self._idle.pop()
+                    if worker.is_alive():
+                        return worker
+                    self._stats['restarts'] += 1
+                    dead.append(worker)
+        finally:
+            # Reap workers that died (or closed stdout) while idle, so none linger as zombies
+            for worker in dead:
+                worker.kill()
+        try:
+            worker = ScannerWorker(self.command, startup_timeout=self.startup_timeout)
+        except Exception:
+            self._checkin(None)
+            raise
+        with self._lock:
+            self._stats['spawned'] += 1
+        return worker
+
+    def _checkin(self, worker):
+        with self._lock:
+            self._stats['busy'] -= 1
+            if worker is not None and not self._closed and worker.is_alive():
+                if worker.jobs_completed < self.max_jobs_per_worker:
+                    self._idle.append(worker)
+                    worker = None
+                else:
+                    self._stats['recycled'] += 1
+        if worker is not None:
+            worker.stop()
+        self._slots.release()
+
+    def scan(self, input_data, input_type, on_progress=None, options=None):
+        """
+        Run one scan on a pooled worker and return the raw axe results.
+        ``options`` replaces SCANNER['AXE_OPTIONS'] for this scan.
+        """
+        if self._closed:
+            raise ScannerError("Scanner pool has been shut down")
+
+        with stage_timer('scanner_checkout'):
+            worker = self._checkout()
+        try:
+            with stage_timer('scanner_run'):
+                result = worker.run(next(self._job_ids), input_type, input_data, self.job_timeout,
+                                    options=self.axe_options if options is None else options,
+                                    on_progress=on_progress)
+        except ScannerTimeout:
+            # A hung worker cannot be trusted with another job
+            with self._lock:
+                self._stats['jobs_failed'] += 1
+                self._stats['restarts'] += 1
+            worker.kill()
+            self._checkin(None)
+            raise
+        except ScannerError:
+            with self._lock:
+                self._stats['jobs_failed'] += 1
+                if not worker.is_alive():
+                    self._stats['restarts'] += 1
+            self._checkin(worker)
+            raise
+        except Exception:
+            # on_progress raised mid-job; the worker's remaining frames would answer the next job
+            with self._lock:
+                self._stats['jobs_failed'] += 1
+                self._stats['restarts'] += 1
+            worker.kill()
+            self._checkin(None)
+            raise
+
+        with self._lock:
+            self._stats['jobs_completed'] += 1
+        self._checkin(worker)
+        return result
+
+    def status(self):
+        """Return a snapshot of pool utilisation for sizing and monitoring."""
+        with self._lock:
+            return {
+                'size': self.size,
+                'busy': self._stats['busy'],
+                'idle': len(self._idle),
+                'cpu_count': os.cpu_count(),
+                'max_jobs_per_worker': self.max_jobs_per_worker,
+                'job_timeout': self.job_timeout,
+                'spawned': self._stats['spawned'],
+                'restarts': self._stats['restarts'],
+                'recycled': self._stats['recycled'],
+                'jobs_completed': self._stats['jobs_completed'],
+                'jobs_failed': self._stats['jobs_failed'],
+                'workers': [
+                    {'pid': w.pid, 'jobs_completed': w.jobs_completed, 'alive': w.is_alive()}
+                    for w in self._idle
+                ],
+            }
+
+    def shutdown(self):
+        """Stop all idle workers; busy workers are stopped when checked back in."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide scanner pool, creating it from settings.SCANNER."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = getattr(settings, 'SCANNER', {})
+                _pool = ScannerPool(
+                    command=config.get('COMMAND', ['node', os.path.join('scanner', 'worker.js')]),
+                    size=config.get('POOL_SIZE', os.cpu_count() or 2),
+                    max_jobs_per_worker=config.get('MAX_JOBS_PER_WORKER', 200),
+                    job_timeout=config.get('JOB_TIMEOUT', 60),
+                    startup_timeout=config.get('STARTUP_TIMEOUT', 30),
+                    acquire_timeout=config.get('ACQUIRE_TIMEOUT'),
+                    axe_options=config.get('AXE_OPTIONS'),
+                )
+                atexit.register(_pool.shutdown)
+    return _pool
@@ -0,0 +1,26 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .metrics import install_query_counter
+from .models import AccessibilityAnalysis, AccessibilityRemediationTip
+from .tip_index import invalidate_tip_index
+
+
+@receiver(post_save, sender=AccessibilityRemediationTip)
+@receiver(post_delete, sender=AccessibilityRemediationTip)
+def remediation_tip_changed(sender, **kwargs):
+    """Rebuild the remediation tip index after admin edits."""
+    invalidate_tip_index()
+
+
+@receiver(pre_delete, sender=AccessibilityAnalysis)
+def snapshot_delta_dependents(sender, instance, **kwargs):
+    """Rescans stored as deltas against a deleted analysis keep their full result."""
+    instance.snapshot_dependents()
+
+
+@receiver(connection_created)
+def count_request_queries(sender, connection, **kwargs):
+    """Count queries on every new connection, whichever thread opens it, towards the current request."""
+    install_query_counter(connection)
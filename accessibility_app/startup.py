@@ -0,0 +1,63 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+
+# Modules only some code paths need; none of them may load with the URLconf
+HEAVY_MODULES = ('matplotlib', 'xhtml2pdf', 'reportlab', 'requests', 'lxml', 'numpy', 'pandas')
+
+_PROBE = """
+import sys, time
+import django
+django.setup()
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = (time.perf_counter() - start) * 1000
+heavy = sorted(m for m in sys.argv[2:] if m in sys.modules)
+print(f"{elapsed:.3f}")
+print(",".join(heavy))
+"""
+
+
+def measure_cold_import(module=None, importtime=False):
+    """
+    Import ``module`` (default: the ROOT_URLCONF) after django.setup() in a
+    fresh interpreter, as a worker does on boot.
+
+    Returns:
+        dict: ``elapsed_ms`` for the import, ``heavy_modules`` that got loaded
+        and, with ``importtime``, ``modules`` as (name, self_us, cumulative_us)
+        rows parsed from ``python -X importtime``.
+    """
+    module = module or settings.ROOT_URLCONF
+    command = [sys.executable]
+    if importtime:
+        command += ['-X', 'importtime']
+    command += ['-c', _PROBE, module, *HEAVY_MODULES]
+
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', settings.SETTINGS_MODULE))
+    result = subprocess.run(command, capture_output=True, text=True, cwd=settings.BASE_DIR, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    elapsed, heavy = result.stdout.splitlines()[-2:]
+    report = {
+        'module': module,
+        'elapsed_ms': float(elapsed),
+        'heavy_modules': [m for m in heavy.split(',') if m],
+    }
+    if importtime:
+        report['modules'] = _parse_importtime(result.stderr)
+    return report
+
+
+def _parse_importtime(stderr):
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
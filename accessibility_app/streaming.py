@@ -0,0 +1,50 @@
+"""
+Streaming responses that stream on both WSGI and ASGI servers.
+
+Under ASGI, Django consumes a synchronous StreamingHttpResponse iterator
+with sync_to_async(list), holding the whole body in memory before the
+first byte is sent. stream_response() gives ASGI requests an async
+iterator instead, which pulls items from the sync iterator in batches
+through sync_to_async. WSGI requests keep the sync iterator.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+
+# Items fetched per trip to the sync thread; bigger batches mean fewer thread hops
+BATCH_SIZE = 100
+
+
+async def iterate_in_thread(iterable, batch_size=None):
+    """
+    Yield the items of a sync iterable, fetching up to ``batch_size`` at a
+    time in Django's thread-sensitive sync thread, where the request's
+    database connection (and any open cursor) lives.
+    """
+    iterator = iter(iterable)
+    fetch = sync_to_async(lambda: list(islice(iterator, batch_size or BATCH_SIZE)))
+    try:
+        while True:
+            batch = await fetch()
+            if not batch:
+                return
+            for item in batch:
+                yield item
+    finally:
+        # The client went away early: close the generator (and its cursor) in the same thread
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close)()
+
+
+def stream_response(request, iterable, content_type, batch_size=None):
+    """
+    A StreamingHttpResponse over ``iterable`` that streams under ASGI too.
+    Pass ``batch_size=1`` when each item should be sent as soon as it exists.
+    """
+    if isinstance(request, ASGIRequest):
+        iterable = iterate_in_thread(iterable, batch_size)
+    return StreamingHttpResponse(iterable, content_type=content_type)
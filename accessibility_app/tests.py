@@ -1,3 +1,1151 @@
-from django.test import TestCase
+import io
+import json
+import sys
+import tempfile
+import threading
+import time
+from concurrent import futures
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import QuerySet
+from django.http import HttpResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import benchmarks, blobs, contrast, diffs, exports, metrics, rollups, scan_cache
+from .admission import ScanGate, ScanRejected
+from .bulk import iter_bulk_scan, parse_bulk_items
+from .code_fixes import FIXERS, apply_code_fix
+from .fetch import FetchedPage
+from .management.commands.run_scan_worker import Command as RunScanWorker
+from .jobs import STALE_JOB_ERROR, claim_next_job, enqueue_scan, process_next_job, renew_lease, run_job
+from .models import AccessibilityAnalysis, AccessibilityRemediationTip, MonitoredURL, ResultBlob, RuleRollup, ScanHistory, ScanJob, ScanRollup, ViolationNode
+from .monitoring import HostThrottle, get_monitor_settings, interleave_by_host, visit
+from .rule_engine import check_html, conformance_fixtures, violation_nodes
+from .scanner_pool import ScannerError, ScannerPool, ScannerTimeout
+from .startup import measure_cold_import
+from .tip_index import get_tip_index
+from .utils import analyze_accessibility, generate_remediation_plan
+
+
+def make_result(violations):
+    return {"summary": {}, "violations": violations}
+
+
+class RemediationPlanTests(TestCase):
+    def setUp(self):
+        self.tip = AccessibilityRemediationTip.objects.create(
+            issue_type='img_alt', severity='critical',
+            description='Missing alt', solution='Add alt text', wcag_reference='WCAG 1.1.1',
+        )
+        self.fallback = AccessibilityRemediationTip.objects.create(
+            issue_type='link_purpose', severity='serious',
+            description='Empty link', solution='Describe the link',
+        )
+
+    def test_plan_costs_no_queries_once_index_is_built(self):
+        violations = [
+            {"id": "image-alt", "impact": "critical", "nodes": [{"html": '<img src="a.png">'}] * 200},
+            {"id": "link-name", "impact": "moderate", "nodes": [{"html": '<a href="/"></a>'}] * 200},
+        ]
+        analysis = AccessibilityAnalysis(input_type='html', input_data='<p></p>', result_json=make_result(violations))
+        get_tip_index()
+
+        with self.assertNumQueries(0):
+            plan = generate_remediation_plan(analysis)
+
+        self.assertEqual(len(plan), 400)
+        self.assertEqual(plan[0].tips.solution, 'Add alt text')
+        # No (link_purpose, moderate) tip exists, so the issue-type fallback is used
+        self.assertEqual(plan[-1].tips.solution, 'Describe the link')
+
+    def test_saving_a_tip_invalidates_the_index(self):
+        self.assertEqual(get_tip_index().lookup('img_alt', 'critical').solution, 'Add alt text')
+        self.tip.solution = 'Describe the image'
+        self.tip.save()
+        self.assertEqual(get_tip_index().lookup('img_alt', 'critical').solution, 'Describe the image')
+
+        self.tip.delete()
+        self.assertIsNone(get_tip_index().lookup('img_alt', 'critical'))
+
+
+# (snippet, rule ID, expected fix) recorded from the if/elif implementation
+# of generate_code_fix that preceded the fixer registry, with impact 'serious'.
+CODE_FIX_GOLDEN = [
+    ('<img src="logo.png">', 'image-alt', '<img alt="Descriptive alt text" src="logo.png">'),
+    ('<img src="logo.png" alt="">', 'image-alt', '<img src="logo.png" alt="Descriptive alt text">'),
+    ('<img alt="Logo" src="logo.png">', 'image-alt', '<img alt="Logo" src="logo.png">\n<!-- FIXED: image-alt - serious impact -->>'),
+    ('<button></button>', 'button-name', '<button>\n<!-- FIXED: button-name - serious impact -->></button>'),
+    ('<button class="icon"><svg></svg></button>', 'button-name', '<button class="icon">\n<!-- FIXED: button-name - serious impact -->><svg></svg></button>'),
+    ('<button class="icon">', 'button-name', '<button aria-label="Button label" class="icon">'),
+    ('<button aria-label="Close"></button>', 'button-name', '<button aria-label="Close">\n<!-- FIXED: button-name - serious impact -->></button>'),
+    ('<p style="color: #cccccc; background-color: #ffffff;">Low contrast text</p>', 'color-contrast', '<p style="color: #767676; background-color: #ffffff;">Low contrast text</p>'),
+    ('<p style="background: #fff; color: #ccc">Low contrast text</p>', 'color-contrast-enhanced', '<p style="color: #595959; background: #fff;">Low contrast text</p>'),
+    ('<span class="muted">Muted</span>', 'color-contrast', '<span class="muted" style="color: #000000; background-color: #ffffff;">Muted</span>'),
+    ('Plain text', 'color-contrast', '<!-- Increase contrast ratio to at least 4.5:1 -->\nPlain text'),
+    ('<input type="text" name="q">', 'label', '<label for="input-example">Descriptive Label</label>\n<input id="input-example" type="text" name="q">'),
+    ('<input id="email" type="email">', 'label', '<label for="email">Descriptive Label</label>\n<input id="email" type="email">'),
+    ('<label for="a">A</label><input id="a">', 'label', '<label for="a">\n<!-- FIXED: label - serious impact -->>A</label><input id="a">'),
+    ('<select name="s"></select>', 'label', '<select name="s">\n<!-- FIXED: label - serious impact -->></select>'),
+    ('<a href="/page"></a>', 'link-name', '<a href="/page">Descriptive Link Text</a>'),
+    ('<a href="/page"><img src="icon.png"></a>', 'link-name', '<a href="/page"><img src="icon.png">Descriptive Link Text</a>'),
+    ('<a href="/page">Read more</a>', 'link-name', '<a href="/page" aria-label="Descriptive Link Purpose">Read more</a>'),
+    ('<a href="/page" aria-label="About">About</a>', 'link-name', '<a href="/page" aria-label="About">\n<!-- FIXED: link-name - serious impact -->>About</a>'),
+    ('<ul></ul>', 'list', '<ul>\n  <li>List item</li>\n</ul>'),
+    ('<ol></ol>', 'list', '<ol>\n  <li>List item</li>\n</ol>'),
+    ('<ul><div>Item</div></ul>', 'list', '<ul>\n  <li>List item</li>\n<div>Item</div></ul>'),
+    ('<li>Orphan</li>', 'listitem', '<li>\n<!-- FIXED: listitem - serious impact -->>Orphan</li>'),
+    ('<table><tr><td>Name</td><td>Age</td></tr><tr><td>A</td><td>1</td></tr></table>', 'td-headers-attr', '<table role="table">\n  <caption>Table Caption</caption><tr><th>Name</th><th>Age</th></tr><tr><td>A</td><td>1</td></tr></table>'),
+    ('<table class="data">\n<caption>People</caption>\n<tr><td>Name</td></tr>\n</table>', 'th-has-data-cells', '<table class="data">\n<caption>People</caption>\n<tr><th>Name</th></tr>\n</table>'),
+    ('<table><tr><th>Name</th></tr><tr><td>A</td></tr></table>', 'table-fake-caption', '<table role="table">\n  <caption>Table Caption</caption><tr><th>Name</th></tr><tr><td>A</td></tr></table>'),
+    ('<table><tbody></tbody></table>', 'th-has-data-cells', '<table role="table">\n  <caption>Table Caption</caption><tbody></tbody></table>'),
+    ('<html><head></head><body></body></html>', 'document-title', '<html><head>\n  <title>Page Title</title></head><body></body></html>'),
+    ('<html><body></body></html>', 'document-title', '<html>\n<!-- FIXED: document-title - serious impact -->><body></body></html>'),
+    ('<h3>Section</h3>', 'heading-order', '<h2>Section</h2>'),
+    ('<h1>Title</h1>', 'heading-order', '<h1>\n<!-- FIXED: heading-order - serious impact -->>Title</h1>'),
+    ('<h5 class="sub">Deep <em>heading</em></h5>', 'heading-order', '<h4 class="sub">Deep <em>heading</em></h4>'),
+    ('<div class="panel">Content</div>', 'aria-roles', '<div role="region" class="panel">Content</div>'),
+    ('<span>Text</span>', 'aria-roles', '<span role="text">Text</span>'),
+    ('<p>Paragraph</p>', 'aria-roles', '<p>\n<!-- FIXED: aria-roles - serious impact -->>Paragraph</p>'),
+    ('<div>Region</div>', 'region', '<div>\n<!-- FIXED: region - serious impact -->>Region</div>'),
+    ('just text', 'region', '<!-- FIXED: region - serious impact -->\njust text'),
+    ('', 'image-alt', '<!-- FIXED: image-alt - serious impact -->\n'),
+]
+
+
+class CodeFixTests(SimpleTestCase):
+    def test_golden_outputs(self):
+        for snippet, rule_id, expected in CODE_FIX_GOLDEN:
+            with self.subTest(rule_id=rule_id, snippet=snippet):
+                self.assertEqual(apply_code_fix(snippet, rule_id, 'serious'), expected)
+
+    def test_every_registered_rule_is_covered_by_golden_outputs(self):
+        covered = {rule_id for _, rule_id, _ in CODE_FIX_GOLDEN}
+        self.assertEqual(set(FIXERS) - covered, set())
+
+    def test_aria_roles_replaces_invalid_role(self):
+        # Used to raise UnboundLocalError because of a function-local `import re`
+        self.assertEqual(
+            apply_code_fix('<div role="foo">Content</div>', 'aria-roles', 'serious'),
+            '<div role="region">Content</div>',
+        )
+
+    def test_label_reads_id_from_parsed_input(self):
+        self.assertEqual(
+            apply_code_fix("<input id='q' type='search'>", 'label', 'critical'),
+            "<label for=\"q\">Descriptive Label</label>\n<input id='q' type='search'>",
+        )
+        self.assertEqual(
+            apply_code_fix('<input data-id="x">', 'label', 'critical'),
+            '<label for="input-example">Descriptive Label</label>\n<input id="input-example" data-id="x">',
+        )
+
+    def test_table_caption_follows_table_tag(self):
+        self.assertEqual(
+            apply_code_fix('<div><table><tr><th>A</th></tr></table></div>', 'td-headers-attr', 'serious'),
+            '<div><table role="table">\n  <caption>Table Caption</caption><tr><th>A</th></tr></table></div>',
+        )
+
+
+class ContrastTests(SimpleTestCase):
+    def test_ratios_match_wcag_reference_values(self):
+        ratios = contrast.contrast_ratio([[0, 0, 0], [119, 119, 119], [255, 255, 255]], [255, 255, 255])
+
+        self.assertAlmostEqual(ratios[0], 21.0)
+        self.assertAlmostEqual(ratios[1], 4.48, places=2)
+        self.assertAlmostEqual(ratios[2], 1.0)
+
+    def test_suggestions_meet_the_required_ratio(self):
+        nodes = [
+            {'html': '<p style="color: #cccccc; background-color: #ffffff;">a</p>'},
+            # axe-core's measured colors win over the inline style; 3:1 means large text
+            {'html': '<h2 style="color: #000">b</h2>', 'any': [{'id': 'color-contrast', 'data': {
+                'fgColor': '#8a8a8a', 'bgColor': '#ffffff', 'expectedContrastRatio': '3:1'}}]},
+            {'html': '<p>no colors</p>'},
+            {'html': '<p style="color: #cccccc; background-color: #ffffff;">a copy</p>'},
+        ]
+        fixes = contrast.analyze_nodes(nodes, level='AA', palette=[])
+
+        self.assertEqual(fixes[0].suggested, '#767676')
+        self.assertGreaterEqual(fixes[0].suggested_ratio, 4.5)
+        self.assertTrue(fixes[1].passes)
+        self.assertEqual(fixes[1].required, 3.0)
+        self.assertIsNone(fixes[2])
+        self.assertIs(fixes[3], fixes[0])
+
+    def test_prefers_passing_palette_colors(self):
+        node = {'html': '<p style="color: #cccccc">a</p>'}
+
+        self.assertEqual(contrast.analyze_nodes([node], palette=['#e0e0e0', '#1a4480'])[0].suggested, '#1a4480')
+        self.assertEqual(contrast.analyze_nodes([node], palette=['#e0e0e0'])[0].suggested, '#767676')
+
+
+class SeverityColumnTests(TestCase):
+    def test_columns_are_filled_on_save_and_queryable(self):
+        summary = {"total_violations": 9, "critical": 4, "serious": 3, "moderate": 1, "minor": 1}
+        worst = AccessibilityAnalysis.objects.create(
+            input_type='url', input_data='https://a.example', result_json={"summary": summary, "violations": []},
+        )
+        AccessibilityAnalysis.objects.create(
+            input_type='url', input_data='https://b.example', result_json={"summary": {}, "violations": []},
+        )
+
+        self.assertEqual((worst.critical, worst.total, worst.score), (4, 9, 41))
+        self.assertEqual(worst.get_severity_count('serious'), 3)
+        with self.assertNumQueries(1):
+            low = list(AccessibilityAnalysis.objects.filter(score__lt=70).order_by('score').values_list('id', flat=True))
+        self.assertEqual(low, [worst.id])
+
+
+class ResultBlobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='blob', password='pw')
+        self.result = {
+            "summary": {"total_violations": 1, "critical": 1},
+            "violations": [{"id": "image-alt", "impact": "critical", "nodes": [{"html": "<img>"}] * 50}],
+        }
+
+    def test_identical_results_and_inputs_are_stored_once(self):
+        html = '<main><img src="a.png"></main>' * 100
+        for _ in range(3):
+            AccessibilityAnalysis.objects.create(user=self.user, input_type='html', input_data=html, result_json=self.result)
+            ScanHistory.objects.create(user=self.user, html_input=html, scan_result=self.result)
+
+        self.assertEqual(ResultBlob.objects.count(), 2)
+        blob = ResultBlob.objects.get(digest=ScanHistory.objects.first().input_blob_id)
+        self.assertLess(len(blob.data), blob.size)
+
+    def test_values_are_loaded_lazily(self):
+        created = AccessibilityAnalysis.objects.create(
+            user=self.user, input_type='html', input_data='<p>x</p>', result_json=self.result,
+        )
+        with self.assertNumQueries(1):
+            analysis = AccessibilityAnalysis.objects.get(pk=created.pk)
+            self.assertEqual(analysis.score, 90)
+        with self.assertNumQueries(1):
+            self.assertEqual(analysis.violations, self.result['violations'])
+            self.assertEqual(analysis.summary, self.result['summary'])
+        with self.assertNumQueries(1):
+            self.assertEqual(analysis.input_data, '<p>x</p>')
+
+
+def scan_result(*nodes):
+    """Result with one violation per (rule, html) node."""
+    violations = [
+        {"id": rule, "impact": "serious", "help": rule, "nodes": [{"html": html, "target": [html[:4]]}]}
+        for rule, html in nodes
+    ]
+    return {"summary": {"total_violations": len(violations), "serious": len(violations)}, "violations": violations}
+
+
+class RescanDiffTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('rescan', password='pw')
+
+    def scan(self, *nodes):
+        return AccessibilityAnalysis.objects.create(
+            user=self.user, input_type='url', input_data='https://example.com/', result_json=scan_result(*nodes),
+        )
+
+    def test_rescan_is_stored_as_delta_and_rebuilt(self):
+        first = self.scan(('image-alt', '<img src="a">'), ('label', '<input>'))
+        second = self.scan(('image-alt', '<img  src="a">'), ('link-name', '<a></a>'))
+
+        self.assertEqual((second.previous_id, second.new_issues, second.fixed_issues), (first.id, 1, 1))
+        stored = blobs.decode_json(ResultBlob.objects.get(digest=second.result_blob_id).read())
+        self.assertTrue(diffs.is_delta(stored))
+        self.assertEqual(stored['_delta']['added'], [diffs.node_fingerprint('link-name', {"html": '<a></a>', "target": ['<a><']})])
+
+        reloaded = AccessibilityAnalysis.objects.get(pk=second.pk)
+        expected = scan_result(('image-alt', '<img  src="a">'), ('link-name', '<a></a>'))
+        self.assertEqual(reloaded.result_json, expected)
+
+        scan_diff = reloaded.compare_with_previous()
+        self.assertEqual([issue['rule'] for issue in scan_diff.new], ['link-name'])
+        self.assertEqual([issue['rule'] for issue in scan_diff.fixed], ['label'])
+        self.assertEqual(scan_diff.unchanged, 1)
+
+    def test_changed_node_bodies_round_trip(self):
+        def contrast_result(fg_color, summary):
+            node = {
+                "html": '<p class="muted">Hi</p>', "target": ['.muted'], "failureSummary": summary,
+                "any": [{"id": "color-contrast", "data": {"fgColor": fg_color, "bgColor": '#ffffff'}}],
+            }
+            unchanged = {"html": '<img>', "target": ['img']}
+            return {
+                "summary": {"total_violations": 2, "serious": 2},
+                "violations": [
+                    {"id": "color-contrast", "impact": "serious", "help": "Contrast", "nodes": [node]},
+                    {"id": "image-alt", "impact": "serious", "help": "Alt", "nodes": [unchanged]},
+                ],
+            }
+
+        AccessibilityAnalysis.objects.create(
+            user=self.user, input_type='url', input_data='https://example.com/', result_json=contrast_result('#777777', 'Fix contrast'),
+        )
+        saved = contrast_result('#eeeeee', 'Fix the contrast')
+        second = AccessibilityAnalysis.objects.create(
+            user=self.user, input_type='url', input_data='https://example.com/', result_json=saved,
+        )
+
+        self.assertEqual((second.delta_depth, second.new_issues, second.fixed_issues), (1, 0, 0))
+        stored = blobs.decode_json(ResultBlob.objects.get(digest=second.result_blob_id).read())
+        self.assertIsInstance(stored['violations'][0]['nodes'][0], dict)
+        self.assertIsInstance(stored['violations'][1]['nodes'][0], str)
+        self.assertEqual(AccessibilityAnalysis.objects.get(pk=second.pk).result_json, saved)
+
+    def test_deleting_a_delta_base_snapshots_its_dependents(self):
+        first = self.scan(('image-alt', '<img>'))
+        second = self.scan(('image-alt', '<img>'), ('label', '<input>'))
+        third = self.scan(('label', '<input>'))
+        self.assertEqual((second.delta_base_id, third.delta_base_id), (first.id, second.id))
+
+        first.delete()
+        second.refresh_from_db()
+        self.assertEqual((second.delta_base_id, second.delta_depth), (None, 0))
+        self.assertEqual(second.result_json, scan_result(('image-alt', '<img>'), ('label', '<input>')))
+
+        AccessibilityAnalysis.objects.filter(pk=second.pk).delete()
+        third = AccessibilityAnalysis.objects.get(pk=third.pk)
+        self.assertIsNone(third.delta_base_id)
+        self.assertEqual(third.result_json, scan_result(('label', '<input>')))
+
+    @override_settings(RESCAN_SNAPSHOT_EVERY=2)
+    def test_full_snapshot_is_stored_periodically(self):
+        self.scan(('image-alt', '<img>'))
+        delta = self.scan(('image-alt', '<img>'), ('label', '<input>'))
+        snapshot = self.scan(('image-alt', '<img>'))
+        self.assertEqual((delta.delta_depth, delta.delta_base_id), (1, delta.previous_id))
+        self.assertEqual((snapshot.delta_depth, snapshot.delta_base_id, snapshot.new_issues), (0, None, 0))
+
+    def test_identical_rescans_share_one_blob(self):
+        scans = [self.scan(('image-alt', '<img>'), ('label', '<input>')) for _ in range(3)]
+
+        self.assertEqual(ResultBlob.objects.count(), 1)
+        self.assertEqual({scan.result_blob_id for scan in scans}, {scans[0].result_blob_id})
+        self.assertEqual([scan.delta_base_id for scan in scans], [None] * 3)
+        self.assertEqual((scans[2].previous_id, scans[2].new_issues, scans[2].fixed_issues), (scans[1].id, 0, 0))
+        self.assertEqual(AccessibilityAnalysis.objects.get(pk=scans[2].pk).result_json, scan_result(('image-alt', '<img>'), ('label', '<input>')))
+
+        # Deltas against different bases share a blob when they describe the same change
+        self.scan(('image-alt', '<img>'))
+        self.scan(('image-alt', '<img>'), ('label', '<input>'))
+        self.scan(('image-alt', '<img>'))
+        self.assertEqual(ResultBlob.objects.count(), 3)
+
+    def test_diff_api(self):
+        first = self.scan(('label', '<input>'))
+        second = self.scan(('image-alt', '<img>'))
+        self.client.force_login(self.user)
+
+        data = self.client.get(f'/api/analyses/{second.id}/diff/').json()
+        self.assertEqual(data['previous_id'], first.id)
+        self.assertEqual([issue['rule'] for issue in data['new']], ['image-alt'])
+        self.assertEqual([issue['rule'] for issue in data['fixed']], ['label'])
+        self.assertIsNone(self.client.get(f'/api/analyses/{first.id}/diff/').json()['previous_id'])
+
+
+@override_settings(SCANNER={**settings.SCANNER, 'BACKEND': 'mock'}, SCAN_CACHE={'BACKEND': 'none'},
+                   SCAN_EVENTS={'POLL_INTERVAL': 0.01})
+class ScanProgressTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('progress', password='pw')
+
+    def test_job_records_phases_and_counts(self):
+        job = enqueue_scan(self.user, 'html', '<img src="a.png">')
+        with tempfile.TemporaryDirectory() as reports, self.settings(PDF_REPORTS_ROOT=reports):
+            process_next_job()
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ScanJob.STATUS_DONE)
+        self.assertEqual(job.progress['phase'], 'persisted')
+        self.assertEqual(job.progress['counts']['total'], 2)
+
+    def test_identical_url_rescans_store_one_result_blob(self):
+        with tempfile.TemporaryDirectory() as reports, self.settings(PDF_REPORTS_ROOT=reports):
+            for _ in range(3):
+                enqueue_scan(self.user, 'url', 'https://example.com/')
+                process_next_job()
+
+        self.assertEqual(ResultBlob.objects.count(), 1)
+        history = list(ScanHistory.objects.order_by('id'))
+        self.assertEqual(len(history), 3)
+        self.assertEqual([entry.result_blob_id for entry in history], [None] * 3)
+        self.assertEqual(history[-1].scan_result, history[-1].analysis.result_json)
+
+    async def test_event_stream_ends_with_result(self):
+        job = await ScanJob.objects.acreate(
+            user=self.user, input_type='html', input_data='<p></p>', status=ScanJob.STATUS_RUNNING,
+            progress={'seq': 3, 'phase': 'rules', 'counts': {'total': 1}},
+        )
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(f'/scan/{job.id}/events/')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = aiter(response.streaming_content)
+        first = (await anext(stream)).decode()
+        self.assertTrue(first.startswith('event: progress\nid: 3\n'))
+
+        analysis = await AccessibilityAnalysis.objects.acreate(
+            user=self.user, input_type='html', input_data='<p></p>', result_json={"summary": {}, "violations": []},
+        )
+        await ScanJob.objects.filter(pk=job.pk).aupdate(status=ScanJob.STATUS_DONE, analysis=analysis)
+        last = (await anext(stream)).decode()
+        self.assertTrue(last.startswith('event: done\n'))
+        self.assertIn(f'/result/{analysis.id}/', last)
+
+
+@override_settings(SCANNER={**settings.SCANNER, 'BACKEND': 'mock'}, SCAN_CACHE={'BACKEND': 'none'},
+                   SCAN_JOBS={'LEASE': 60, 'MAX_ATTEMPTS': 2})
+class ScanJobClaimTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('claims', password='pw')
+
+    def test_claims_oldest_queued_job_once(self):
+        first = enqueue_scan(self.user, 'html', '<p>1</p>')
+        enqueue_scan(self.user, 'html', '<p>2</p>')
+
+        claimed = claim_next_job()
+        self.assertEqual((claimed.pk, claimed.status, claimed.attempts), (first.pk, ScanJob.STATUS_RUNNING, 1))
+        self.assertNotEqual(claim_next_job().pk, first.pk)
+        self.assertIsNone(claim_next_job())
+
+    def test_racing_claimers_do_not_get_the_same_job(self):
+        job = enqueue_scan(self.user, 'html', '<p></p>')
+        original_first = QuerySet.first
+        racing = []
+
+        def first_then_race(queryset):
+            found = original_first(queryset)
+            if not racing:
+                # Another worker claims the job between this one's read and its update
+                racing.append(None)
+                racing[0] = claim_next_job()
+            return found
+
+        with mock.patch.object(QuerySet, 'first', first_then_race):
+            mine = claim_next_job()
+        self.assertIsNone(mine)
+        self.assertEqual(racing[0].pk, job.pk)
+        self.assertEqual(ScanJob.objects.get(pk=job.pk).attempts, 1)
+
+    def test_stale_running_jobs_are_reclaimed_then_failed(self):
+        job = enqueue_scan(self.user, 'html', '<p></p>')
+        claim_next_job()
+        self.assertIsNone(claim_next_job())  # still leased
+
+        stale = timezone.now() - timedelta(seconds=61)
+        ScanJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        reclaimed = claim_next_job()
+        self.assertEqual((reclaimed.pk, reclaimed.attempts), (job.pk, 2))
+
+        ScanJob.objects.filter(pk=job.pk).update(heartbeat_at=stale)
+        self.assertIsNone(claim_next_job())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), (ScanJob.STATUS_FAILED, STALE_JOB_ERROR))
+
+    def test_renewed_lease_is_not_reclaimed(self):
+        enqueue_scan(self.user, 'html', '<p></p>')
+        job = claim_next_job()
+        ScanJob.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(seconds=61))
+
+        self.assertTrue(renew_lease(job))
+        self.assertIsNone(claim_next_job())
+        ScanJob.objects.filter(pk=job.pk).update(started_at=timezone.now())  # reclaimed elsewhere
+        self.assertFalse(renew_lease(job))
+
+    @override_settings(SCAN_JOBS={'LEASE': 60, 'HEARTBEAT': 0.02})
+    def test_lease_is_renewed_while_a_long_scan_runs(self):
+        enqueue_scan(self.user, 'html', '<img src="a.png">')
+        job = claim_next_job()
+        renewals = []
+
+        def flaky_renew(renewed_job):
+            renewals.append(renewed_job.pk)
+            if len(renewals) == 1:
+                raise RuntimeError('database is locked')
+            return True
+
+        def slow_scan(*args, **kwargs):
+            deadline = time.monotonic() + 5
+            while len(renewals) < 3 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            return analyze_accessibility(*args, **kwargs)
+
+        with mock.patch('accessibility_app.jobs.renew_lease', flaky_renew), \
+                mock.patch('accessibility_app.jobs.analyze_accessibility', slow_scan), \
+                self.assertLogs('accessibility_app.jobs', 'ERROR'), \
+                tempfile.TemporaryDirectory() as reports, self.settings(PDF_REPORTS_ROOT=reports):
+            run_job(job)
+        count = len(renewals)
+        time.sleep(0.1)
+
+        self.assertGreaterEqual(count, 3)  # the failed renewal didn't stop the heartbeat
+        self.assertEqual(len(renewals), count)  # and it stopped with the scan
+        self.assertEqual(ScanJob.objects.get(pk=job.pk).status, ScanJob.STATUS_DONE)
+
+    def test_worker_thread_survives_errors(self):
+        class Stop(BaseException):
+            pass
+
+        job = enqueue_scan(self.user, 'html', '<p></p>')
+        out = io.StringIO()
+        side_effect = [RuntimeError('database went away'), job, Stop()]
+        with mock.patch('accessibility_app.management.commands.run_scan_worker.process_next_job', side_effect=side_effect), \
+                self.assertLogs('accessibility_app.jobs', 'ERROR'), self.assertRaises(Stop):
+            RunScanWorker(stdout=out).work(poll_interval=0, once=False)
+        self.assertIn(f'Processed {job}', out.getvalue())
+
+    def test_worker_that_lost_its_lease_records_nothing(self):
+        enqueue_scan(self.user, 'html', '<img src="a.png">')
+        job = claim_next_job()
+        ScanJob.objects.filter(pk=job.pk).update(started_at=timezone.now())  # reclaimed elsewhere
+
+        with self.assertLogs('accessibility_app.jobs', 'WARNING'):
+            run_job(job)
+        self.assertEqual(ScanJob.objects.get(pk=job.pk).status, ScanJob.STATUS_RUNNING)
+        self.assertFalse(AccessibilityAnalysis.objects.exists())
+
+
+# Speaks the scanner worker protocol; the payload picks what the job does
+FAKE_SCANNER = r"""
+import json, os, struct, sys, time
+header = struct.Struct('>I')
+
+def send(message):
+    body = json.dumps(message).encode()
+    sys.stdout.buffer.write(header.pack(len(body)) + body)
+    sys.stdout.buffer.flush()
+
+send({'ready': True})
+while True:
+    head = sys.stdin.buffer.read(header.size)
+    if len(head) < header.size:
+        break
+    job = json.loads(sys.stdin.buffer.read(header.unpack(head)[0]))
+    if job['payload'] == 'hang':
+        time.sleep(60)
+    if job['payload'] == 'crash':
+        sys.exit(1)
+    if job['progress']:
+        send({'id': job['id'], 'progress': {'phase': 'loaded'}})
+    send({'id': job['id'], 'ok': True, 'result': {'violations': [], 'pid': os.getpid()}})
+    if job['payload'] == 'close':
+        os.close(1)
+        time.sleep(60)
+"""
+
+
+class ScannerPoolTests(SimpleTestCase):
+    def make_pool(self, **kwargs):
+        pool = ScannerPool([sys.executable, '-c', FAKE_SCANNER], size=1, startup_timeout=10, **kwargs)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def test_workers_are_reused_then_recycled(self):
+        pool = self.make_pool(max_jobs_per_worker=2)
+        events = []
+        pids = [pool.scan('<p></p>', 'html', on_progress=events.append)['pid'] for _ in range(3)]
+
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+        self.assertEqual(events, [{'phase': 'loaded'}] * 3)
+        status = pool.status()
+        self.assertEqual((status['spawned'], status['recycled'], status['jobs_completed']), (2, 1, 3))
+        self.assertEqual((status['busy'], status['idle']), (0, 1))
+        self.assertEqual(status['workers'], [{'pid': pids[2], 'jobs_completed': 1, 'alive': True}])
+
+    def test_hung_worker_is_killed_and_replaced(self):
+        pool = self.make_pool(job_timeout=0.5)
+        pid = pool.scan('<p></p>', 'html')['pid']
+        hung = pool._idle[0]
+
+        with self.assertRaises(ScannerTimeout):
+            pool.scan('hang', 'html')
+        self.assertIsNotNone(hung.process.returncode)
+        self.assertNotEqual(pool.scan('<p></p>', 'html')['pid'], pid)
+        status = pool.status()
+        self.assertEqual((status['jobs_failed'], status['restarts'], status['spawned']), (1, 1, 2))
+
+    def test_crashed_worker_is_reaped_and_replaced(self):
+        pool = self.make_pool()
+        pool.scan('<p></p>', 'html')
+        crashed = pool._idle[0]
+
+        with self.assertRaisesMessage(ScannerError, 'exited unexpectedly'):
+            pool.scan('crash', 'html')
+        self.assertEqual(crashed.process.returncode, 1)
+        self.assertEqual(pool.status()['idle'], 0)
+        pool.scan('<p></p>', 'html')
+        self.assertEqual(pool.status()['spawned'], 2)
+
+    def test_failing_progress_callback_releases_the_slot(self):
+        pool = self.make_pool(acquire_timeout=1)
+        pool.scan('<p></p>', 'html')
+        worker = pool._idle[0]
+
+        def on_progress(progress):
+            raise RuntimeError('database is locked')
+
+        with self.assertRaisesMessage(RuntimeError, 'database is locked'):
+            pool.scan('<p></p>', 'html', on_progress=on_progress)
+        self.assertIsNotNone(worker.process.returncode)
+        status = pool.status()
+        self.assertEqual((status['busy'], status['idle'], status['jobs_failed']), (0, 0, 1))
+        self.assertEqual(pool.scan('<p></p>', 'html')['violations'], [])
+
+    def test_dead_idle_workers_are_reaped(self):
+        pool = self.make_pool()
+        pool.scan('close', 'html')
+        dead = pool._idle[0]
+        deadline = time.monotonic() + 5
+        while not dead.closed_stdout and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNone(dead.process.poll())  # still running, but no longer answering
+
+        pool.scan('<p></p>', 'html')
+        self.assertIsNotNone(dead.process.returncode)
+        self.assertEqual(pool.status()['restarts'], 1)
+
+
+class ScanCacheTests(SimpleTestCase):
+    def test_entries_expire_after_their_ttl(self):
+        cache = scan_cache.LocalScanCache()
+        with mock.patch('accessibility_app.scan_cache.time.time', return_value=1000):
+            cache.set('a', {'n': 1}, ttl=60)
+        with mock.patch('accessibility_app.scan_cache.time.time', return_value=1059):
+            self.assertEqual(cache.get('a'), {'n': 1})
+        with mock.patch('accessibility_app.scan_cache.time.time', return_value=1061):
+            self.assertIsNone(cache.get('a'))
+
+        status = cache.status()
+        self.assertEqual((status['hits'], status['misses'], status['expired'], status['entries']), (1, 1, 1, 0))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = scan_cache.LocalScanCache(max_entries=2)
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+        cache.get('a')
+        cache.set('c', 3, ttl=60)
+
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+        self.assertEqual(cache.status()['evictions'], 1)
+
+    def test_keys_normalize_input_and_separate_variants(self):
+        key = scan_cache.make_cache_key
+        self.assertEqual(key('HTTPS://Example.COM#top', 'url'), key('https://example.com/', 'url'))
+        self.assertNotEqual(key('https://example.com/?a=1', 'url'), key('https://example.com/', 'url'))
+        self.assertEqual(key('<p>x</p>\r\n', 'html'), key('<p>x</p>', 'html'))
+        self.assertNotEqual(key('<p>x</p>', 'html'), key('<p> x</p>', 'html'))
+        self.assertNotEqual(key('https://example.com/', 'url'), key('https://example.com/', 'html'))
+
+        variants = {key('<p>x</p>', 'html', variant) for variant in ('', ScanJob.ENGINE_PREFILTER, ScanJob.ENGINE_LXML)}
+        self.assertEqual(len(variants), 3)
+        self.assertTrue(key('<p>x</p>', 'html').startswith(scan_cache.scanner_fingerprint() + ':'))
+
+    def test_cached_scan_counts_hits_and_misses(self):
+        cache = scan_cache.LocalScanCache()
+        scan = mock.Mock(return_value={'violations': []})
+        with mock.patch('accessibility_app.scan_cache.get_scan_cache', return_value=cache):
+            for _ in range(2):
+                scan_cache.cached_scan('<p>x</p>', 'html', scan)
+            scan_cache.cached_scan('<p>x</p>', 'html', scan, variant=ScanJob.ENGINE_PREFILTER)
+
+        self.assertEqual(scan.call_count, 2)
+        self.assertEqual((cache.status()['hits'], cache.status()['misses']), (1, 2))
+
+
+@override_settings(SCANNER={**settings.SCANNER, 'BACKEND': 'mock'}, SCAN_CACHE={'BACKEND': 'none'})
+class BulkScanTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('bulk', password='pw')
+        self.client.force_login(self.user)
+        self.items = [
+            {"url": "https://example.com/"},
+            {"html": '<img src="a.png">'},
+            {"url": "not a url"},
+            "nope",
+        ]
+
+    def test_results_and_item_errors_stay_aligned(self):
+        data = self.client.post('/api/scans/bulk/', {"items": self.items}, content_type='application/json').json()
+
+        self.assertEqual((data['count'], data['failed']), (4, 2))
+        self.assertEqual([item['status'] for item in data['items']], ['ok', 'ok', 'error', 'error'])
+        self.assertEqual(data['items'][2]['error'], 'Enter a valid URL.')
+        analysis = AccessibilityAnalysis.objects.get(pk=data['items'][0]['analysis_id'])
+        self.assertEqual((analysis.host, analysis.total, analysis.score), ('example.com', analysis.summary['total_violations'], data['items'][0]['score']))
+        self.assertEqual(ViolationNode.objects.filter(analysis=analysis).count(), analysis.total)
+
+        history = ScanHistory.objects.filter(user=self.user).order_by('analysis__input_type')
+        self.assertEqual([(entry.url, entry.html_input) for entry in history], [(None, '<img src="a.png">'), ('https://example.com/', None)])
+        self.assertEqual(history[1].scan_result, analysis.result_json)
+
+    def test_streams_one_ndjson_line_per_item(self):
+        response = self.client.post('/api/scans/bulk/?stream=1', {"items": self.items}, content_type='application/json')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual(sorted(line['index'] for line in lines), [0, 1, 2, 3])
+
+    async def test_asgi_stream_sends_lines_before_the_batch_finishes(self):
+        release = threading.Event()
+        scanned = []
+
+        def slow_scan(input_data, input_type):
+            release.wait(5)
+            scanned.append(input_data)
+            return analyze_accessibility(input_data, input_type)
+
+        await self.async_client.aforce_login(self.user)
+        with mock.patch('accessibility_app.bulk.analyze_accessibility', slow_scan):
+            response = await self.async_client.post(
+                '/api/scans/bulk/', {"items": ["nope", {"html": "<p></p>"}], "stream": True}, content_type='application/json',
+            )
+            stream = aiter(response.streaming_content)
+            first = json.loads(await anext(stream))
+            self.assertEqual((first['index'], first['status'], scanned), (0, 'error', []))
+            release.set()
+            rest = [json.loads(line) async for line in stream]
+
+        self.assertEqual([(line['index'], line['status']) for line in rest], [(1, 'ok')])
+
+    def test_failed_persistence_leaves_no_partial_rows(self):
+        items = parse_bulk_items({"items": [{"url": "https://example.com/"}]})
+        with mock.patch('accessibility_app.bulk.store_violation_nodes', side_effect=RuntimeError('disk full')):
+            with self.assertRaisesMessage(RuntimeError, 'disk full'):
+                list(iter_bulk_scan(items, self.user))
+
+        self.assertFalse(AccessibilityAnalysis.objects.exists())
+        self.assertFalse(ScanHistory.objects.exists())
+
+    def test_items_finishing_together_are_inserted_in_one_batch(self):
+        items = parse_bulk_items({"items": [{"html": f"<p>{n}</p>"} for n in range(3)]})
+        with mock.patch('accessibility_app.bulk.wait', lambda fs, return_when: futures.wait(fs)), \
+                CaptureQueriesContext(connection) as queries:
+            results = list(iter_bulk_scan(items, self.user))
+
+        self.assertEqual([result['index'] for result in results], [0, 1, 2])
+        inserts = [q['sql'] for q in queries if q['sql'].startswith('INSERT INTO "accessibility_app_accessibilityanalysis"')]
+        self.assertEqual(len(inserts), 1)
+
+
+@override_settings(SCANNER={**settings.SCANNER, 'BACKEND': 'mock', 'URL_MODE': 'prefetched'}, SCAN_CACHE={'BACKEND': 'none'})
+class PrefetchedScanTests(TestCase):
+    def test_page_fetched_during_validation_travels_with_the_job(self):
+        user = User.objects.create_user('prefetch', password='pw')
+        self.client.force_login(user)
+        page = FetchedPage(url='https://example.com/home', status_code=200, text='<html><head></head><body><img src="a.png"></body></html>')
+        with mock.patch('accessibility_app.fetch.conditional_get', return_value=page) as get:
+            response = self.client.post('/home/', {'input_type': 'url', 'url': 'https://example.com/'})
+            job = ScanJob.objects.get()
+            self.assertRedirects(response, f'/scan/{job.id}/', fetch_redirect_response=False)
+            self.assertEqual((job.page_url, job.page_html), (page.url, page.text))
+
+            # The worker is another process: nothing it needs is in this process' cache
+            cache.clear()
+            with tempfile.TemporaryDirectory() as reports, self.settings(PDF_REPORTS_ROOT=reports):
+                process_next_job()
+        self.assertEqual(get.call_count, 1)
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.page_html), (ScanJob.STATUS_DONE, ''))
+        self.assertEqual(job.analysis.input_data, 'https://example.com/')
+        self.assertEqual([v['id'] for v in job.analysis.violations], ['image-alt', 'color-contrast'])
+
+
+class HostThrottleTests(SimpleTestCase):
+    def test_visits_to_one_host_are_spaced(self):
+        throttle = HostThrottle(min_interval=10)
+        self.assertEqual(throttle.reserve('a.example'), 0)
+        self.assertAlmostEqual(throttle.reserve('a.example'), 10, delta=0.1)
+        self.assertAlmostEqual(throttle.reserve('a.example'), 20, delta=0.1)
+        self.assertEqual(throttle.reserve('b.example'), 0)
+
+    def test_urls_are_interleaved_by_host(self):
+        urls = [MonitoredURL(url=f'https://{host}/{i}', host=host) for host, i in
+                [('a', 1), ('a', 2), ('a', 3), ('b', 1), ('c', 1), ('c', 2)]]
+        self.assertEqual([u.url for u in interleave_by_host(urls)], [
+            'https://a/1', 'https://b/1', 'https://c/1', 'https://a/2', 'https://c/2', 'https://a/3',
+        ])
+
+
+@override_settings(SCANNER={**settings.SCANNER, 'BACKEND': 'mock'}, SCAN_CACHE={'BACKEND': 'none'})
+class MonitorVisitTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('monitor', password='pw')
+        self.monitored = MonitoredURL.objects.create(user=self.user, url='https://shop.example/')
+        self.throttle = HostThrottle(min_interval=0)
+        self.config = get_monitor_settings()
+
+    def visit(self, page):
+        with mock.patch('accessibility_app.monitoring.conditional_get', return_value=page) as get, \
+                tempfile.TemporaryDirectory() as reports, self.settings(PDF_REPORTS_ROOT=reports):
+            outcome = visit(self.monitored, self.throttle, self.config)
+        return outcome, get.call_args.args
+
+    def test_unchanged_pages_are_not_rescanned(self):
+        page = FetchedPage(url='https://shop.example/', status_code=200, text='<p>hi</p>', etag='"v1"')
+        self.assertEqual(self.visit(page)[0], MonitoredURL.OUTCOME_SCANNED)
+        self.assertEqual(self.monitored.host, 'shop.example')
+        self.assertEqual(AccessibilityAnalysis.objects.count(), 1)
+
+        # Same body with different whitespace, then a 304 for the stored ETag
+        same = FetchedPage(url='https://shop.example/', status_code=200, text='<p>hi</p>\n', etag='"v2"')
+        self.assertEqual(self.visit(same)[0], MonitoredURL.OUTCOME_UNCHANGED)
+        outcome, args = self.visit(FetchedPage(url='https://shop.example/', status_code=304, not_modified=True))
+        self.assertEqual(outcome, MonitoredURL.OUTCOME_UNCHANGED)
+        self.assertEqual(args, ('https://shop.example/', '"v2"', ''))
+        self.assertEqual(AccessibilityAnalysis.objects.count(), 1)
+        self.assertGreater(self.monitored.next_scan_at, self.monitored.last_checked_at)
+
+    def test_changed_pages_are_rescanned_past_the_scan_cache(self):
+        cache = scan_cache.LocalScanCache()
+        key = scan_cache.make_cache_key('https://shop.example/', 'url')
+        cache.set(key, {"summary": {"total_violations": 0}, "violations": []}, 3600)
+
+        page = FetchedPage(url='https://shop.example/', status_code=200, text='<p>new</p>')
+        with mock.patch('accessibility_app.scan_cache.get_scan_cache', return_value=cache):
+            self.assertEqual(self.visit(page)[0], MonitoredURL.OUTCOME_SCANNED)
+
+        result = AccessibilityAnalysis.objects.get().result_json
+        self.assertNotEqual(result['violations'], [])
+        self.assertEqual(cache.get(key), result)
+        self.assertEqual(cache.stats['hits'], 1)  # only the check above
+
+    def test_failures_are_retried_with_backoff(self):
+        outcome, _ = self.visit(FetchedPage(url='https://shop.example/', status_code=503))
+        self.assertEqual(outcome, MonitoredURL.OUTCOME_FAILED)
+        self.assertEqual(self.monitored.consecutive_failures, 1)
+        delay = (self.monitored.next_scan_at - self.monitored.last_checked_at).total_seconds()
+        self.assertAlmostEqual(delay, self.config['RETRY_AFTER'], delta=self.config['RETRY_AFTER'] * 0.11)
+
+
+@override_settings(SCANNER={**settings.SCANNER, 'BACKEND': 'mock'}, SCAN_CACHE={'BACKEND': 'none'})
+class RuleEngineTests(SimpleTestCase):
+    def test_matches_axe_core_on_conformance_fixtures(self):
+        fixtures = list(conformance_fixtures())
+        self.assertTrue(fixtures)
+        for name, markup, expected in fixtures:
+            with self.subTest(fixture=name):
+                # Expectations must be recorded from axe-core itself, not written by hand
+                self.assertRegex(expected['recorded_with'], r'^axe-core 4\.10\.\d+$')
+                self.assertEqual(violation_nodes(check_html(markup)), expected['rules'])
+
+    def test_nodes_have_axe_shape(self):
+        violation = check_html('<html><head><title>T</title></head><body><img src="a.png"></body></html>')['violations'][0]
+
+        self.assertEqual(violation['id'], 'image-alt')
+        self.assertEqual(violation['impact'], 'critical')
+        self.assertEqual(violation['nodes'][0]['html'], '<img src="a.png">')
+        self.assertEqual(violation['nodes'][0]['target'], ['body > img'])
+
+    def test_engine_selection_for_html_input(self):
+        markup = '<html><head><title>T</title></head><body><h1>A</h1><h3>B</h3></body></html>'
+
+        lxml_result = analyze_accessibility(markup, 'html', use_cache=False, engine=ScanJob.ENGINE_LXML)
+        self.assertEqual([v['id'] for v in lxml_result['violations']], ['heading-order'])
+        self.assertEqual(lxml_result['summary']['moderate'], 1)
+
+        # The mock backend's image-alt node isn't in this page; its color-contrast node is kept
+        prefiltered = analyze_accessibility(markup, 'html', use_cache=False, engine=ScanJob.ENGINE_PREFILTER)
+        self.assertEqual([v['id'] for v in prefiltered['violations']], ['heading-order', 'color-contrast'])
+
+
+class HistoryPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('history', password='pw')
+        summary = {"total_violations": 1, "critical": 1}
+        for i in range(7):
+            AccessibilityAnalysis.objects.create(
+                user=self.user, input_type='url', input_data=f'https://example.com/{i}',
+                result_json={"summary": summary, "violations": []},
+            )
+        self.client.force_login(self.user)
+
+    @override_settings(HISTORY_PAGE_SIZE=3)
+    def test_dashboard_pages_by_cursor_with_constant_queries(self):
+        seen = []
+        cursor = None
+        while True:
+            # session + user + page + aggregates
+            with self.assertNumQueries(4):
+                response = self.client.get('/dashboard/', {'cursor': cursor} if cursor else {})
+            seen += [item['report'].url for item in response.context['history']]
+            cursor = response.context['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(seen, [f'https://example.com/{i}' for i in reversed(range(7))])
+        self.assertEqual(response.context['stats']['scans'], 7)
+        self.assertEqual(response.context['stats']['average_score'], 90)
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_smallest_sizes_run_and_report_every_metric(self):
+        with tempfile.TemporaryDirectory() as reports_root, self.settings(PDF_REPORTS_ROOT=reports_root):
+            results = benchmarks.run_suite(max_size=10, repeat=1)
+
+        self.assertEqual(set(results), {f'{name}/10' for name in benchmarks.BENCHMARKS})
+        self.assertEqual(results['remediation_plan/10']['queries'], 0)
+        for metrics in results.values():
+            self.assertEqual(set(metrics), {'wall_ms', 'median_ms', 'queries', 'peak_kib', 'runs'})
+
+    def test_compare_flags_only_regressions_beyond_threshold_and_noise(self):
+        baseline = {
+            'a/10': {'wall_ms': 100.0, 'queries': 4, 'peak_kib': 1000.0},
+            'b/10': {'wall_ms': 0.1, 'queries': 0, 'peak_kib': 1.0},
+        }
+        results = {
+            'a/10': {'wall_ms': 130.0, 'queries': 5, 'peak_kib': 1100.0},
+            'b/10': {'wall_ms': 0.5, 'queries': 0, 'peak_kib': 10.0},
+            'c/10': {'wall_ms': 1.0, 'queries': 0, 'peak_kib': 1.0},
+        }
+
+        regressions = benchmarks.compare(results, baseline, threshold=0.2)
+
+        self.assertEqual([(r.name, r.metric) for r in regressions], [('a/10', 'queries'), ('a/10', 'wall_ms')])
+
+
+@override_settings(SCANNER={**settings.SCANNER, 'BACKEND': 'mock'}, SCAN_CACHE={'BACKEND': 'none'})
+class MetricsTests(TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        registry = metrics.Registry()
+        histogram = metrics.Histogram('test_seconds', 'Test.', ['stage'], registry=registry, buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, stage='scan "x"')
+
+        self.assertEqual(registry.render().splitlines(), [
+            '# HELP test_seconds Test.',
+            '# TYPE test_seconds histogram',
+            'test_seconds_bucket{stage="scan \\"x\\"",le="0.1"} 1',
+            'test_seconds_bucket{stage="scan \\"x\\"",le="1.0"} 2',
+            'test_seconds_bucket{stage="scan \\"x\\"",le="+Inf"} 3',
+            'test_seconds_sum{stage="scan \\"x\\""} 5.55',
+            'test_seconds_count{stage="scan \\"x\\""} 3',
+        ])
+
+    def test_scan_job_stages_and_request_queries_are_exported(self):
+        user = User.objects.create_user('metrics', password='pw', is_staff=True)
+        enqueue_scan(user, 'html', '<img src="a.png">')
+        with tempfile.TemporaryDirectory() as reports, self.settings(PDF_REPORTS_ROOT=reports):
+            process_next_job()
+        self.client.force_login(user)
+
+        response = self.client.get('/dashboard/')
+        self.assertIn('db;desc="', response['Server-Timing'])
+
+        response = self.client.get('/metrics/')
+        body = response.content.decode()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('accessiscan_stage_duration_seconds_count{stage="persist"}', body)
+        self.assertIn('accessiscan_request_queries_bucket{view="accessibility_app:dashboard",le="+Inf"}', body)
+        self.assertIn('accessiscan_scan_jobs{status="queued"} 0', body)
+
+    async def test_middleware_stays_async_and_counts_queries_of_async_views(self):
+        async def get_response(request):
+            return HttpResponse()
+        self.assertTrue(iscoroutinefunction(metrics.MetricsMiddleware(get_response)))
+
+        user = await User.objects.acreate(username='metrics-async')
+        job = await ScanJob.objects.acreate(user=user, input_type='html', input_data='<p></p>', status=ScanJob.STATUS_DONE)
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(f'/scan/{job.id}/events/')
+        # Session, user and job lookups run on sync_to_async threads
+        self.assertIn('db;desc="3 queries"', response['Server-Timing'])
+
+    @override_settings(METRICS={'TOKEN': 'secret'})
+    def test_endpoint_requires_token_or_staff(self):
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+
+
+class AdmissionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('admission', password='pw')
+        self.client.force_login(self.user)
+
+    def test_gate_limits_running_scans_and_bounds_waiters(self):
+        gate = ScanGate(capacity=2, per_user=1, max_waiting=0, wait_timeout=0)
+        with gate.slot(1), gate.slot(2):
+            with self.assertRaises(ScanRejected) as rejected:
+                with gate.slot(3):
+                    pass
+        self.assertGreater(rejected.exception.retry_after, 0)
+
+        gate = ScanGate(capacity=2, per_user=1, max_waiting=1, wait_timeout=0.01)
+        with gate.slot(1):
+            with self.assertRaisesMessage(ScanRejected, 'No scanner became available in time.'):
+                with gate.slot(1):
+                    pass
+            with gate.slot(2):
+                self.assertEqual(gate.running, 2)
+        self.assertEqual((gate.running, gate.waiting), (0, 0))
+
+    @override_settings(SCAN_ADMISSION={'PER_USER': 1})
+    def test_home_rejects_scans_beyond_user_limit_with_retry_after(self):
+        enqueue_scan(self.user, 'html', '<p></p>')
+
+        response = self.client.post('/home/', {'input_type': 'html', 'html': '<p>second</p>'})
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '10')
+        self.assertEqual(ScanJob.objects.count(), 1)
+
+    @override_settings(SCAN_ADMISSION={'RATE': '1/m'})
+    def test_bulk_api_is_rate_limited(self):
+        payload = '{"items": [{"html": "<p></p>"}]}'
+        self.assertEqual(self.client.post('/api/scans/bulk/', payload, content_type='application/json').status_code, 200)
+
+        response = self.client.post('/api/scans/bulk/', payload, content_type='application/json')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['retry_after'], int(response['Retry-After']))
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('export', password='pw')
+        self.client.force_login(self.user)
+        for nodes in (1, 2, 3):
+            AccessibilityAnalysis.objects.create(
+                user=self.user, input_type='url', input_data='https://example.com/',
+                result_json=make_result([{"id": "image-alt", "impact": "critical",
+                                          "nodes": [{"html": f"<img src={i}>", "target": [f"#i{i}"]} for i in range(nodes)]}]),
+            )
+        AccessibilityAnalysis.objects.create(
+            user=User.objects.create_user('other'), input_type='html', input_data='<p></p>', result_json=make_result([]),
+        )
+
+    def test_node_rows_rebuild_deltas_in_one_query(self):
+        options = exports.parse_export_options({'nodes': '1', 'columns': 'id,rule_id,target'})
+        self.assertEqual(AccessibilityAnalysis.objects.filter(delta_base__isnull=False).count(), 2)
+
+        with self.assertNumQueries(1):
+            rows = list(exports.iter_rows(exports.export_queryset(options, user=self.user), options, chunk_size=2))
+
+        self.assertEqual([row['target'] for row in rows], [['#i0'], ['#i0'], ['#i1'], ['#i0'], ['#i1'], ['#i2']])
+        self.assertEqual(set(rows[0]), {'id', 'rule_id', 'target'})
+
+    def test_csv_endpoint_streams_only_own_analyses(self):
+        response = self.client.get('/api/analyses/export/', {'format': 'csv', 'columns': 'id,url,input_type'})
+
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'id,url,input_type')
+        self.assertEqual([line.split(',', 1)[1] for line in lines[1:]], ['https://example.com/,url'] * 3)
+        self.assertEqual(self.client.get('/api/analyses/export/', {'all': '1'}).status_code, 403)
+        self.assertEqual(self.client.get('/api/analyses/export/', {'since': 'yesterday'}).status_code, 400)
+
+    async def test_asgi_export_is_streamed_row_by_row(self):
+        produced = []
+
+        def counting_rows(queryset, options):
+            for row in exports.iter_rows(queryset, options, chunk_size=1):
+                produced.append(row)
+                yield row
+
+        await self.async_client.aforce_login(self.user)
+        with mock.patch('accessibility_app.views.iter_rows', counting_rows), \
+                mock.patch('accessibility_app.streaming.BATCH_SIZE', 1):
+            response = await self.async_client.get('/api/analyses/export/', {'columns': 'id,url'})
+            stream = aiter(response.streaming_content)
+            first = json.loads(await anext(stream))
+            # Only the first row has been read from the database so far
+            self.assertEqual(len(produced), 1)
+            rest = [json.loads(line) async for line in stream]
+
+        self.assertEqual(first, {'id': produced[0]['id'], 'url': 'https://example.com/'})
+        self.assertEqual(len(rest), 2)
+        self.assertEqual(len(produced), 3)
+
+
+class ViolationNodeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('nodes', password='pw')
+        self.violations = [
+            {"id": "image-alt", "impact": "critical", "nodes": [{"html": "<img  src=a>", "target": ["#a"]}]},
+            {"id": "color-contrast", "impact": "serious",
+             "nodes": [{"html": "<p>x</p>", "target": ["iframe", "#b"]}, {"html": "<p>y</p>", "target": ["#c"]}]},
+        ]
+
+    def test_nodes_are_written_with_the_analysis_and_by_backfill(self):
+        for scanned_at in ('2026-01-01', '2026-01-02'):  # the rescan is stored as a delta
+            analysis = AccessibilityAnalysis.objects.create(
+                user=self.user, input_type='url', input_data='https://example.com/',
+                result_json={"summary": {"total_violations": 3}, "timestamp": scanned_at, "violations": self.violations},
+            )
+        self.assertIsNotNone(analysis.delta_base_id)
+        rows = list(analysis.violation_nodes.order_by('id').values_list('rule_id', 'impact', 'target', 'snippet_hash'))
+        self.assertEqual(rows[1][:3], ('color-contrast', 'serious', 'iframe >>> #b'))
+        self.assertEqual(rows[0][3], diffs.snippet_hash('<img src=a>'))
+
+        ViolationNode.objects.all().delete()
+        call_command('backfill_violation_nodes', chunk_size=1, stdout=io.StringIO())
+
+        self.assertEqual(ViolationNode.objects.filter(analysis__user=self.user).count(), 6)
+        self.assertEqual(
+            list(AccessibilityAnalysis.objects.filter(violation_nodes__rule_id='color-contrast').distinct().values_list('id', flat=True)),
+            [analysis.id, analysis.delta_base_id],
+        )
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('rollups', password='pw')
+        image_alt = {"id": "image-alt", "impact": "critical", "nodes": [{"html": "<img src=a>", "target": ["#a"]}]}
+        contrast_issue = {"id": "color-contrast", "impact": "serious", "nodes": [{"html": "<p>x</p>", "target": ["#b"]}]}
+        for violations in ([image_alt, contrast_issue], [image_alt, contrast_issue], [contrast_issue]):
+            AccessibilityAnalysis.objects.create(
+                user=self.user, input_type='url', input_data='https://example.com/',
+                result_json={"summary": {"total_violations": len(violations)}, "violations": violations},
+            )
+
+    def snapshot(self):
+        fields = ('period', 'period_start', 'rule_id', 'impact', 'analyses', 'nodes', 'fixed')
+        return (
+            sorted(RuleRollup.objects.values_list(*fields)),
+            sorted(ScanRollup.objects.values_list('period', 'period_start', 'analyses', 'score_total')),
+        )
+
+    def test_rollups_are_kept_incrementally_and_match_a_rebuild(self):
+        image_alt = RuleRollup.objects.get(period='week', rule_id='image-alt')
+        self.assertEqual((image_alt.analyses, image_alt.nodes, image_alt.fixed), (2, 2, 1))
+        self.assertEqual(RuleRollup.objects.get(period='day', rule_id='color-contrast').analyses, 3)
+
+        incremental = self.snapshot()
+        self.assertEqual(rollups.rebuild(), (2, 4))
+        self.assertEqual(self.snapshot(), incremental)
+
+    def test_analytics_view_is_staff_only_and_reads_rollups(self):
+        self.client.login(username='rollups', password='pw')
+        self.assertEqual(self.client.get('/analytics/').status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        with self.assertNumQueries(6):  # session and user, then four rollup queries; no analysis rows
+            report = self.client.get('/analytics/', {'period': 'day', 'format': 'json'}).json()
+        self.assertEqual(report['top_rules'][0]['rule_id'], 'color-contrast')
+        self.assertEqual(report['trend'][-1]['analyses'], 3)
+        self.assertEqual(report['fixed'], 1)
+        self.assertContains(self.client.get('/analytics/'), 'image-alt')
+
+
+class StartupBudgetTests(SimpleTestCase):
+    def test_urlconf_cold_import_stays_within_budget(self):
+        report = measure_cold_import()
+
+        self.assertEqual(report['heavy_modules'], [])
+        self.assertLess(report['elapsed_ms'], settings.STARTUP_IMPORT_BUDGET_MS)
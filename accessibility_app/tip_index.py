@@ -0,0 +1,83 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError
+
+from .models import AccessibilityRemediationTip
+
+
+VERSION_KEY = 'remediation-tip-index:version'
+
+
+class RemediationTipIndex:
+    """
+    All remediation tips, indexed by (issue_type, severity) with the
+    issue-type-only fallback precomputed.
+
+    Lookups mirror the old ``filter(...).first()`` queries: the tip with the
+    lowest primary key wins for each key.
+    """
+
+    def __init__(self, tips, version=None):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.by_severity = {}
+        self.by_issue_type = {}
+        for tip in sorted(tips, key=lambda t: t.pk):
+            self.by_severity.setdefault((tip.issue_type, tip.severity), tip)
+            self.by_issue_type.setdefault(tip.issue_type, tip)
+
+    def lookup(self, issue_type, severity):
+        """Return the best tip for this issue type and severity, or None."""
+        tip = self.by_severity.get((issue_type, severity))
+        if tip is None:
+            tip = self.by_issue_type.get(issue_type)
+        return tip
+
+    def __len__(self):
+        return len(self.by_severity)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _current_version():
+    return cache.get_or_set(VERSION_KEY, 1, timeout=None)
+
+
+def get_tip_index():
+    """
+    Return the process-wide tip index, rebuilding it when the shared version
+    stamp has moved (a tip was saved or deleted in any process) or when it is
+    older than REMEDIATION_TIP_INDEX_TTL seconds.
+    """
+    global _index
+    version = _current_version()
+    max_age = getattr(settings, 'REMEDIATION_TIP_INDEX_TTL', 300)
+
+    index = _index
+    if index is not None and index.version == version and time.monotonic() - index.built_at < max_age:
+        return index
+
+    with _index_lock:
+        index = _index
+        if index is None or index.version != version or time.monotonic() - index.built_at >= max_age:
+            try:
+                tips = list(AccessibilityRemediationTip.objects.all())
+            except DatabaseError:
+                tips = []
+            index = _index = RemediationTipIndex(tips, version=version)
+    return index
+
+
+def invalidate_tip_index():
+    """Bump the shared version stamp so every process rebuilds its index."""
+    global _index
+    _index = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
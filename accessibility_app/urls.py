@@ -7,6 +7,9 @@ urlpatterns = [
     path('home/', views.home, name='home'),  # Home page with the form
     path('result/', views.result, name='result'),  # Result via session-based view
     path('result/<int:analysis_id>/', views.result, name='result'),
+    path('scan/<int:job_id>/', views.scan_job, name='scan_job'),  # Progress page for a queued scan
+    path('scan/<int:job_id>/status/', views.scan_job_status, name='scan_job_status'),
+    path('scan/<int:job_id>/events/', views.scan_job_events, name='scan_job_events'),  # Server-sent progress events
     path('download/pdf/<int:analysis_id>/', views.generate_pdf, name='generate_pdf'),  # PDF download view
     path("register/", views.signup_view, name="register"),
     path("login/", views.login_view, name="login"),
@@ -18,5 +21,11 @@ urlpatterns = [
     path('remediation/<int:analysis_id>/', views.remediation_view, name='remediation'),
     path("dashboard/", views.dashboard_view, name="dashboard"),
     path('common-issues/', views.common_issues, name='common_issues'),
+    path('api/scans/bulk/', views.bulk_scan_api, name='bulk_scan_api'),
+    path('api/analyses/<int:analysis_id>/diff/', views.analysis_diff_api, name='analysis_diff_api'),
+    path('api/analyses/export/', views.export_analyses, name='export_analyses'),  # NDJSON/CSV history export
+    path('scanner/status/', views.scanner_status, name='scanner_status'),
+    path('metrics/', views.metrics_view, name='metrics'),  # Prometheus scrape endpoint
+    path('analytics/', views.analytics_view, name='analytics'),  # Org-wide rollup analytics (staff)
 
 ]
@@ -1,58 +1,148 @@
-import subprocess
-import tempfile
-import json
-import os
+import functools
+from dataclasses import dataclass
 
-def analyze_accessibility(input_data, input_type):
+from django.conf import settings
+
+from .metrics import stage_timer
+
+
+def summarize_violations(violations):
     """
-    Executes Node.js script to perform accessibility analysis.
+    Build the severity summary stored alongside the raw axe violations.
     """
-    node_script_path = os.path.join('scanner', 'scan_url.js' if input_type == 'url' else 'scan_html.js')
+    return {
+        "total_violations": len(violations),
+        "critical": sum(1 for v in violations if v["impact"] == "critical"),
+        "serious": sum(1 for v in violations if v["impact"] == "serious"),
+        "moderate": sum(1 for v in violations if v["impact"] == "moderate"),
+        "minor": sum(1 for v in violations if v["impact"] == "minor"),
+    }
 
-    if not os.path.exists(node_script_path):
-        raise Exception(f"Node.js script not found at {node_script_path}")
+def analyze_accessibility(input_data, input_type='url', use_cache=True, on_progress=None, engine=None,
+                          refresh_cache=False):
+    """
+    Run an accessibility scan on a pooled, long-lived Node.js scanner worker.
 
-    try:
-        if input_type == 'url':
-            result = subprocess.run(['node', node_script_path, input_data], capture_output=True, text=True)
-        else:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.html', mode='w') as temp_file:
-                temp_file.write(input_data)
-                temp_path = temp_file.name
+    Results are served from the scan cache (see SCAN_CACHE) when the same
+    normalized input was already scanned by the same scanner build.
+    Set SCANNER['BACKEND'] to 'mock' to use the bundled mock results instead
+    (e.g. for development without Node.js installed).
 
-            result = subprocess.run(['node', node_script_path, temp_path], capture_output=True, text=True)
-            os.unlink(temp_path)
+    Args:
+        input_data: URL or HTML content to analyze
+        input_type: 'url' or 'html'
+        use_cache: set to False to force a fresh scan
+        on_progress: optional callable receiving scan phase events
+            ({'phase': 'loaded'}, {'phase': 'rules', 'counts': ...}, ...)
+        engine: engine for HTML input, one of ScanJob.ENGINE_CHOICES;
+            defaults to SCANNER['HTML_ENGINE']
+        refresh_cache: scan afresh and replace the cached result, e.g. for
+            a page known to have changed
 
-        if result.returncode != 0:
-            raise Exception(f"Error from accessibility scanner: {result.stderr}\n{result.stdout}")
+    Returns:
+        dict: Analysis results including violations and summary
+    """
+    engine = get_html_engine(engine) if input_type == 'html' else ScanJob.ENGINE_AXE
+    scan = functools.partial(run_scanner, on_progress=on_progress, engine=engine)
+    # The in-process engine takes milliseconds, less than a cache round trip
+    if not use_cache or engine == ScanJob.ENGINE_LXML:
+        return scan(input_data, input_type)
 
-        try:
-            data = json.loads(result.stdout)
-        except json.JSONDecodeError as e:
-            raise Exception(f"Error parsing JSON from accessibility scanner output: {e}")
-
-        # Optional: reformat into your existing format
-        summary = {
-            "total_violations": len(data["violations"]),
-            "critical": sum(1 for v in data["violations"] if v["impact"] == "critical"),
-            "serious": sum(1 for v in data["violations"] if v["impact"] == "serious"),
-            "moderate": sum(1 for v in data["violations"] if v["impact"] == "moderate"),
-            "minor": sum(1 for v in data["violations"] if v["impact"] == "minor"),
-        }
+    from .scan_cache import cached_scan
+
+    return cached_scan(
+        input_data, input_type, scan, variant='' if engine == ScanJob.ENGINE_AXE else engine, refresh=refresh_cache,
+    )
+
+def get_html_engine(engine=None):
+    return engine or getattr(settings, 'SCANNER', {}).get('HTML_ENGINE', ScanJob.ENGINE_AXE)
+
+def run_scanner(input_data, input_type='url', on_progress=None, engine=None):
+    """
+    Scan the input with the configured scanner backend, bypassing the cache.
+    """
+    if input_type == 'html' and engine in (ScanJob.ENGINE_LXML, ScanJob.ENGINE_PREFILTER):
+        return scan_html_in_process(input_data, engine, on_progress)
+
+    if getattr(settings, 'SCANNER', {}).get('BACKEND') == 'mock':
+        result = mock_analyze_accessibility(input_data, input_type)
+        if on_progress is not None:
+            on_progress({'phase': 'loaded'})
+            on_progress({'phase': 'rules', 'group': 'all', 'done': 1, 'total': 1, 'counts': result['summary']})
+        return result
+
+    from .scanner_pool import get_pool
+
+    try:
+        if input_type == 'url':
+            data = scan_url(get_pool(), input_data, on_progress)
+        else:
+            data = get_pool().scan(input_data, input_type, on_progress=on_progress)
 
         return {
-            "summary": summary,
+            "summary": summarize_violations(data["violations"]),
             "violations": data["violations"]
         }
-    
+
     except Exception as e:
         raise Exception(f"An error occurred during accessibility analysis: {str(e)}")
-    
+
+
+def scan_html_in_process(html, engine, on_progress=None):
+    """
+    Check HTML with the in-process structural rules (see rule_engine). With
+    the 'prefilter' engine, axe-core then runs with those rules turned off
+    and its violations are added to the in-process ones.
+    """
+    from .rule_engine import RULES, check_html
+
+    violations = check_html(html)['violations']
+    if on_progress is not None:
+        on_progress({'phase': 'loaded'})
+        on_progress({'phase': 'rules', 'group': 'structural', 'done': 1, 'total': 1,
+                     'counts': summarize_violations(violations)})
+
+    if engine == ScanJob.ENGINE_PREFILTER:
+        if getattr(settings, 'SCANNER', {}).get('BACKEND') == 'mock':
+            remaining = mock_analyze_accessibility(html, 'html')['violations']
+        else:
+            from .scanner_pool import get_pool
+
+            options = dict(getattr(settings, 'SCANNER', {}).get('AXE_OPTIONS', {}))
+            options['rules'] = {**options.get('rules', {}), **{rule_id: {'enabled': False} for rule_id in RULES}}
+            try:
+                remaining = get_pool().scan(html, 'html', on_progress=on_progress, options=options)['violations']
+            except Exception as e:
+                raise Exception(f"An error occurred during accessibility analysis: {str(e)}")
+        violations = violations + [v for v in remaining if v['id'] not in RULES]
+
+    return {
+        "summary": summarize_violations(violations),
+        "violations": violations
+    }
+
+
+def scan_url(pool, url, on_progress=None):
+    """
+    Scan a URL. In SCANNER['URL_MODE'] = 'prefetched', the page body from
+    the shared fetch layer (usually already fetched during form validation)
+    is scanned as HTML, so the target is only hit once.
+    """
+    from .fetch import FetchError, fetch_page, is_complete, url_scan_mode, with_base_href
+
+    if url_scan_mode() == 'prefetched':
+        try:
+            page = fetch_page(url)
+        except FetchError:
+            page = None
+        if page is not None and is_complete(page):
+            return pool.scan(with_base_href(page.text, page.url), 'html', on_progress=on_progress)
+    return pool.scan(url, 'url', on_progress=on_progress)
 
 
 # Add to utils.py
-import re
-from .models import AccessibilityRemediationTip
+from .code_fixes import CONTRAST_RULES, apply_code_fix
+from .models import AccessibilityRemediationTip, ScanJob
 
 # Add these functions to your utils.py file
 
@@ -77,6 +167,37 @@ def map_axe_rule_to_issue_type(rule_id):
     
     return mapping.get(rule_id, 'other')
 
+@dataclass(frozen=True, slots=True)
+class ViolationInfo:
+    """Rule-level details shared by every remediation item of one violation."""
+    id: str
+    impact: str
+    description: str
+    help: str
+    helpUrl: str
+
+
+@dataclass(frozen=True, slots=True)
+class TipsInfo:
+    """Remediation guidance for a violation, from the tip table or a default."""
+    solution: str
+    code_example_before: str = ""
+    code_example_after: str = ""
+    wcag_reference: str = ""
+
+
+@dataclass(frozen=True, slots=True)
+class RemediationItem:
+    """One violation node with its suggested fix, as rendered in result.html."""
+    violation: ViolationInfo
+    html_snippet: str
+    tips: TipsInfo
+    suggested_fix: str
+    # contrast.ContrastFix for color-contrast nodes whose colors are known
+    contrast: object = None
+
+
+@stage_timer('remediation_plan')
 def generate_remediation_plan(analysis):
     """
     Generate a comprehensive remediation plan from accessibility analysis results.
@@ -85,78 +206,76 @@ def generate_remediation_plan(analysis):
         analysis: AccessibilityAnalysis instance
         
     Returns:
-        list: List of remediation items with violation info and fix suggestions
+        list: List of RemediationItem with violation info and fix suggestions
     """
-    from .models import AccessibilityRemediationTip
-    
+    from .tip_index import get_tip_index
+
     # Get violations from analysis
     violations = analysis.violations
-    
+
+    # All tips are looked up in memory; no queries per violation or node
+    tip_index = get_tip_index()
+
     remediation_plan = []
     
     for violation in violations:
+        violation_id = violation.get('id', '')
+        impact = violation.get('impact', 'moderate')
+
+        # Violation info and tips are shared by all nodes of this violation
+        violation_info = ViolationInfo(
+            id=violation.get('id', 'unknown'),
+            impact=impact,
+            description=violation.get('description', ''),
+            help=violation.get('help', ''),
+            helpUrl=violation.get('helpUrl', ''),
+        )
+
+        # Find matching tip from the in-memory index
+        tip = tip_index.lookup(map_axe_rule_to_issue_type(violation_id), impact)
+        if tip:
+            tips = TipsInfo(
+                solution=tip.solution,
+                code_example_before=tip.code_example_before,
+                code_example_after=tip.code_example_after,
+                wcag_reference=tip.wcag_reference,
+            )
+        else:
+            # Default tips if none found
+            tips = TipsInfo(solution=f"Address the {impact} {violation_id} issue.")
+
+        nodes = violation.get('nodes', [])
+        contrast_fixes = [None] * len(nodes)
+        if violation_id in CONTRAST_RULES:
+            from .contrast import RULE_LEVELS, analyze_nodes, restyle
+
+            # All nodes at once, using the colors axe-core measured where it reported them
+            contrast_fixes = analyze_nodes(nodes, level=RULE_LEVELS.get(violation_id))
+
         # For each node (instance) of this violation
-        for node in violation.get('nodes', []):
-            # Create a remediation item
-            remediation_item = type('RemediationItem', (), {})()
-            
-            # Store violation info
-            remediation_item.violation = type('ViolationInfo', (), {})()
-            remediation_item.violation.id = violation.get('id', 'unknown')
-            remediation_item.violation.impact = violation.get('impact', 'moderate')
-            remediation_item.violation.description = violation.get('description', '')
-            remediation_item.violation.help = violation.get('help', '')
-            remediation_item.violation.helpUrl = violation.get('helpUrl', '')
-            
-            # Get HTML snippet
-            remediation_item.html_snippet = node.get('html', '')
-            
-            # Find matching tip from database
-            issue_type = map_axe_rule_to_issue_type(violation.get('id', ''))
-            
-            try:
-                tip = AccessibilityRemediationTip.objects.filter(
-                    issue_type=issue_type,
-                    severity=violation.get('impact', 'moderate')
-                ).first()
-                
-                if not tip:
-                    # Try to find any tip for this issue type regardless of severity
-                    tip = AccessibilityRemediationTip.objects.filter(
-                        issue_type=issue_type
-                    ).first()
-            except:
-                tip = None
-            
-            # Create tips object
-            remediation_item.tips = type('TipsInfo', (), {})()
-            
-            if tip:
-                remediation_item.tips.solution = tip.solution
-                remediation_item.tips.code_example_before = tip.code_example_before
-                remediation_item.tips.code_example_after = tip.code_example_after
-                remediation_item.tips.wcag_reference = tip.wcag_reference
+        for node, contrast_fix in zip(nodes, contrast_fixes):
+            html_snippet = node.get('html', '')
+            if contrast_fix is not None and not contrast_fix.passes:
+                suggested_fix = restyle(html_snippet, contrast_fix)
             else:
-                # Default tips if none found
-                remediation_item.tips.solution = f"Address the {violation.get('impact', 'moderate')} {violation.get('id', '')} issue."
-                remediation_item.tips.code_example_before = ""
-                remediation_item.tips.code_example_after = ""
-                remediation_item.tips.wcag_reference = ""
-            
-            # Generate suggested fix - THIS IS THE KEY CHANGE
-            remediation_item.suggested_fix = generate_code_fix(
-                remediation_item.html_snippet,
-                violation.get('id', ''),
-                violation.get('impact', 'moderate')
-            )
-            
-            remediation_plan.append(remediation_item)
+                # Memoized: nodes sharing a snippet and rule reuse the same fix
+                suggested_fix = generate_code_fix(html_snippet, violation_id, impact)
+            remediation_plan.append(RemediationItem(
+                violation=violation_info,
+                html_snippet=html_snippet,
+                tips=tips,
+                suggested_fix=suggested_fix,
+                contrast=contrast_fix,
+            ))
     
     return remediation_plan
 
+@functools.lru_cache(maxsize=4096)
 def generate_code_fix(html_snippet, violation_id, impact):
     """
     Generate a fixed version of the HTML snippet based on the violation type.
+    Fixers are looked up by rule ID in the code_fixes registry. Results are
+    memoized per (snippet, rule, impact) in a bounded LRU cache.
     
     Parameters:
     html_snippet (str): The original HTML code with accessibility issues
@@ -166,146 +285,12 @@ def generate_code_fix(html_snippet, violation_id, impact):
     Returns:
     str: The fixed HTML code with accessibility issues resolved
     """
-    # Default to original if no fixes can be applied
-    fixed_html = html_snippet
-    
-    # Apply fixes based on common accessibility issues
-    if violation_id == 'image-alt':
-        # Fix missing alt text on images
-        if '<img ' in html_snippet and not 'alt=' in html_snippet:
-            fixed_html = html_snippet.replace('<img ', '<img alt="Descriptive alt text" ')
-        elif '<img ' in html_snippet and 'alt=""' in html_snippet:
-            fixed_html = html_snippet.replace('alt=""', 'alt="Descriptive alt text"')
-    
-    elif violation_id == 'button-name':
-        # Fix buttons with no accessible name
-        if '<button' in html_snippet and not 'aria-label' in html_snippet:
-            if '>' in html_snippet and '</button>' in html_snippet:
-                button_parts = html_snippet.split('>', 1)
-                if len(button_parts) > 1 and not button_parts[1].strip():
-                    # Empty button
-                    fixed_html = button_parts[0] + '>Button Label</button>'
-                else:
-                    # Button with potentially inadequate text
-                    fixed_html = html_snippet
-            else:
-                fixed_html = html_snippet.replace('<button', '<button aria-label="Button label"')
-    
-    elif violation_id == 'color-contrast':
-        # Suggest stronger contrast class
-        if 'style="' in html_snippet:
-            fixed_html = html_snippet.replace('style="', 'style="color: #000000; background-color: #ffffff; ')
-        else:
-            if '<' in html_snippet and '>' in html_snippet:
-                tag_end = html_snippet.find('>')
-                fixed_html = html_snippet[:tag_end] + ' style="color: #000000; background-color: #ffffff;"' + html_snippet[tag_end:]
-            else:
-                fixed_html = '<!-- Increase contrast ratio to at least 4.5:1 -->\n' + html_snippet
-    
-    elif violation_id == 'label':
-        # Fix form controls without labels
-        if '<input' in html_snippet and not '<label' in html_snippet:
-            input_id = "input-example"
-            if 'id="' in html_snippet:
-                # Extract existing ID if present
-                import re
-                id_match = re.search(r'id=["\']([^"\']+)["\']', html_snippet)
-                if id_match:
-                    input_id = id_match.group(1)
-            else:
-                # Add ID if none exists
-                fixed_html = html_snippet.replace('<input', f'<input id="{input_id}"')
-            
-            # Add label before the input element
-            fixed_html = f'<label for="{input_id}">Descriptive Label</label>\n{fixed_html}'
-            
-    elif violation_id == 'link-name':
-        # Fix links with no text
-        if '<a ' in html_snippet:
-            if '></a>' in html_snippet or "></a>" in html_snippet:
-                # Empty link
-                fixed_html = html_snippet.replace('></a>', '>Descriptive Link Text</a>')
-                fixed_html = fixed_html.replace('></a>', '>Descriptive Link Text</a>')
-            elif 'aria-label' not in html_snippet:
-                # Link with potentially inadequate text
-                link_parts = html_snippet.split('>')
-                if len(link_parts) > 1:
-                    # Insert aria-label
-                    fixed_html = link_parts[0] + ' aria-label="Descriptive Link Purpose">' + '>'.join(link_parts[1:])
-    
-    elif violation_id in ['list', 'listitem']:
-        # Fix improper list markup
-        if '<ul>' in html_snippet and '<li>' not in html_snippet:
-            fixed_html = html_snippet.replace('<ul>', '<ul>\n  <li>List item</li>\n')
-        elif '<ol>' in html_snippet and '<li>' not in html_snippet:
-            fixed_html = html_snippet.replace('<ol>', '<ol>\n  <li>List item</li>\n')
-            
-    elif violation_id in ['table-fake-caption', 'td-headers-attr', 'th-has-data-cells']:
-        # Fix table issues
-        if '<table' in html_snippet:
-            if '<caption' not in html_snippet:
-                fixed_html = html_snippet.replace('<table', '<table role="table"')
-                tag_end = fixed_html.find('>')
-                fixed_html = fixed_html[:tag_end+1] + '\n  <caption>Table Caption</caption>' + fixed_html[tag_end+1:]
-            
-            if '<th' not in html_snippet and '<thead' not in html_snippet:
-                # Add table headers
-                row_start = fixed_html.find('<tr')
-                if row_start != -1:
-                    row_end = fixed_html.find('</tr>', row_start)
-                    # Check if we found both the start and end of a row
-                    if row_end != -1:
-                        # Replace td with th in first row
-                        row_content = fixed_html[row_start:row_end]
-                        fixed_row = row_content.replace('<td', '<th').replace('</td>', '</th>')
-                        fixed_html = fixed_html[:row_start] + fixed_row + fixed_html[row_end:]
-            
-    elif violation_id == 'document-title':
-        # Fix missing document title
-        fixed_html = html_snippet.replace('<head>', '<head>\n  <title>Page Title</title>')
-    
-    elif violation_id == 'heading-order':
-        # Fix heading order issues
-        import re
-        heading_match = re.search(r'<h([1-6])', html_snippet)
-        if heading_match:
-            current_level = int(heading_match.group(1))
-            if current_level > 1:  # If not h1
-                fixed_html = html_snippet.replace(f'<h{current_level}', f'<h{current_level-1}')
-                fixed_html = fixed_html.replace(f'</h{current_level}>', f'</h{current_level-1}>')
-                
-    elif violation_id == 'aria-roles':
-        # Fix ARIA roles issues
-        if 'role=' in html_snippet:
-            # Replace invalid role with appropriate one
-            fixed_html = re.sub(r'role=["\'][^"\']*["\']', 'role="region"', html_snippet)
-        else:
-            # Add appropriate role based on element type
-            if '<div' in html_snippet:
-                fixed_html = html_snippet.replace('<div', '<div role="region"')
-            elif '<span' in html_snippet:
-                fixed_html = html_snippet.replace('<span', '<span role="text"')
-                
-    # Add more violation types as needed
-    
-    # If we couldn't generate a specific fix or the fix is identical to the original
-    if fixed_html == html_snippet:
-        # Create a default fix with a comment
-        element_parts = html_snippet.split('>', 1)
-        if len(element_parts) > 1:
-            tag_part = element_parts[0] + '>'
-            content_part = '>' + element_parts[1] if len(element_parts) > 1 else ''
-            fixed_html = f"{tag_part}\n<!-- FIXED: {violation_id} - {impact} impact -->{content_part}"
-        else:
-            fixed_html = f"<!-- FIXED: {violation_id} - {impact} impact -->\n{html_snippet}"
-    
-    return fixed_html
+    return apply_code_fix(html_snippet, violation_id, impact)
 
-def analyze_accessibility(input_data, input_type='url'):
+def mock_analyze_accessibility(input_data, input_type='url'):
     """
     Analyze accessibility of a URL or HTML content using a headless browser and axe-core.
-    This is a simplified mock function. In a real implementation, this would use
-    a headless browser like Playwright or Selenium with axe-core integration.
+    This is a simplified mock function used when SCANNER['BACKEND'] is 'mock'.
     
     Args:
         input_data: URL or HTML content to analyze
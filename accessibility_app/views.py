@@ -1,23 +1,39 @@
 # ======================== Django & Library Imports ========================
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.urls import reverse
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Avg, Case, Count, Min, Sum, TextField, Value, When
+from django.middleware.csrf import CsrfViewMiddleware
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
-from xhtml2pdf import pisa
-import matplotlib.pyplot as plt
 import base64
-from io import BytesIO
+import hmac
+import json
 
 # ======================== App-specific Imports ========================
 from .forms import AccessibilityAnalyzerForm, SignupForm
-from .models import AccessibilityAnalysis, ScanHistory
+from .models import AccessibilityAnalysis, ScanJob
+from .admission import ScanRejected, admit_job, admit_request_scans
+from .jobs import enqueue_scan
+from .metrics import CONTENT_TYPE, REGISTRY, get_metrics_settings, stage_timer
+from .bulk import BulkScanError, iter_bulk_scan, parse_bulk_items
+from .exports import FORMATS, ExportError, export_queryset, iter_rows, parse_export_options, render_rows
+from .pagination import keyset_page
+from .rollups import PERIODS, analytics_report
+from .progress import job_event_stream
+from .reports import get_pdf_report
+from .streaming import stream_response
 from .utils import (
-    analyze_accessibility,
     generate_remediation_plan,
     generate_code_fix,
     map_axe_rule_to_issue_type,
@@ -27,13 +43,55 @@ from .utils import (
 def custom_login_required(view_func):
     """
     Custom decorator that redirects unauthenticated users to the login page.
+    Works on both sync and async views.
     """
+    if iscoroutinefunction(view_func):
+        async def _wrapped_async_view(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return redirect(reverse('accessibility_app:login'))
+            return await view_func(request, *args, **kwargs)
+        return markcoroutinefunction(_wrapped_async_view)
+
     def _wrapped_view(request, *args, **kwargs):
         if not request.user.is_authenticated:
             return redirect(reverse('accessibility_app:login'))
         return view_func(request, *args, **kwargs)
     return _wrapped_view
 
+def _basic_auth_user(request):
+    """Return the user for valid HTTP Basic credentials, or None."""
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if not header.startswith('Basic '):
+        return None
+    try:
+        username, password = base64.b64decode(header[6:]).decode('utf-8').split(':', 1)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return authenticate(request, username=username, password=password)
+
+def api_login_required(view_func):
+    """
+    Decorator for JSON API views. Accepts HTTP Basic credentials (for CI
+    pipelines) or a logged-in session, and answers 401 JSON otherwise.
+    Session-authenticated requests still go through CSRF protection.
+    """
+    @csrf_exempt
+    def _wrapped_view(request, *args, **kwargs):
+        user = _basic_auth_user(request)
+        if user is not None:
+            request.user = user
+        elif request.user.is_authenticated:
+            reason = CsrfViewMiddleware(lambda r: None).process_view(request, None, (), {})
+            if reason is not None:
+                return reason
+        else:
+            response = JsonResponse({"error": "Authentication required."}, status=401)
+            response['WWW-Authenticate'] = 'Basic realm="AccessiScan API"'
+            return response
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
 def common_issues(request):
     return render(request, 'common_issues.html')
 
@@ -92,36 +150,85 @@ def logout_view(request):
     return redirect("accessibility_app:login")
 
 # ======================== Dashboard View ========================
+def analysis_history(user):
+    """
+    A user's analyses without their inputs; result and HTML blobs are never loaded.
+    URL inputs are selected in SQL as ``url``.
+    """
+    return (
+        AccessibilityAnalysis.objects.filter(user=user)
+        .defer('input_text')
+        .annotate(url=Case(When(input_type='url', then='input_text'), default=Value(''), output_field=TextField()))
+    )
+
+def history_stats(user):
+    """Headline totals and averages for a user's analyses, computed in the database."""
+    return AccessibilityAnalysis.objects.filter(user=user).aggregate(
+        scans=Count('id'),
+        average_score=Avg('score'),
+        lowest_score=Min('score'),
+        total_violations=Sum('total'),
+        critical=Sum('critical'),
+        serious=Sum('serious'),
+        moderate=Sum('moderate'),
+        minor=Sum('minor'),
+    )
+
 @custom_login_required
 def dashboard_view(request):
-    history = AccessibilityAnalysis.objects.filter(user=request.user).order_by('-created_at')
+    page, next_cursor = keyset_page(
+        analysis_history(request.user),
+        cursor=request.GET.get('cursor'),
+        page_size=getattr(settings, 'HISTORY_PAGE_SIZE', 25),
+    )
     enriched_history = [
         {
             "report": report,
-            "critical": report.get_severity_count("critical"),
-            "serious": report.get_severity_count("serious"),
-            "moderate": report.get_severity_count("moderate"),
-            "minor": report.get_severity_count("minor"),
-            "score": report.calculate_score(),
+            "critical": report.critical,
+            "serious": report.serious,
+            "moderate": report.moderate,
+            "minor": report.minor,
+            "score": report.score,
         }
-        for report in history
+        for report in page
     ]
-    return render(request, "dashboard.html", {"history": enriched_history})
+    return render(request, "dashboard.html", {
+        "history": enriched_history,
+        "stats": history_stats(request.user),
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get('cursor'),
+    })
 
 # ======================== Home View ========================
 @custom_login_required
 def home(request):
     if request.method == 'POST':
+        # Admit before validating the form: validation fetches the URL
+        try:
+            admit_job(request)
+        except ScanRejected as e:
+            messages.error(request, f"{e} Please try again in {e.retry_after} seconds.")
+            # Unbound, so rendering it doesn't run that validation either
+            form = AccessibilityAnalyzerForm(initial=request.POST.dict())
+            response = render(request, 'home.html', {'form': form}, status=429)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+
         form = AccessibilityAnalyzerForm(request.POST)
         if form.is_valid():
             input_type = form.cleaned_data['input_type']
             input_data = form.cleaned_data.get(input_type)
 
-            # Store in session
-            request.session['input_type'] = input_type
-            request.session['input_data'] = input_data
-
-            return redirect('accessibility_app:result')
+            job = enqueue_scan(
+                user=request.user,
+                input_type=input_type,
+                input_data=input_data,
+                user_ip=request.META.get('REMOTE_ADDR'),
+                user_agent=request.META.get('HTTP_USER_AGENT'),
+                engine=form.cleaned_data['engine'] if input_type == 'html' else '',
+                page=form.prefetched_page if input_type == 'url' else None,
+            )
+            return redirect('accessibility_app:scan_job', job_id=job.id)
     else:
         form = AccessibilityAnalyzerForm()
 
@@ -133,41 +240,17 @@ def result(request, analysis_id=None):
     """
     Display analysis results and remediation suggestions.
     """
-    if analysis_id:
-        analysis = get_object_or_404(AccessibilityAnalysis, id=analysis_id, user=request.user)
-        input_type, input_data = analysis.input_type, analysis.input_data
-    else:
-        input_type = request.session.get('input_type')
-        input_data = request.session.get('input_data')
-        if not input_type or not input_data:
-            messages.error(request, 'No data to analyze. Please submit the form first.')
-            return redirect('accessibility_app:home')
+    if not analysis_id:
+        messages.error(request, 'No data to analyze. Please submit the form first.')
+        return redirect('accessibility_app:home')
 
-        try:
-            analysis_result = analyze_accessibility(input_data, input_type)
-            analysis = AccessibilityAnalysis.objects.create(
-                input_type=input_type,
-                input_data=input_data,
-                result_json=analysis_result,
-                user_ip=request.META.get('REMOTE_ADDR'),
-                user_agent=request.META.get('HTTP_USER_AGENT'),
-                user=request.user
-            )
-            ScanHistory.objects.create(
-                user=request.user,
-                url=input_data if input_type == "url" else None,
-                html_input=input_data if input_type == "html" else None,
-                scan_result=analysis_result,
-            )
-            request.session.pop('input_type', None)
-            request.session.pop('input_data', None)
-        except Exception as e:
-            messages.error(request, f"An error occurred while analyzing the data: {e}")
-            return redirect('accessibility_app:home')
+    analysis = get_object_or_404(AccessibilityAnalysis, id=analysis_id, user=request.user)
+    input_type, input_data = analysis.input_type, analysis.input_data
 
     remediation_plan = generate_remediation_plan(analysis)
     severity = {level: analysis.get_severity_count(level) for level in ['critical', 'serious', 'moderate', 'minor']}
     total_count = sum(severity.values())
+    scan_diff = analysis.compare_with_previous()
 
     context = {
         'analysis': analysis,
@@ -179,13 +262,65 @@ def result(request, analysis_id=None):
         'total_count': total_count,
         'score': analysis.calculate_score(),
         'remediation_plan': remediation_plan,
+        'scan_diff': scan_diff,
+        'diff_sections': [
+            ('New issues', scan_diff.new, 'red'),
+            ('Fixed issues', scan_diff.fixed, 'green'),
+        ] if scan_diff else [],
         'view_mode': request.GET.get('view', 'results'),
         'critical_count': severity['critical'],  # backward compatibility
         'serious_count': severity['serious'],
         'moderate_count': severity['moderate'],
         'minor_count': severity['minor'],
     }
-    return render(request, 'result.html', context)
+    with stage_timer('render'):
+        return render(request, 'result.html', context)
+
+# ======================== Scan Job Views ========================
+@custom_login_required
+def scan_job(request, job_id):
+    """
+    Show a progress page that polls the job status until the analysis is ready.
+    """
+    job = get_object_or_404(ScanJob.objects.defer('page_html'), id=job_id, user=request.user)
+    if job.status == ScanJob.STATUS_DONE and job.analysis_id:
+        return redirect('accessibility_app:result', analysis_id=job.analysis_id)
+    if job.status == ScanJob.STATUS_FAILED:
+        messages.error(request, f"An error occurred while analyzing the data: {job.error}")
+        return redirect('accessibility_app:home')
+    return render(request, 'scan_pending.html', {'job': job})
+
+@custom_login_required
+def scan_job_status(request, job_id):
+    """
+    Return the job status as JSON for polling.
+    """
+    job = get_object_or_404(ScanJob.objects.defer('page_html'), id=job_id, user=request.user)
+    data = {
+        "id": job.id,
+        "status": job.status,
+        "error": job.error or None,
+        "analysis_id": job.analysis_id,
+        "result_url": None,
+    }
+    if job.status == ScanJob.STATUS_DONE and job.analysis_id:
+        data["result_url"] = reverse('accessibility_app:result', args=[job.analysis_id])
+    return JsonResponse(data)
+
+@custom_login_required
+async def scan_job_events(request, job_id):
+    """
+    Stream the job's progress as server-sent events. Async, so on the ASGI
+    server an open stream doesn't hold a thread between updates.
+    """
+    user = await request.auser()
+    if not await ScanJob.objects.filter(id=job_id, user=user).aexists():
+        raise Http404("No such scan job.")
+
+    response = StreamingHttpResponse(job_event_stream(job_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # don't let nginx buffer the stream
+    return response
 
 @custom_login_required
 def remediation_view(request, analysis_id):
@@ -195,44 +330,175 @@ def remediation_view(request, analysis_id):
 # ======================== PDF View ========================
 @custom_login_required
 def generate_pdf(request, analysis_id):
+    """
+    Stream the analysis' pre-rendered PDF report, rendering it once if the
+    background worker hasn't produced it yet.
+    """
     analysis = get_object_or_404(AccessibilityAnalysis, id=analysis_id)
 
-    fig, ax = plt.subplots()
-    labels = ['Critical', 'Serious', 'Moderate', 'Minor']
-    counts = [analysis.get_severity_count(label.lower()) for label in labels]
-    colors = ['#f44336', '#ff9800', '#ffeb3b', '#4caf50']
+    try:
+        path = get_pdf_report(analysis)
+    except Exception:
+        return HttpResponse("Error generating PDF", status=500)
 
-    ax.pie(counts, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-    ax.axis('equal')
-    buf = BytesIO()
-    plt.savefig(buf, format='png')
-    plt.close(fig)
+    return FileResponse(
+        open(path, 'rb'),
+        as_attachment=True,
+        filename='accessibility_analysis.pdf',
+        content_type='application/pdf',
+    )
 
-    chart_base64 = base64.b64encode(buf.getvalue()).decode('utf-8')
-    context = {
-        'analysis': analysis,
-        'input_data': analysis.input_data,
-        'input_type': analysis.input_type,
-        'total_violations': analysis.total_violations(),
-        'critical': counts[0],
-        'serious': counts[1],
-        'moderate': counts[2],
-        'minor': counts[3],
-        'chart_base64': chart_base64,
-        'score': analysis.calculate_score(),
-    }
+# ======================== Scan Diff API ========================
+@api_login_required
+def analysis_diff_api(request, analysis_id):
+    """
+    Issues that are new or fixed in an analysis compared with the previous
+    scan of the same URL. ``previous_id`` is null for a first scan.
+    """
+    analysis = get_object_or_404(AccessibilityAnalysis, id=analysis_id, user=request.user)
+    scan_diff = analysis.compare_with_previous()
+    return JsonResponse({
+        "analysis_id": analysis.id,
+        "previous_id": analysis.previous_id,
+        "new": scan_diff.new if scan_diff else [],
+        "fixed": scan_diff.fixed if scan_diff else [],
+        "unchanged": scan_diff.unchanged if scan_diff else None,
+    })
 
-    html_string = render_to_string('pdf_template.html', context)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="accessibility_analysis.pdf"'
+# ======================== Bulk Scan API ========================
+@api_login_required
+@require_POST
+def bulk_scan_api(request):
+    """
+    Scan a batch of URLs and/or HTML documents in one request.
 
-    if pisa.CreatePDF(html_string, dest=response).err:
-        return HttpResponse("Error generating PDF", status=500)
+    Body: {"items": [{"url": "..."}, {"html": "..."}], "stream": false}
+    With "stream": true (or ?stream=1), results are sent back as NDJSON, one
+    line per item as soon as it finishes.
+    """
+    try:
+        payload = json.loads(request.body)
+        items = parse_bulk_items(payload)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Request body must be valid JSON."}, status=400)
+    except BulkScanError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        admit_request_scans(request)
+    except ScanRejected as e:
+        response = JsonResponse({"error": str(e), "retry_after": e.retry_after}, status=429)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+
+    results = iter_bulk_scan(
+        items,
+        user=request.user,
+        user_ip=request.META.get('REMOTE_ADDR'),
+        user_agent=request.META.get('HTTP_USER_AGENT'),
+    )
+
+    if payload.get('stream') or request.GET.get('stream') == '1':
+        lines = (json.dumps(item) + "\n" for item in results)
+        return stream_response(request, lines, 'application/x-ndjson', batch_size=1)
+
+    items = sorted(results, key=lambda item: item['index'])
+    return JsonResponse({
+        "count": len(items),
+        "failed": sum(1 for item in items if item['status'] == 'error'),
+        "items": items,
+    })
 
+# ======================== Export API ========================
+@api_login_required
+def export_analyses(request):
+    """
+    Stream the user's analyses as NDJSON (default) or CSV.
+
+    Query parameters: format=ndjson|csv, columns=id,url,score,...,
+    since/until (ISO dates or datetimes), input_type=url|html, nodes=1 for
+    one row per violation node, and all=1 (staff only) for every user.
+    """
+    try:
+        options = parse_export_options(request.GET)
+    except ExportError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if request.GET.get('all') == '1' and not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required to export all users."}, status=403)
+
+    user = None if request.GET.get('all') == '1' else request.user
+    rows = iter_rows(export_queryset(options, user=user), options)
+    response = stream_response(request, render_rows(rows, options), FORMATS[options.format])
+    response['Content-Disposition'] = f'attachment; filename="analyses.{options.format}"'
     return response
 
+# ======================== Scanner Status View ========================
+@custom_login_required
+def scanner_status(request):
+    """Report scanner pool utilisation and scan cache hit rates."""
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required."}, status=403)
+    from .scanner_pool import get_pool
+    from .scan_cache import get_scan_cache
+    cache = get_scan_cache()
+    status = get_pool().status()
+    status["cache"] = cache.status() if cache is not None else None
+    return JsonResponse(status)
+
+# ======================== Metrics View ========================
+def metrics_view(request):
+    """
+    Expose this process' metrics in the Prometheus text format, to scrapers
+    presenting METRICS['TOKEN'] as a bearer token, or to staff users.
+    """
+    config = get_metrics_settings()
+    if not config['ENABLED']:
+        raise Http404("Metrics are disabled.")
+    token = config['TOKEN']
+    authorized = request.user.is_authenticated and request.user.is_staff
+    if token and not authorized:
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        authorized = scheme.lower() == 'bearer' and hmac.compare_digest(credentials.strip(), token)
+    if not authorized:
+        return HttpResponse("Metrics access requires a token or a staff account.", status=403, content_type='text/plain')
+    return HttpResponse(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+# ======================== Analytics View ========================
+@custom_login_required
+def analytics_view(request):
+    """
+    Org-wide rule frequency, score trend and time to fix, read from the
+    daily/weekly rollups. Staff only; format=json returns the same figures.
+    """
+    if not request.user.is_staff:
+        return HttpResponse("Analytics require a staff account.", status=403, content_type='text/plain')
+    period = request.GET.get('period') or 'week'
+    if period not in PERIODS:
+        period = 'week'
+    try:
+        periods = int(request.GET.get('periods') or 12)
+    except ValueError:
+        periods = 12
+    periods = min(max(periods, 1), 366 if period == 'day' else 104)
+
+    with stage_timer('analytics_report'):
+        report = analytics_report(period=period, periods=periods)
+    if request.GET.get('format') == 'json':
+        return JsonResponse(report, encoder=DjangoJSONEncoder)
+    return render(request, 'analytics.html', {'report': report, 'periods': periods})
+
 # ======================== Profile View ========================
 @custom_login_required
 def profile_view(request):
-    history = AccessibilityAnalysis.objects.filter(user=request.user).order_by('-created_at')
-    return render(request, "profile.html", {"user": request.user, "history": history})
+    history, next_cursor = keyset_page(
+        AccessibilityAnalysis.objects.filter(user=request.user).only('id', 'created_at', 'input_type'),
+        cursor=request.GET.get('cursor'),
+        page_size=getattr(settings, 'HISTORY_PAGE_SIZE', 25),
+    )
+    return render(request, "profile.html", {
+        "user": request.user,
+        "history": history,
+        "stats": history_stats(request.user),
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get('cursor'),
+    })
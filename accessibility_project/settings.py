@@ -25,6 +25,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings and query counts cover the other middleware too
+    'accessibility_app.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,4 +96,149 @@ STATICFILES_DIRS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # settings.py
-LOGIN_URL = '/accessibility_app/login/'
\ No newline at end of file
+LOGIN_URL = '/accessibility_app/login/'
+
+# Accessibility scanner worker pool
+# BACKEND: 'pool' runs scans on long-lived Node.js workers, 'mock' returns canned results.
+SCANNER = {
+    'BACKEND': os.environ.get('SCANNER_BACKEND', 'pool'),
+    'COMMAND': ['node', os.path.join(BASE_DIR, 'scanner', 'worker.js')],
+    'POOL_SIZE': int(os.environ.get('SCANNER_POOL_SIZE', os.cpu_count() or 2)),
+    'MAX_JOBS_PER_WORKER': int(os.environ.get('SCANNER_MAX_JOBS_PER_WORKER', 200)),
+    'JOB_TIMEOUT': int(os.environ.get('SCANNER_JOB_TIMEOUT', 60)),
+    'STARTUP_TIMEOUT': 30,
+    'ACQUIRE_TIMEOUT': None,
+    # Passed to axe.run(); part of the scan cache key
+    'AXE_OPTIONS': {},
+    # 'navigate': the browser loads the URL itself (validation only sends HEAD).
+    # 'prefetched': the page fetched while validating is scanned as HTML.
+    'URL_MODE': os.environ.get('SCANNER_URL_MODE', 'navigate'),
+    # Default engine for HTML input: 'axe', 'lxml' (in-process structural
+    # rules only) or 'prefilter' (in-process rules, axe-core for the rest)
+    'HTML_ENGINE': os.environ.get('SCANNER_HTML_ENGINE', 'axe'),
+}
+
+# Color-contrast fix suggestions: the WCAG level to meet ('AA' or 'AAA') and
+# brand colors to prefer as replacement text colors (e.g. ['#1a4480', '#005ea2'])
+CONTRAST = {
+    'LEVEL': os.environ.get('CONTRAST_LEVEL', 'AA'),
+    'PALETTE': [color for color in os.environ.get('CONTRAST_PALETTE', '').split(',') if color],
+}
+
+# Bulk scan API (/api/scans/bulk/)
+BULK_SCAN = {
+    'MAX_ITEMS': int(os.environ.get('BULK_SCAN_MAX_ITEMS', 100)),
+    'CONCURRENCY': int(os.environ.get('BULK_SCAN_CONCURRENCY', 4)),
+}
+
+# Redis (django-redis) cache, used by the shared scan result cache when REDIS_URL is set
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+            'OPTIONS': {'CLIENT_CLASS': 'django_redis.client.DefaultClient'},
+        }
+    }
+
+# Seconds before each process rebuilds its in-memory remediation tip index even
+# without an invalidation (covers per-process caches and queryset.update())
+REMEDIATION_TIP_INDEX_TTL = 300
+
+# Scan result cache, keyed by normalized input + scanner build + axe options
+# BACKEND: 'local' (per process), 'redis' (shared, needs REDIS_URL) or 'none'
+SCAN_CACHE = {
+    'BACKEND': os.environ.get('SCAN_CACHE_BACKEND', 'redis' if os.environ.get('REDIS_URL') else 'local'),
+    'TTL': int(os.environ.get('SCAN_CACHE_TTL', 6 * 60 * 60)),
+    'URL_TTL': int(os.environ.get('SCAN_CACHE_URL_TTL', 60 * 60)),
+    'MAX_ENTRIES': int(os.environ.get('SCAN_CACHE_MAX_ENTRIES', 1000)),
+    'REDIS_ALIAS': 'default',
+}
+
+# Background scan jobs (run_scan_worker)
+SCAN_JOBS = {
+    # Seconds a claim lasts without renewal; after that the worker is presumed dead and the job is claimed again
+    'LEASE': int(os.environ.get('SCAN_JOB_LEASE', SCANNER['JOB_TIMEOUT'] * 5)),
+    # Seconds between lease renewals while a job runs (default: a third of LEASE)
+    'HEARTBEAT': None,
+    # Claims per job before a job whose worker keeps dying is failed
+    'MAX_ATTEMPTS': 2,
+}
+
+# Server-sent scan progress (/scan/<id>/events/), served by the ASGI app
+SCAN_EVENTS = {
+    # Seconds between checks of the job row while a stream is open
+    'POLL_INTERVAL': 0.5,
+    # Send a keepalive comment after this many seconds without an update
+    'HEARTBEAT': 15,
+    # End the stream after this many seconds; EventSource reconnects by itself
+    'MAX_DURATION': 600,
+}
+
+# Scheduled rescans of MonitoredURL rows (python manage.py run_monitor)
+MONITOR = {
+    # Fixed number of URLs visited in parallel
+    'WORKERS': 4,
+    # Minimum seconds between visits to the same host
+    'HOST_MIN_INTERVAL': 10,
+    # Next visits are scheduled at interval * (1 ± JITTER)
+    'JITTER': 0.1,
+    # A run starts no new visits after this many seconds
+    'MAX_RUNTIME': 4 * 60 * 60,
+    'BATCH_SIZE': 1000,
+    # First retry delay after a failed visit, doubled per consecutive failure (capped at the interval)
+    'RETRY_AFTER': 15 * 60,
+}
+
+# Rescans of a URL are stored as deltas against the previous scan, with a
+# full snapshot every this many scans (1 disables deltas)
+RESCAN_SNAPSHOT_EVERY = 10
+
+# Codec for new result/input blobs: 'zlib', or 'zstd' (needs the zstandard package)
+RESULT_BLOB_CODEC = os.environ.get('RESULT_BLOB_CODEC', 'zlib')
+
+# Analyses per page on the dashboard and profile (keyset-paginated)
+HISTORY_PAGE_SIZE = 25
+
+# Pre-rendered PDF reports, one file per analysis and template version
+PDF_REPORTS_ROOT = os.environ.get('PDF_REPORTS_ROOT', os.path.join(BASE_DIR, 'media', 'reports'))
+
+# Cold import of ROOT_URLCONF after django.setup() must stay under this (checked by tests)
+STARTUP_IMPORT_BUDGET_MS = int(os.environ.get('STARTUP_IMPORT_BUDGET_MS', 400))
+
+# Shared outbound HTTP client (URL validation and prefetched scans)
+HTTP_FETCH = {
+    'TIMEOUT': 5,
+    'POOL_MAXSIZE': 10,
+    'USER_AGENT': 'AccessiScan/1.0 (+https://accessiscan.onrender.com)',
+    'MAX_BODY_BYTES': 5 * 1024 * 1024,
+    # Keep fetched pages (in the default cache) and reuse them without revalidating for this many seconds
+    'FRESH_FOR': 300,
+}
+
+# Prometheus-format metrics at /metrics/ (per process). Scrapers authenticate
+# with "Authorization: Bearer <TOKEN>"; without a token only staff can read them.
+METRICS = {
+    'ENABLED': os.environ.get('METRICS_ENABLED', '1') != '0',
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+}
+
+# Scan admission control (see accessibility_app/admission.py). Over these
+# limits, submissions get a 429 with Retry-After instead of queueing.
+SCAN_ADMISSION = {
+    # Scan submissions per user (django-ratelimit rate, e.g. '30/m')
+    'RATE': os.environ.get('SCAN_RATE', '30/m'),
+    # Scans a user may have queued or running at once
+    'PER_USER': int(os.environ.get('SCAN_PER_USER', 3)),
+    # Background jobs allowed to wait in the queue
+    'MAX_QUEUED': int(os.environ.get('SCAN_MAX_QUEUED', SCANNER['POOL_SIZE'] * 10)),
+    # Bulk API scans per process: running at once, waiting, and seconds to wait
+    'CAPACITY': SCANNER['POOL_SIZE'],
+    'MAX_WAITING': int(os.environ.get('SCAN_MAX_WAITING', SCANNER['POOL_SIZE'] * 2)),
+    'WAIT_TIMEOUT': 30,
+    # Typical scan duration, for Retry-After estimates
+    'SCAN_SECONDS': 10,
+}
+
+# Keep accepting scans if the rate-limit cache is unreachable; the other limits still apply
+RATELIMIT_FAIL_OPEN = True
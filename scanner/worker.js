@@ -0,0 +1,177 @@
+// Long-lived accessibility scanner worker.
+//
+// Reads length-prefixed JSON frames from stdin and writes length-prefixed JSON
+// frames to stdout. Every frame is a 4-byte big-endian payload length followed
+// by that many bytes of UTF-8 encoded JSON.
+//
+// Request:  {"id": 1, "type": "url" | "html", "payload": "<url or markup>", "options": {}, "progress": false}
+// Response: {"id": 1, "ok": true, "result": {"violations": [...]}}
+//           {"id": 1, "ok": false, "error": "message"}
+// Progress: {"id": 1, "progress": {"phase": "loaded"}}
+//           {"id": 1, "progress": {"phase": "rules", "group": "wcag2aa", "done": 2, "total": 6,
+//                                  "counts": {"critical": 0, "serious": 1, "moderate": 0, "minor": 0}}}
+//
+// Progress frames are only sent when the request asks for them. Rules are then
+// run one group at a time so partial counts can be reported as they arrive.
+//
+// The browser and the axe-core source are loaded once at startup, so each job
+// only pays for opening a page and running axe on it.
+
+const fs = require('fs');
+const puppeteer = require('puppeteer');
+
+const axeSource = fs.readFileSync(require.resolve('axe-core/axe.min.js'), 'utf8');
+const NAVIGATION_TIMEOUT = parseInt(process.env.SCANNER_NAVIGATION_TIMEOUT || '30000', 10);
+
+// Rules are grouped by the first of these tags they carry; anything else is 'other'
+const RULE_GROUPS = ['wcag2a', 'wcag2aa', 'wcag21a', 'wcag21aa', 'wcag22aa', 'best-practice'];
+const IMPACTS = ['critical', 'serious', 'moderate', 'minor'];
+
+let browser = null;
+
+function writeFrame(message) {
+  const body = Buffer.from(JSON.stringify(message), 'utf8');
+  const header = Buffer.alloc(4);
+  header.writeUInt32BE(body.length, 0);
+  process.stdout.write(Buffer.concat([header, body]));
+}
+
+async function getBrowser() {
+  if (!browser || !browser.connected) {
+    browser = await puppeteer.launch({
+      headless: true,
+      args: ['--no-sandbox', '--disable-setuid-sandbox', '--disable-dev-shm-usage'],
+    });
+  }
+  return browser;
+}
+
+function countImpacts(violations) {
+  const counts = Object.fromEntries(IMPACTS.map((impact) => [impact, 0]));
+  for (const violation of violations) {
+    if (violation.impact in counts) {
+      counts[violation.impact] += 1;
+    }
+  }
+  return counts;
+}
+
+async function runAxeInGroups(page, job) {
+  // runOnly would re-enable rules the caller turned off, so leave them out of the groups
+  const configured = (job.options && job.options.rules) || {};
+  const disabled = Object.keys(configured).filter((ruleId) => configured[ruleId].enabled === false);
+  const groups = await page.evaluate((groupTags, skip) => {
+    const grouped = {};
+    for (const rule of window.axe.getRules()) {
+      if (rule.tags.includes('experimental') || rule.tags.includes('deprecated') || skip.includes(rule.ruleId)) {
+        continue;
+      }
+      const group = groupTags.find((tag) => rule.tags.includes(tag)) || 'other';
+      (grouped[group] = grouped[group] || []).push(rule.ruleId);
+    }
+    return groupTags.concat(['other'])
+      .filter((group) => grouped[group])
+      .map((group) => ({ group, rules: grouped[group] }));
+  }, RULE_GROUPS, disabled);
+
+  const violations = [];
+  let testEngine = null;
+  for (let index = 0; index < groups.length; index += 1) {
+    const { group, rules } = groups[index];
+    const options = { ...(job.options || {}), runOnly: { type: 'rule', values: rules } };
+    const results = await page.evaluate(async (runOptions) => {
+      const groupResults = await window.axe.run(document, runOptions);
+      return { violations: groupResults.violations, testEngine: groupResults.testEngine };
+    }, options);
+    violations.push(...results.violations);
+    testEngine = results.testEngine;
+    writeFrame({
+      id: job.id,
+      progress: { phase: 'rules', group, done: index + 1, total: groups.length, counts: countImpacts(results.violations) },
+    });
+  }
+  return { violations, testEngine };
+}
+
+async function runAxe(job) {
+  const instance = await getBrowser();
+  const page = await instance.newPage();
+  try {
+    if (job.type === 'url') {
+      await page.goto(job.payload, { waitUntil: 'networkidle2', timeout: NAVIGATION_TIMEOUT });
+    } else {
+      await page.setContent(job.payload, { waitUntil: 'domcontentloaded', timeout: NAVIGATION_TIMEOUT });
+    }
+    await page.evaluate(axeSource);
+
+    if (job.progress) {
+      writeFrame({ id: job.id, progress: { phase: 'loaded' } });
+    }
+
+    // Caller-selected rules (runOnly) are run as given, in a single pass
+    const options = job.options || {};
+    if (job.progress && !options.runOnly) {
+      return await runAxeInGroups(page, job);
+    }
+    return await page.evaluate(async (runOptions) => {
+      const results = await window.axe.run(document, runOptions);
+      return { violations: results.violations, testEngine: results.testEngine };
+    }, options);
+  } finally {
+    await page.close();
+  }
+}
+
+// Jobs are handled one at a time; the Python pool never sends a second job to
+// a worker before the first one has been answered.
+let queue = Promise.resolve();
+
+function handleFrame(raw) {
+  let job;
+  try {
+    job = JSON.parse(raw.toString('utf8'));
+  } catch (err) {
+    writeFrame({ id: null, ok: false, error: `Invalid frame: ${err.message}` });
+    return;
+  }
+  queue = queue.then(async () => {
+    try {
+      const result = await runAxe(job);
+      writeFrame({ id: job.id, ok: true, result });
+    } catch (err) {
+      writeFrame({ id: job.id, ok: false, error: err.message });
+    }
+  });
+}
+
+let buffered = Buffer.alloc(0);
+
+process.stdin.on('data', (chunk) => {
+  buffered = Buffer.concat([buffered, chunk]);
+  while (buffered.length >= 4) {
+    const length = buffered.readUInt32BE(0);
+    if (buffered.length < 4 + length) {
+      break;
+    }
+    handleFrame(buffered.subarray(4, 4 + length));
+    buffered = buffered.subarray(4 + length);
+  }
+});
+
+async function shutdown() {
+  await queue;
+  if (browser) {
+    await browser.close();
+  }
+  process.exit(0);
+}
+
+process.stdin.on('end', shutdown);
+process.on('SIGTERM', shutdown);
+
+getBrowser()
+  .then(() => writeFrame({ id: null, ok: true, ready: true }))
+  .catch((err) => {
+    process.stderr.write(`Failed to launch browser: ${err.message}\n`);
+    process.exit(1);
+  });